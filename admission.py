@@ -0,0 +1,110 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Gauge
+
+from batching import DeadlineExceeded
+
+# 밀릴 때 요청이 끝없이 쌓이지 않도록 하는 입장 제한 + 클라이언트 deadline + 연결이 끊긴 요청 취소
+
+# ---------- Config ----------
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))   # 동시에 처리할 최대 요청 수 (0이면 제한 없음)
+ADMISSION_RETRY_AFTER_SEC = int(os.getenv("ADMISSION_RETRY_AFTER_SEC", "1"))
+ADMISSION_DEFAULT_TIMEOUT_MS = float(os.getenv("ADMISSION_DEFAULT_TIMEOUT_MS", "0"))  # 헤더가 없을 때 적용할 deadline (0이면 없음)
+DISCONNECT_POLL_SEC = float(os.getenv("DISCONNECT_POLL_SEC", "0.05"))   # 처리 중 클라이언트 연결 끊김 확인 간격
+
+DEADLINE_HEADER = "X-Request-Deadline"     # 절대 시각 (unix epoch 초, 예: time.time() + 10)
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"    # 요청 도착 시점부터의 남은 시간(ms)
+
+IN_FLIGHT_REQUESTS = Gauge("admission_in_flight", "입장 제한에 걸리는 처리 중 요청 수")
+REJECTED = Counter("admission_rejected_total", "입장 제한/deadline/연결 끊김으로 버린 요청 수", ["reason"])
+
+
+def parse_deadline(headers, default_timeout_ms: float = ADMISSION_DEFAULT_TIMEOUT_MS) -> Optional[float]:
+    """헤더 → time.monotonic 기준 deadline. 둘 다 있으면 더 이른 쪽."""
+    now_mono, now_wall = time.monotonic(), time.time()
+    deadlines = []
+    try:
+        if DEADLINE_HEADER in headers:
+            deadlines.append(now_mono + float(headers[DEADLINE_HEADER]) - now_wall)
+        if TIMEOUT_HEADER in headers:
+            deadlines.append(now_mono + float(headers[TIMEOUT_HEADER]) / 1000)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{DEADLINE_HEADER} / {TIMEOUT_HEADER} 헤더는 숫자여야 합니다")
+    if not deadlines and default_timeout_ms > 0:
+        deadlines.append(now_mono + default_timeout_ms / 1000)
+    return min(deadlines) if deadlines else None
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    return getattr(request.state, "deadline", None)
+
+
+async def guarded(request: Request, work: Awaitable):
+    """
+    work를 실행하면서 클라이언트 연결이 끊기면 바로 취소한다 (배치 스케줄러 큐에 있던 이미지는 forward에서 빠짐).
+    deadline이 지나 버려졌으면 504.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SEC)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                REJECTED.labels("disconnected").inc()
+                # 응답을 받을 클라이언트가 없으므로 상태 코드는 로그/metrics용 (nginx 관례의 499)
+                raise HTTPException(status_code=499, detail="클라이언트 연결이 끊겼습니다")
+    except DeadlineExceeded:
+        REJECTED.labels("deadline").inc()
+        raise HTTPException(status_code=504, detail="deadline이 지나 처리하지 않았습니다")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+class Admission:
+    """
+    POST 요청의 동시 처리 수를 max_in_flight로 제한한다. 넘치면 본문(이미지)을 읽기 전에 바로 503 + Retry-After.
+    deadline 헤더는 여기서 파싱해서 request.state.deadline에 넣어두고, 이미 지난 요청은 바로 504.
+    """
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+                 retry_after_sec: int = ADMISSION_RETRY_AFTER_SEC):
+        self.max_in_flight = max_in_flight
+        self.retry_after_sec = retry_after_sec
+        self.in_flight = 0
+        IN_FLIGHT_REQUESTS.set_function(lambda: self.in_flight)
+
+    async def __call__(self, request: Request, call_next):
+        if request.method != "POST":
+            return await call_next(request)
+        try:
+            deadline = parse_deadline(request.headers)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+        if deadline is not None and time.monotonic() >= deadline:
+            REJECTED.labels("deadline").inc()
+            return JSONResponse(status_code=504, content={"detail": "deadline이 이미 지났습니다"})
+        if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+            REJECTED.labels("overload").inc()
+            return JSONResponse(status_code=503, content={"detail": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요"},
+                                headers={"Retry-After": str(self.retry_after_sec)})
+
+        request.state.deadline = deadline
+        self.in_flight += 1
+        try:
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
+
+
+def install_admission(app: FastAPI, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT) -> Admission:
+    admission = Admission(max_in_flight)
+    app.middleware("http")(admission)
+    return admission
@@ -1,26 +1,17 @@
 import os
-import io
-from fastapi import FastAPI, UploadFile, File, Request, HTTPException, Query
-from pydantic import BaseModel # 데이터 예외처리시 사용
-from PIL import Image, ImageOps
-import torch
-import torch.nn as nn
-import torchvision.transforms as transforms # 이미지 처리시 사용
-import torchvision.models as models # 모델 사용시 사용
-from typing import List # 타입 체크시 사용
-import json
-import uuid
+from fastapi import FastAPI, UploadFile, File, Request, Query, WebSocket
+from typing import List, Optional # 타입 체크시 사용
+from model_loader import build_efficientnet_b0
+from model_registry import CLASS_NAMES, ModelBackend, ModelService
+from admission import guarded, install_admission, request_deadline
+from metrics import install_metrics, read_uploads
+from stream import stream_frames
+from schemas import Predict, BatchPredictItem, BatchPredictResponse, ExplainResponse
 # ---------- Config ----------
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-NUM_CLASSES = int(os.getenv("NUM_CLASSES", "13"))
-DEFAULT_CLASS_NAMES = [
-    "금속캔알루미늄캔","금속캔철캔","비닐","스티로폼",
-    "유리병갈색","유리병녹색","유리병투명","종이",
-    "페트병무색단일","페트병유색단일","플라스틱PE","플라스틱PP","플라스틱PS"
-]
-CLASS_NAMES = [s.strip() for s in os.getenv("CLASS_NAMES_CSV", "").split(",")] if os.getenv("CLASS_NAMES_CSV") else DEFAULT_CLASS_NAMES
+MODEL_NAME = os.getenv("MODEL_NAME", "efficientnet_b0")
 WEIGHTS_PATH = os.getenv("WEIGHTS_PATH", "model/lr1e4_512best_efficientB0_model_pretrained_weights827.pth")
 IMG_SIZE = int(os.getenv("IMG_SIZE", "512"))
+SAVE_DIR = os.getenv("SAVE_DIR", "data/Dataset_project4")
 TITLE = os.getenv("APP_TITLE", "EfficientNet-B0 FastAPI Inference")
 VERSION = os.getenv("APP_VERSION", "1.0.0")
 
@@ -28,55 +19,52 @@ VERSION = os.getenv("APP_VERSION", "1.0.0")
 
 app = FastAPI(title=TITLE, version=VERSION)
 
-model = models.efficientnet_b0(pretrained = True)
-model.classifier[1] = nn.Linear(in_features=1280, out_features=13, bias=True)
-model.load_state_dict(torch.load(WEIGHTS_PATH))
-model.eval()
-model.to(DEVICE)
+# 모델 로드, 전처리, 배치 스케줄러, 업로드 저장, 예측 캐시는 model_registry.ModelService가 담당
+backend = ModelBackend(MODEL_NAME, build_efficientnet_b0, WEIGHTS_PATH, IMG_SIZE, CLASS_NAMES)
+service = ModelService(backend, save_dir=SAVE_DIR)
+# 동시 처리 수 제한(넘치면 503 + Retry-After), X-Request-Deadline / X-Request-Timeout-Ms 헤더 처리
+install_admission(app)
+# 요청 시간/단계별 히스토그램을 GET /metrics로 노출 (PROFILE_SLOW_MS로 느린 요청 프로파일링)
+install_metrics(app)
 
 
+@app.post("/predict",response_model=Predict)
+async def predict(request: Request, file: UploadFile=File(...)):
+    # 캐시에 없으면 배치 스케줄러에 넣고 내 이미지의 top-k 결과만 돌려받음
+    # (클라이언트가 끊기거나 deadline이 지나면 forward 전에 큐에서 빠짐)
+    uploads = await read_uploads([file], service.name)
+    predictions = (await guarded(request, service.predict_uploads(uploads, request_deadline(request))))[0]
 
-# 이미지 전처리 코드 그대로 붙여넣기
-transforms_infer = transforms.Compose([
-    transforms.Resize((IMG_SIZE, IMG_SIZE)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
-])
-# 이미지 전처리 코드 그대로 붙여넣기
+    # 1순위 예측 결과 반환
+    return Predict(**predictions[0])
 
 
-# 상대방에게 전달할시 데이터 타입 정의
-class PredictResponse(BaseModel): # response_model=response 응답시 타입 정의
-    name: str
-    score: float
-    type: int
+@app.post("/predict/batch",response_model=BatchPredictResponse)
+async def predict_batch(request: Request, files: List[UploadFile]=File(...)):
+    # 여러 장을 한 번의 multipart 요청으로 받아 하나의 배치 텐서로 추론
+    uploads = await read_uploads(files, service.name)
+    predictions = await guarded(request, service.predict_uploads(uploads, request_deadline(request)))
 
-@app.post("/predict",response_model=PredictResponse)
-async def predict(file: UploadFile=File(...)):
-    image = Image.open(io.BytesIO(await file.read()))
+    # 입력 순서 그대로 파일별 top-k 결과 반환
+    results = [BatchPredictItem(filename=filename, predictions=preds)
+               for (_, filename), preds in zip(uploads, predictions)]
+    return BatchPredictResponse(results=results)
 
-    # 고유한 파일명으로 저장 (덮어쓰기 방지)
-    file_id = str(uuid.uuid4())
-    file_extension = file.filename.split('.')[-1]
-    file_path = f'data/Dataset_project4/{file_id}.{file_extension}'
-    image.save(file_path)
 
-    # 이미지 전처리 및 텐서 변환
-    img_tensor = transforms_infer(image).unsqueeze(0).to(DEVICE)
+@app.post("/explain",response_model=ExplainResponse)
+async def explain(request: Request, file: UploadFile=File(...), target: Optional[int]=Query(None, description="CAM을 계산할 클래스 번호 (기본: 1순위 예측)")):
+    # 예측 결과 + Grad-CAM 히트맵 (같은 이미지/target이면 캐시에서 반환)
+    data, filename = (await read_uploads([file], service.name))[0]
+    result = await guarded(request, service.explainer.explain(data, filename, target, request_deadline(request)))
+    return ExplainResponse(**result)
 
-    with torch.no_grad():
-        pred = model(img_tensor)
-        print('예측값: ',pred)
-    
-    # 예측 결과 및 확률 계산
-    pred_result = torch.max(pred, dim=1)[1].item()
-    score_tensor = nn.Softmax(dim=1)(pred)[0]
-    score_value = score_tensor[pred_result].item()
-    print("Softmax: ",score_tensor)
-    name = CLASS_NAMES[pred_result]
-    print('name :',name)
-
-    return PredictResponse(name=name, score=score_value, type=pred_result) #score가 float 인줄 알았는데, list 였음. 그래서 float 값으로 변형해준것
 
+@app.websocket("/stream")
+async def stream(websocket: WebSocket, smooth: Optional[int]=Query(None, description="최근 N프레임 softmax 평균")):
+    # JPEG 프레임을 binary 메시지로 계속 보내면 프레임별 top-k 결과(JSON)를 돌려줌 (밀리면 최신 프레임만 처리)
+    await stream_frames(websocket, service, smooth)
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return service.prediction_cache.summary()
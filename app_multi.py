@@ -0,0 +1,101 @@
+import os
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional # 타입 체크시 사용
+from model_registry import BACKENDS, ModelRegistry, ModelService
+from ensemble import CascadePredictor, EnsemblePredictor
+from admission import guarded, install_admission, request_deadline
+from metrics import install_metrics, read_uploads
+from stream import stream_frames
+from schemas import PredictResponse, BatchPredictItem, BatchPredictResponse, CascadePredictItem, CascadePredictResponse, ExplainResponse
+# ---------- Config ----------
+SAVE_DIR = os.getenv("SAVE_DIR", "../../saved_data")   # 모델 이름별 하위 폴더에 저장
+TITLE = os.getenv("APP_TITLE", "Recycling Classifier Multi-Model Inference")
+VERSION = os.getenv("APP_VERSION", "1.0.0")
+
+# ---------- App ----------
+
+# ResNet50 / EfficientNet-B0 / ConvNeXt를 한 프로세스에서 서빙 (처음 요청될 때 로드, 유휴 모델은 상한 초과 시 언로드)
+app = FastAPI(title=TITLE, version=VERSION)
+registry = ModelRegistry(BACKENDS, save_dir=SAVE_DIR)
+cascade = CascadePredictor(registry)
+ensemble = EnsemblePredictor(registry)
+# 동시 처리 수 제한(넘치면 503 + Retry-After), X-Request-Deadline / X-Request-Timeout-Ms 헤더 처리
+install_admission(app)
+# 요청 시간/단계별 히스토그램을 GET /metrics로 노출 (PROFILE_SLOW_MS로 느린 요청 프로파일링)
+install_metrics(app)
+
+
+async def get_service(name: str) -> ModelService:
+    if name not in BACKENDS:
+        raise HTTPException(status_code=404, detail=f"등록되지 않은 모델입니다: {name} (사용 가능: {registry.names()})")
+    # 첫 요청이면 모델 로드가 일어나므로 threadpool에서 실행
+    return await run_in_threadpool(registry.get, name)
+
+
+@app.get("/models")
+async def list_models():
+    return registry.info()
+
+
+@app.post("/models/{name}/predict",response_model=PredictResponse)
+async def predict(name: str, request: Request, file: UploadFile=File(...)):
+    service = await get_service(name)
+    uploads = await read_uploads([file], name)
+    predictions = (await guarded(request, service.predict_uploads(uploads, request_deadline(request))))[0]
+    return PredictResponse(predictions=predictions)
+
+
+@app.post("/models/{name}/predict/batch",response_model=BatchPredictResponse)
+async def predict_batch(name: str, request: Request, files: List[UploadFile]=File(...)):
+    service = await get_service(name)
+    uploads = await read_uploads(files, name)
+    predictions = await guarded(request, service.predict_uploads(uploads, request_deadline(request)))
+
+    # 입력 순서 그대로 파일별 top-k 결과 반환
+    results = [BatchPredictItem(filename=filename, predictions=preds)
+               for (_, filename), preds in zip(uploads, predictions)]
+    return BatchPredictResponse(results=results)
+
+
+@app.post("/models/{name}/explain",response_model=ExplainResponse)
+async def explain(name: str, request: Request, file: UploadFile=File(...), target: Optional[int]=Query(None, description="CAM을 계산할 클래스 번호 (기본: 1순위 예측)")):
+    service = await get_service(name)
+    data, filename = (await read_uploads([file], name))[0]
+    result = await guarded(request, service.explainer.explain(data, filename, target, request_deadline(request)))
+    return ExplainResponse(**result)
+
+
+@app.websocket("/models/{name}/stream")
+async def stream(websocket: WebSocket, name: str, smooth: Optional[int]=Query(None, description="최근 N프레임 softmax 평균")):
+    if name not in BACKENDS:
+        await websocket.close(code=1008, reason=f"등록되지 않은 모델입니다: {name}")
+        return
+    service = await run_in_threadpool(registry.get, name)
+    await stream_frames(websocket, service, smooth)
+
+
+@app.get("/models/{name}/cache/stats")
+async def cache_stats(name: str):
+    if not registry.is_loaded(name):
+        raise HTTPException(status_code=404, detail=f"로드되지 않은 모델입니다: {name}")
+    service = await get_service(name)
+    return service.prediction_cache.summary()
+
+
+@app.post("/cascade/predict",response_model=CascadePredictResponse)
+async def predict_cascade(request: Request, files: List[UploadFile]=File(...)):
+    # 가벼운 모델 → 확신이 낮은 이미지만 큰 모델 (CASCADE_MODELS, CASCADE_THRESHOLD)
+    uploads = await read_uploads(files, "cascade")
+    results = await guarded(request, cascade.predict(uploads, request_deadline(request)))
+    return CascadePredictResponse(results=[CascadePredictItem(filename=filename, **result)
+                                           for (_, filename), result in zip(uploads, results)])
+
+
+@app.post("/ensemble/predict",response_model=CascadePredictResponse)
+async def predict_ensemble(request: Request, files: List[UploadFile]=File(...)):
+    # ENSEMBLE_MODELS 전체를 돌려 softmax 확률을 평균
+    uploads = await read_uploads(files, "ensemble")
+    results = await guarded(request, ensemble.predict(uploads, request_deadline(request)))
+    return CascadePredictResponse(results=[CascadePredictItem(filename=filename, **result)
+                                           for (_, filename), result in zip(uploads, results)])
@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import torch
+
+# ---------- Config ----------
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))          # 한 번의 forward에 묶을 최대 이미지 수
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))  # 첫 요청 이후 배치를 채우기 위해 기다리는 최대 시간(ms)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "1"))            # 동시에 실행할 forward 수 (worker thread 수)
+
+
+class DeadlineExceeded(Exception):
+    """클라이언트가 준 deadline(time.monotonic 기준)이 forward 전에 지나서 버려진 요청."""
+
+
+class MicroBatcher:
+    """
+    /predict 요청들을 큐에 모았다가 하나의 배치로 묶어 forward를 실행하는 스케줄러.
+
+    forward_fn은 (N, C, H, W) 텐서를 받아 (N, num_classes) 확률 텐서를 돌려주는 함수이며,
+    이벤트 루프를 막지 않도록 worker thread에서 실행된다.
+    각 요청은 자기 이미지에 해당하는 확률 벡터 한 줄을 돌려받는다.
+    배치를 꺼낼 때 deadline이 지난 요청과 취소된(클라이언트가 떠난) 요청은 forward에서 빠진다.
+    """
+
+    def __init__(self, forward_fn: Callable[[torch.Tensor], torch.Tensor],
+                 max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 num_workers: int = BATCH_WORKERS):
+        self.forward_fn = forward_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.num_workers = max(1, num_workers)
+        self._executor = None
+        self._queue = None
+        self._slots = None
+        self._task = None
+        self.dropped = {"expired": 0, "cancelled": 0}
+
+    def _ensure_started(self):
+        # 첫 요청이 들어온 이벤트 루프에서 스케줄러 태스크를 띄운다
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="batcher")
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.num_workers)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, tensor: torch.Tensor, deadline: Optional[float] = None) -> torch.Tensor:
+        # tensor: (C, H, W) 전처리된 이미지 한 장
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((tensor, future, deadline))
+        return await future
+
+    async def submit_many(self, tensors: List[torch.Tensor], deadline: Optional[float] = None) -> List[torch.Tensor]:
+        # 여러 장을 한꺼번에 큐에 넣어 같은 forward에 묶이도록 한다 (입력 순서대로 반환)
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for tensor in tensors:
+            future = loop.create_future()
+            self._queue.put_nowait((tensor, future, deadline))
+            futures.append(future)
+        # deadline이 지나면 모든 이미지가 같은 예외를 받으므로 한꺼번에 모아서 첫 예외만 올림
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def queue_depth(self) -> int:
+        # forward를 기다리는 이미지 수 (metrics)
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def close(self):
+        # 모델을 내릴 때 스케줄러 태스크와 worker thread 정리 (다시 submit하면 새로 띄움)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.dropped = {"expired": 0, "cancelled": 0}
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _collect(self) -> List[tuple]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # 이미 큐에 쌓인 요청은 기다리지 않고 바로 가져온다
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # forward 자리를 먼저 잡고 나서 배치를 모은다. 이전 forward를 기다리는 동안에는 요청이 큐에 남아 있다가
+            # 자리가 나면 한꺼번에 묶이고, 그 사이 deadline이 지나거나 연결이 끊긴 요청은 바로 아래에서 빠진다.
+            await self._slots.acquire()
+            batch = self._drop_stale(await self._collect())
+            if not batch:
+                self._slots.release()
+                continue
+            asyncio.get_running_loop().create_task(self._dispatch(batch))
+
+    def _drop_stale(self, batch: List[tuple]) -> List[tuple]:
+        # 클라이언트가 이미 떠난(취소된) 요청과 deadline이 지난 요청은 forward에서 제외
+        now = time.monotonic()
+        alive = []
+        for t, f, deadline in batch:
+            if f.done():
+                self.dropped["cancelled"] += 1
+            elif deadline is not None and now >= deadline:
+                self.dropped["expired"] += 1
+                f.set_exception(DeadlineExceeded())
+            else:
+                alive.append((t, f))
+        return alive
+
+    async def _dispatch(self, batch: List[tuple]):
+        loop = asyncio.get_running_loop()
+        try:
+            inputs = torch.stack([t for t, _ in batch])
+            probs = await loop.run_in_executor(self._executor, self.forward_fn, inputs)
+        except Exception as e:
+            for _, f in batch:
+                if not f.done():
+                    f.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for i, (_, f) in enumerate(batch):
+            if not f.done():
+                f.set_result(probs[i])
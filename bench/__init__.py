@@ -0,0 +1,3 @@
+# 서빙 앱(app_ResN.py / app_eff.py / app_convN.py)을 같은 프로세스에 띄워 부하 테스트와 단계별 마이크로 벤치마크를 돌리는 패키지
+# 사용법: python -m bench load app_eff --concurrency 8 --save bench/results/eff.json
+#        python -m bench micro app_eff --compare bench/results/eff_micro.json
@@ -0,0 +1,90 @@
+import os
+import sys
+import asyncio
+import argparse
+
+from bench.report import compare, environment, save
+
+# ---------- Config ----------
+# 측정 대상이 모델이 되도록 기본으로 예측 캐시와 업로드 저장을 끔 (--cache / --save-uploads로 켤 수 있음)
+BENCH_ENV_DEFAULTS = {"CACHE_MAX_ENTRIES": "0", "SAVE_SAMPLE_RATE": "0"}
+
+
+def parse_ints(text: str) -> list:
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="서빙 앱 부하 테스트 / 단계별 마이크로 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("app", help="app_ResN | app_eff | app_convN | app_multi")
+    common.add_argument("--model", default=None, help="app_multi에서 쓸 모델 이름")
+    common.add_argument("--images", default="test.jpg", help="쉼표로 구분한 이미지 파일/폴더")
+    common.add_argument("--per-class", type=int, default=0, help="데이터셋에서 클래스별로 추가할 이미지 수")
+    common.add_argument("--resolutions", default="0", help="긴 변 크기 목록 (0=원본), 예: 0,640,1280,1920")
+    common.add_argument("--cache", action="store_true", help="예측 캐시를 켠 채로 측정")
+    common.add_argument("--save-uploads", action="store_true", help="업로드 저장을 켠 채로 측정")
+    common.add_argument("--save", default=None, help="결과 JSON 경로 (baseline으로 쓸 수 있음)")
+    common.add_argument("--compare", default=None, help="비교할 baseline JSON")
+    common.add_argument("--tolerance", type=float, default=0.1, help="이 비율 넘게 나빠지면 종료 코드 1")
+
+    load = sub.add_parser("load", parents=[common], help="고정 동시성 / 고정 도착률 부하 테스트")
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--rate", type=float, default=None, help="초당 요청 수 (주면 open loop)")
+    load.add_argument("--requests", type=int, default=200, help="0이면 --duration 동안")
+    load.add_argument("--duration", type=float, default=0.0)
+    load.add_argument("--warmup", type=int, default=10)
+    load.add_argument("--files-per-request", type=int, default=1, help="1보다 크면 /predict/batch")
+    load.add_argument("--path", default=None, help="요청 경로 (app_multi면 /models/<name>/predict 등)")
+
+    micro = sub.add_parser("micro", parents=[common], help="decode / transform / normalize / forward 개별 측정")
+    micro.add_argument("--repeat", type=int, default=50)
+    micro.add_argument("--batch-sizes", default="1,8")
+    args = parser.parse_args()
+
+    # 앱/설정 모듈이 import 시점에 환경변수를 읽으므로 import 전에 설정
+    defaults = dict(BENCH_ENV_DEFAULTS)
+    if args.cache:
+        defaults.pop("CACHE_MAX_ENTRIES")
+    if args.save_uploads:
+        defaults.pop("SAVE_SAMPLE_RATE")
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+    from bench.workload import build_workload, describe
+
+    items = build_workload(args.images.split(","), args.per_class, parse_ints(args.resolutions))
+    result = {"command": args.command, "app": args.app, "model": args.model, "workload": describe(items),
+              "environment": environment()}
+    if args.command == "load":
+        from bench.load import run_load
+
+        result["load"] = asyncio.run(run_load(args.app, items, args.concurrency, args.rate, args.requests,
+                                              args.duration, args.warmup, args.files_per_request, args.path,
+                                              args.model))
+        load_result = result["load"]
+        latency = load_result["latency"]
+        print(f"{load_result['mode']} {load_result['path']}: {load_result['requests']}건 (에러 {load_result['errors']}), "
+              f"{load_result['throughput_rps']:.1f} req/s, {load_result['images_per_sec']:.1f} img/s")
+        if latency:
+            print(f"  p50 {latency['p50_ms']:.1f}ms  p95 {latency['p95_ms']:.1f}ms  p99 {latency['p99_ms']:.1f}ms")
+        for stage, ms in load_result["stages"].items():
+            print(f"  {stage:<16}{ms:8.2f}")
+    else:
+        from bench.micro import run_micro
+
+        result["micro"] = run_micro(args.app, items, args.repeat, parse_ints(args.batch_sizes), args.model)
+        for op, summary in result["micro"].items():
+            print(f"{op:<20} p50 {summary['p50_ms']:8.2f}ms  p95 {summary['p95_ms']:8.2f}ms")
+
+    if args.save:
+        save(result, args.save)
+    if args.compare:
+        return 0 if compare(result, args.compare, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
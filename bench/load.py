@@ -0,0 +1,161 @@
+import asyncio
+import importlib
+import itertools
+import time
+from typing import List, Optional
+
+from bench.report import latency_summary
+
+# 앱을 같은 프로세스에 띄우고 httpx ASGITransport로 요청 (네트워크/uvicorn 없이 앱 자체의 처리 시간만 측정)
+
+
+def load_app(module: str):
+    """app_eff 같은 모듈 이름 → 모듈 (import 시점에 모델이 로드됨)."""
+    return importlib.import_module(module.removesuffix(".py"))
+
+
+def make_client(app):
+    import httpx
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120.0)
+
+
+def request_files(items: List[tuple], start: int, count: int, batch: bool) -> list:
+    picked = [items[(start + j) % len(items)] for j in range(count)]
+    field = "files" if batch else "file"
+    return [(field, (name, data, "image/jpeg")) for name, data in picked]
+
+
+async def stage_totals(client) -> dict:
+    # /metrics의 inference_stage_seconds 누적 합/개수 (실행 전후 차이로 단계별 평균을 구함)
+    from prometheus_client.parser import text_string_to_metric_families
+
+    response = await client.get("/metrics")
+    if response.status_code != 200:
+        return {}
+    totals = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name != "inference_stage_seconds":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith(("_sum", "_count")):
+                key = sample.labels["stage"]
+                totals.setdefault(key, [0.0, 0.0])[0 if sample.name.endswith("_sum") else 1] += sample.value
+    return totals
+
+
+def stage_breakdown(before: dict, after: dict) -> dict:
+    breakdown = {}
+    for key, (total, count) in after.items():
+        prev_total, prev_count = before.get(key, (0.0, 0.0))
+        if count > prev_count:
+            breakdown[f"{key}_ms"] = (total - prev_total) / (count - prev_count) * 1000
+    return breakdown
+
+
+async def _send(client, path: str, files: list) -> bool:
+    response = await client.post(path, files=files)
+    return response.status_code == 200
+
+
+async def run_concurrency(client, path: str, items: List[tuple], concurrency: int, requests: int,
+                          duration: float, files_per_request: int, batch: bool) -> tuple:
+    # closed loop: concurrency개의 클라이언트가 응답을 받자마자 다음 요청을 보냄
+    latencies, errors = [], 0
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration if duration > 0 else float("inf")
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if (requests > 0 and i >= requests) or time.perf_counter() >= deadline:
+                return
+            files = request_files(items, i * files_per_request, files_per_request, batch)
+            start = time.perf_counter()
+            try:
+                ok = await _send(client, path, files)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    return latencies, errors
+
+
+async def run_rate(client, path: str, items: List[tuple], rate: float, requests: int, duration: float,
+                   files_per_request: int, batch: bool) -> tuple:
+    # open loop: 응답과 상관없이 rate(req/s) 간격으로 보냄. 지연은 "보냈어야 할 시각"부터 재서
+    # 서버가 밀릴 때 클라이언트도 같이 늦춰져 지연이 작게 보이는 문제(coordinated omission)를 피함
+    latencies, errors = [], 0
+    total = requests if requests > 0 else int(rate * duration)
+    loop_start = time.perf_counter()
+
+    async def one(i: int, scheduled: float):
+        nonlocal errors
+        try:
+            ok = await _send(client, path, request_files(items, i * files_per_request, files_per_request, batch))
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - scheduled)
+        else:
+            errors += 1
+
+    tasks = []
+    for i in range(total):
+        scheduled = loop_start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, scheduled)))
+    await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+async def run_load(module: str, items: List[tuple], concurrency: int = 8, rate: Optional[float] = None,
+                   requests: int = 200, duration: float = 0.0, warmup: int = 10,
+                   files_per_request: int = 1, path: Optional[str] = None, model: Optional[str] = None) -> dict:
+    """
+    rate를 주면 고정 도착률(open loop), 아니면 고정 동시성(closed loop)으로 돌린다.
+    files_per_request > 1이면 /predict/batch로 한 요청에 여러 장을 보낸다.
+    model을 주면(app_multi) 기본 경로는 /models/<model>/predict.
+    """
+    app_module = load_app(module)
+    batch = files_per_request > 1
+    prefix = f"/models/{model}" if model else ""
+    path = path or prefix + ("/predict/batch" if batch else "/predict")
+    async with make_client(app_module.app) as client:
+        # 배치 스케줄러 시작, 첫 forward 등 초기 비용은 측정에서 제외
+        for i in range(warmup):
+            response = await client.post(path, files=request_files(items, i, files_per_request, batch))
+            if response.status_code in (404, 405):
+                # 경로가 틀리면 모든 요청이 에러로만 세어져 0 req/s가 나오므로 바로 중단
+                raise SystemExit(f"{module}에 {path} 경로가 없습니다 ({response.status_code}: {response.text[:200]})")
+        before = await stage_totals(client)
+
+        start = time.perf_counter()
+        if rate:
+            latencies, errors = await run_rate(client, path, items, rate, requests, duration,
+                                               files_per_request, batch)
+        else:
+            latencies, errors = await run_concurrency(client, path, items, concurrency, requests, duration,
+                                                      files_per_request, batch)
+        elapsed = time.perf_counter() - start
+        stages = stage_breakdown(before, await stage_totals(client))
+
+    done = len(latencies)
+    return {
+        "mode": f"rate={rate}/s" if rate else f"concurrency={concurrency}",
+        "path": path,
+        "requests": done,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": done / elapsed if elapsed else 0.0,
+        "images_per_sec": done * files_per_request / elapsed if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "stages": stages,
+    }
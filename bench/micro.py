@@ -0,0 +1,55 @@
+import time
+from typing import Callable, List, Optional
+
+import torch
+
+from bench.load import load_app
+from bench.report import latency_summary
+
+# 요청 경로의 단계(decode / transform / normalize / forward)를 따로 떼어 반복 측정
+
+
+def measure(fn: Callable[[int], object], repeat: int, warmup: int = 3) -> dict:
+    for i in range(warmup):
+        fn(i)
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    return latency_summary(times)
+
+
+def get_service(app_module, model: Optional[str] = None):
+    # 단일 모델 앱은 service, app_multi는 registry에서 꺼냄
+    if hasattr(app_module, "service"):
+        return app_module.service
+    if not model:
+        raise ValueError("여러 모델을 서빙하는 앱은 --model을 지정해야 합니다")
+    return app_module.registry.get(model)
+
+
+def run_micro(module: str, items: List[tuple], repeat: int = 50, batch_sizes: List[int] = (1, 8),
+              model: Optional[str] = None) -> dict:
+    from preprocess import open_image, resize_uint8
+
+    service = get_service(load_app(module), model)
+    size = service.backend.img_size
+    datas = [data for _, data in items]
+    images = [open_image(data) for data in datas]
+    pick = lambda seq, i: seq[i % len(seq)]
+
+    result = {
+        "decode_full": measure(lambda i: open_image(pick(datas, i)), repeat),
+        "decode_draft": measure(lambda i: open_image(pick(datas, i), size), repeat),
+        "transform_compose": measure(lambda i: service.transforms_infer(pick(images, i)), repeat),
+        "transform_uint8": measure(lambda i: resize_uint8(pick(images, i), size), repeat),
+    }
+    uint8 = [resize_uint8(image, size) for image in images]
+    for b in batch_sizes:
+        batch = torch.stack([pick(uint8, j) for j in range(b)])
+        result[f"normalize_b{b}"] = measure(lambda i: service.normalizer(batch, service.device), repeat)
+        # forward_batch = normalize + model + softmax (batcher worker가 실제로 실행하는 함수)
+        result[f"forward_b{b}"] = measure(lambda i: service.forward_batch(batch), max(5, repeat // max(1, b // 2)))
+        result[f"forward_b{b}"]["per_image_ms"] = result[f"forward_b{b}"]["p50_ms"] / b
+    return result
@@ -0,0 +1,84 @@
+import os
+import json
+import platform
+import subprocess
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# 결과 요약, 실행 환경 기록, baseline JSON 저장/비교
+
+# 결과에 함께 남길 서빙 설정 (같은 설정끼리 비교해야 의미가 있음)
+ENV_KEYS = ("FAST_PREPROCESS", "BATCH_MAX_SIZE", "BATCH_MAX_WAIT_MS", "BATCH_WORKERS", "INFER_PRECISION",
+            "INFER_RUNTIME", "MODEL_MMAP", "MODEL_SCRIPTED", "CACHE_MAX_ENTRIES", "SAVE_SAMPLE_RATE",
+            "OMP_NUM_THREADS")
+
+# 비교 시 값이 클수록 좋은 항목 (나머지는 작을수록 좋음: 지연 시간)
+HIGHER_IS_BETTER = ("throughput_rps", "images_per_sec")
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    if not latencies:
+        return {}
+    ms = np.asarray(latencies) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean()), "max_ms": float(ms.max())}
+
+
+def environment() -> dict:
+    import torch
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "torch": torch.__version__, "threads": torch.get_num_threads(), "cpu_count": os.cpu_count(),
+            "cuda": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+            "env": {k: os.environ[k] for k in ENV_KEYS if k in os.environ}}
+
+
+def flatten(result: dict, prefix: str = "") -> Dict[str, float]:
+    # {"load": {"p95_ms": 12}} → {"load.p95_ms": 12} (숫자만)
+    flat = {}
+    for key, value in result.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def save(result: dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {path}")
+
+
+def compare(result: dict, baseline_path: str, tolerance: float = 0.1) -> bool:
+    """
+    baseline과 같은 항목끼리 비교해서 표로 출력한다. tolerance(기본 10%) 넘게 나빠진 항목이 있으면 False.
+    environment는 참고용이라 비교하지 않는다.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = flatten({k: v for k, v in baseline.items() if k != "environment"})
+    new = flatten({k: v for k, v in result.items() if k != "environment"})
+
+    ok = True
+    print(f"\nbaseline: {baseline_path} ({baseline.get('environment', {}).get('commit', '?')})")
+    print(f"{'항목':<48}{'baseline':>12}{'현재':>12}{'변화':>10}")
+    for key in sorted(set(old) & set(new)):
+        if old[key] == 0:
+            continue
+        change = (new[key] - old[key]) / abs(old[key])
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = ""
+        if worse > tolerance and (key.endswith("_ms") or key.endswith(HIGHER_IS_BETTER)):
+            flag, ok = "  ← 느려짐", False
+        print(f"{key:<48}{old[key]:>12.2f}{new[key]:>12.2f}{change:>+10.1%}{flag}")
+    return ok
@@ -0,0 +1,57 @@
+import io
+import os
+import random
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image
+
+from dataset import IMG_EXTS, build_df, sample_per_class
+
+# 부하 테스트에 보낼 이미지 묶음: test.jpg, 데이터셋 샘플, 여러 해상도로 다시 인코딩한 버전
+
+
+def resize_long_side(data: bytes, long_side: int, quality: int = 90) -> bytes:
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    scale = long_side / max(image.size)
+    image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BILINEAR)
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def collect_paths(sources: List[str], per_class: int = 0) -> List[str]:
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths += [str(p) for p in sorted(Path(source).rglob("*")) if p.suffix.lower() in IMG_EXTS]
+        elif source:
+            paths.append(source)
+    if per_class > 0:
+        paths += sample_per_class(build_df(), per_class)["path"].tolist()
+    return paths
+
+
+def build_workload(sources: List[str], per_class: int = 0, resolutions: Optional[List[int]] = None,
+                   seed: int = 42) -> List[tuple]:
+    """
+    (이름, JPEG 바이트) 목록. resolutions의 0은 원본 그대로, 나머지는 긴 변을 그 크기로 맞춰 다시 인코딩.
+    같은 인자면 항상 같은 순서/내용이 되도록 seed로 섞는다.
+    """
+    resolutions = resolutions or [0]
+    items = []
+    for path in collect_paths(sources, per_class):
+        with open(path, "rb") as f:
+            data = f.read()
+        for size in resolutions:
+            name = os.path.basename(path) if size == 0 else f"{Path(path).stem}_{size}.jpg"
+            items.append((name, data if size == 0 else resize_long_side(data, size)))
+    if not items:
+        raise ValueError("벤치마크에 쓸 이미지가 없습니다 (--images / --per-class 확인)")
+    random.Random(seed).shuffle(items)
+    return items
+
+
+def describe(items: List[tuple]) -> dict:
+    sizes = sorted(len(data) for _, data in items)
+    return {"images": len(items), "bytes_median": sizes[len(sizes) // 2], "bytes_max": sizes[-1]}
@@ -0,0 +1,195 @@
+import os
+import csv
+import time
+import argparse
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from PIL import Image
+from torch.utils.data import DataLoader
+
+from dataset import FOLDER_TO_CLASS, NORM_MEAN, NORM_STD, SEED, CustomDataset, build_df, split_df
+
+# gradcam_*.ipynb / AblationCAM.ipynb의 시각화를 배치로 돌려 디스크에 저장하는 스크립트
+
+# ---------- Config ----------
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+CAM_OUTPUT_DIR = os.getenv("CAM_OUTPUT_DIR", "reports/cam")
+CAM_BATCH_SIZE = int(os.getenv("CAM_BATCH_SIZE", "16"))
+CAM_NUM_WORKERS = int(os.getenv("CAM_NUM_WORKERS", "4"))
+
+CAM_METHODS = ("gradcam", "ablationcam")
+
+
+def target_layers(name: str, model: nn.Module) -> List[nn.Module]:
+    # 노트북에서 쓰던 레이어
+    if name == "resnet50":
+        return [model.layer4[-1]]
+    if name in ("efficientnet_b0", "convnext_base"):
+        return [model.features[-1][0]]  # block안에 들어가서 마지막 stage의 첫 block
+    raise ValueError(f"target layer가 정의되지 않은 모델입니다: {name}")
+
+
+def make_cam(method: str, model: nn.Module, layers: List[nn.Module], ablation_batch: int = 64):
+    from pytorch_grad_cam import GradCAM, AblationCAM
+
+    if method == "gradcam":
+        return GradCAM(model=model, target_layers=layers)
+    if method == "ablationcam":
+        cam = AblationCAM(model=model, target_layers=layers)
+        cam.batch_size = ablation_batch  # 채널을 지운 입력을 한 번에 몇 개씩 돌릴지 (노트북은 1)
+        return cam
+    raise ValueError(f"지원하지 않는 CAM 방식입니다: {method} (가능: {CAM_METHODS})")
+
+
+def denormalize_batch(images: torch.Tensor) -> np.ndarray:
+    # (N, 3, H, W) 정규화 텐서 → (N, H, W, 3) 0..1 float32 (show_cam_on_image 입력)
+    mean = torch.tensor(NORM_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(NORM_STD).view(1, 3, 1, 1)
+    return (images.cpu() * std + mean).clamp(0, 1).permute(0, 2, 3, 1).numpy().astype(np.float32)
+
+
+def resolve_classes(names: Optional[str], class_names: List[str]) -> List[str]:
+    """폴더명(종이), 영문 라벨(paper), 인덱스(7) 어느 것으로 지정해도 폴더명 목록으로."""
+    if not names:
+        return list(class_names)
+    english = {v: k for k, v in FOLDER_TO_CLASS.items()}
+    resolved = []
+    for name in names.split(","):
+        name = name.strip()
+        if name.isdigit():
+            resolved.append(class_names[int(name)])
+        else:
+            resolved.append(english.get(name, name))
+    unknown = [n for n in resolved if n not in class_names]
+    if unknown:
+        raise ValueError(f"알 수 없는 클래스: {unknown}")
+    return resolved
+
+
+def make_loader(df: pd.DataFrame, class_to_id: Dict[str, int], img_size: int, batch_size: int,
+                num_workers: int) -> DataLoader:
+    from precision import infer_transforms
+
+    dataset = CustomDataset(df, class_to_id, infer_transforms(img_size), label_col="folder")
+    return DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+
+
+def predict_all(model: nn.Module, loader: DataLoader) -> tuple:
+    # 오분류만 고를 때 쓰는 gradient 없는 배치 예측
+    probs = []
+    with torch.inference_mode():
+        for images, _ in loader:
+            probs.append(torch.softmax(model(images.to(DEVICE)), dim=1).cpu())
+    probs = torch.cat(probs)
+    return probs.argmax(dim=1), probs.max(dim=1).values
+
+
+def select_samples(classes: List[str], per_class: int, only: str, split: str,
+                   batch_size: int, num_workers: int, model: nn.Module, img_size: int,
+                   class_to_id: Dict[str, int]) -> pd.DataFrame:
+    """
+    클래스별 행 번호 index(groupby)로 바로 후보를 뽑는다 (데이터셋 전체를 돌며 라벨을 비교하지 않음).
+    only=misclassified면 후보 전체를 배치로 예측해서 틀린 것만 남긴다.
+    """
+    df = build_df()
+    train_df, test_df = split_df(df)
+    df = (test_df if split == "test" else train_df if split == "train" else df).reset_index(drop=True)
+    label_index = df.groupby("folder").indices
+
+    picked = []
+    rng = np.random.default_rng(SEED)
+    for folder in classes:
+        rows = label_index.get(folder, np.array([], dtype=int))
+        candidates = df.iloc[rows]
+        if only == "misclassified" and len(candidates):
+            preds, _ = predict_all(model, make_loader(candidates, class_to_id, img_size, batch_size, num_workers))
+            candidates = candidates[(preds != class_to_id[folder]).numpy()]
+        if len(candidates) > per_class:
+            candidates = candidates.iloc[np.sort(rng.choice(len(candidates), per_class, replace=False))]
+        print(f"{folder}: {len(rows)}장 중 {len(candidates)}장 선택 ({only})")
+        picked.append(candidates)
+    return pd.concat(picked).reset_index(drop=True) if picked else df.iloc[:0]
+
+
+def cam_report(name: str, classes: Optional[str] = None, per_class: int = 20, only: str = "all",
+               target: str = "true", method: str = "gradcam", split: str = "test",
+               batch_size: int = CAM_BATCH_SIZE, num_workers: int = CAM_NUM_WORKERS,
+               output_dir: str = CAM_OUTPUT_DIR) -> str:
+    """
+    선택한 이미지들의 CAM 오버레이(원본 | 히트맵)를 클래스 폴더별로 저장하고 index.csv에 요약한다.
+    예측값은 CAM 계산 때의 forward 출력(cam.outputs)을 그대로 써서 모델을 한 번 더 돌리지 않는다.
+    """
+    from pytorch_grad_cam.utils.image import show_cam_on_image
+    from pytorch_grad_cam.utils.model_targets import ClassifierOutputTarget
+    from model_loader import build_from_checkpoint
+    from model_registry import BACKENDS
+
+    backend = BACKENDS[name]
+    class_names = backend.class_names
+    class_to_id = {c: i for i, c in enumerate(class_names)}
+    # gradient가 필요하므로 mmap/TorchScript/양자화 없이 fp32 모델로
+    model = build_from_checkpoint(backend.builder, len(class_names), backend.weights_path, mmap=False).to(DEVICE).eval()
+
+    selected = select_samples(resolve_classes(classes, class_names), per_class, only, split,
+                              batch_size, num_workers, model, backend.img_size, class_to_id)
+    out_root = os.path.join(output_dir, f"{name}_{method}_{split}_{only}")
+    os.makedirs(out_root, exist_ok=True)
+    cam = make_cam(method, model, target_layers(name, model))
+
+    loader = make_loader(selected, class_to_id, backend.img_size, batch_size, num_workers)
+    rows, offset = [], 0
+    start = time.perf_counter()
+    for images, labels in loader:
+        images = images.to(DEVICE)
+        if target == "true":
+            targets = [ClassifierOutputTarget(int(label)) for label in labels]
+        else:
+            targets = None  # None이면 pytorch_grad_cam이 예측 클래스(argmax)에 대한 CAM을 계산
+        grayscale = cam(input_tensor=images, targets=targets)  # (N, H, W), 배치 전체를 한 번에
+        probs = torch.softmax(cam.outputs.detach().float(), dim=1).cpu()
+        rgb = denormalize_batch(images)
+
+        for j in range(len(labels)):
+            path = selected["path"].iat[offset + j]
+            true_id, pred_id = int(labels[j]), int(probs[j].argmax())
+            overlay = show_cam_on_image(rgb[j], grayscale[j], use_rgb=True)
+            panel = np.hstack([(rgb[j] * 255).astype(np.uint8), overlay])
+            rel = os.path.join(class_names[true_id], f"{offset + j:05d}_{os.path.splitext(os.path.basename(path))[0]}.jpg")
+            os.makedirs(os.path.join(out_root, class_names[true_id]), exist_ok=True)
+            Image.fromarray(panel).save(os.path.join(out_root, rel), quality=90)
+            rows.append({"path": path, "overlay": rel, "true": class_names[true_id], "pred": class_names[pred_id],
+                         "pred_prob": round(float(probs[j, pred_id]), 4), "true_prob": round(float(probs[j, true_id]), 4),
+                         "correct": true_id == pred_id,
+                         "cam_target": class_names[true_id] if target == "true" else class_names[pred_id]})
+        offset += len(labels)
+
+    index_path = os.path.join(out_root, "index.csv")
+    with open(index_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["path"])
+        writer.writeheader()
+        writer.writerows(rows)
+    elapsed = time.perf_counter() - start
+    print(f"CAM {len(rows)}장 저장: {out_root} ({elapsed:.1f}s, {len(rows) / max(elapsed, 1e-9):.1f} img/s)")
+    return index_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="클래스별 Grad-CAM / AblationCAM 오버레이를 배치로 생성")
+    parser.add_argument("model", choices=["resnet50", "efficientnet_b0", "convnext_base"])
+    parser.add_argument("--classes", default=None, help="쉼표로 구분 (폴더명, 영문 라벨 또는 인덱스), 기본: 전체")
+    parser.add_argument("--per-class", type=int, default=20, help="클래스별 최대 이미지 수")
+    parser.add_argument("--only", choices=["all", "misclassified"], default="all")
+    parser.add_argument("--target", choices=["true", "pred"], default="true", help="CAM을 계산할 클래스 (정답 / 예측)")
+    parser.add_argument("--method", choices=CAM_METHODS, default="gradcam")
+    parser.add_argument("--split", choices=["test", "train", "all"], default="test")
+    parser.add_argument("--batch-size", type=int, default=CAM_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=CAM_NUM_WORKERS)
+    parser.add_argument("--output", default=CAM_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    cam_report(args.model, args.classes, args.per_class, args.only, args.target, args.method, args.split,
+               args.batch_size, args.workers, args.output)
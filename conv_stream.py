@@ -1,7 +1,10 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 import io
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import altair as alt
 
@@ -9,6 +12,14 @@ import altair as alt
 # 만약 로컬에서 실행 중이라면, http://127.0.0.1:8000 과 같이 사용합니다.
 # Docker 컨테이너에서 실행하는 경우, 컨테이너 이름이나 IP 주소를 사용해야 할 수 있습니다.
 FASTAPI_URL = "http://localhost:8080"
+REQUEST_TIMEOUT = 10
+# 서버가 이 시간 안에 처리하지 못하면 어차피 결과를 안 쓰므로 deadline을 같이 보내 서버가 버리도록 함
+DEADLINE_HEADERS = {"X-Request-Timeout-Ms": str(REQUEST_TIMEOUT * 1000)}
+# 서버 모델 입력 크기 (app_convN: 224). 업로드 전에 짧은 변을 이 크기로 줄여 JPEG으로 다시 인코딩 (0이면 원본 전송)
+UPLOAD_IMG_SIZE = int(os.getenv("UPLOAD_IMG_SIZE", "224"))
+UPLOAD_JPEG_QUALITY = int(os.getenv("UPLOAD_JPEG_QUALITY", "90"))
+# 1이면 기존처럼 4장을 한 번의 /predict/batch 요청으로, 0이면 4장을 동시에 /predict로 보내 도착하는 대로 표시
+CLIENT_BATCH_MODE = os.getenv("CLIENT_BATCH_MODE", "0") == "1"
 
 st.set_page_config(
     page_title="AI 재활용 분류기 실험 머신",
@@ -86,18 +97,67 @@ st.markdown(
 )
 
 
-def predict_image(uploaded_file):
-    # 업로드된 이미지를 FastAPI 서버로 전송하고 결과를 반환함
+@st.cache_resource
+def get_session():
+    # 매 요청마다 새 연결을 맺지 않도록 keep-alive 연결을 재사용하는 세션 (4장 동시 전송용 풀)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def prepare_upload(uploaded_file):
+    # 서버가 어차피 입력 크기로 줄이므로, 짧은 변을 UPLOAD_IMG_SIZE로 줄이고 JPEG으로 다시 인코딩해서 전송량을 줄임
+    # (서버는 가로/세로를 각각 입력 크기로 맞추므로 짧은 변 기준으로 줄이면 서버 결과와 같은 해상도가 유지됨)
+    data = uploaded_file.getvalue()
+    if UPLOAD_IMG_SIZE <= 0:
+        return (uploaded_file.name, data, uploaded_file.type)
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.format == "JPEG" and min(img.size) <= UPLOAD_IMG_SIZE:
+            return (uploaded_file.name, data, uploaded_file.type)
+        img.draft("RGB", (UPLOAD_IMG_SIZE, UPLOAD_IMG_SIZE))  # JPEG이면 축소 디코딩
+        img = img.convert("RGB")
+        scale = UPLOAD_IMG_SIZE / min(img.size)
+        if scale < 1:
+            img = img.resize((round(img.width * scale), round(img.height * scale)), Image.BILINEAR)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=UPLOAD_JPEG_QUALITY)
+    except Exception:
+        # 열 수 없는 이미지면 원본 그대로 보내고 서버의 오류 메시지를 받음
+        return (uploaded_file.name, data, uploaded_file.type)
+    return (os.path.splitext(uploaded_file.name)[0] + ".jpg", buf.getvalue(), "image/jpeg")
+
+
+def predict_image(upload):
+    # (파일명, 바이트, MIME) 한 장을 FastAPI 서버로 전송하고 결과를 반환함
+    # worker thread에서 호출되므로 여기서는 st.error를 쓰지 않고 예외를 그대로 올림
+    response = get_session().post(f"{FASTAPI_URL}/predict", files={'file': upload},
+                                  headers=DEADLINE_HEADERS, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status() # HTTP 예외처리
+    return response.json()
+
+
+def predict_concurrently(uploads):
+    # {슬롯 번호: 업로드} → 응답이 도착하는 순서대로 (슬롯 번호, 결과 또는 None, 오류) 생성
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = {pool.submit(predict_image, upload): i for i, upload in uploads.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except requests.exceptions.RequestException as e:
+                yield futures[future], None, e
+
+
+def predict_images(uploads):
+    # 여러 장을 한 번의 multipart 요청(/predict/batch)으로 보내고, 입력 순서대로 결과 리스트를 반환함
     try:
-        # FastAPI 엔드포인트로 POST 요청 전송
-        # 파일명과 MIME 타입을 함께 전달합니다.
-        files = {
-            'file': (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)
-        }
-        response = requests.post(f"{FASTAPI_URL}/predict", files=files, timeout=10)
+        files = [('files', upload) for upload in uploads]
+        response = get_session().post(f"{FASTAPI_URL}/predict/batch", files=files, headers=DEADLINE_HEADERS, timeout=REQUEST_TIMEOUT)
         response.raise_for_status() # HTTP 예외처리
 
-        return response.json()
+        return response.json()['results']
     except requests.exceptions.RequestException as e:
         st.error(f"서버에 연결할 수 없습니다: {e}")
         return None
@@ -206,48 +266,60 @@ with tab1:
 
     # 예측 버튼 클릭시
     if run_pred:
-        with st.spinner("예측 중..."):
-            summary_rows = []
-            slots = [
-                ("좌상", file_tl), ("우상", file_tr), ("좌하", file_bl), ("우하", file_br)
-            ]
-            
-            #예측 결과를 저장할 리스트
-            all_predictions = []
-
-            for label, f in slots:
-                if f is None:
-                    # 파일이 없는 경우 빈 예측 결과를 추가
-                    all_predictions.append({"label": label, "predictions": []})
-                    continue
-                
-                result = predict_image(f)
-                if not result or 'predictions' not in result:
-                    # 예측 결과가 없는 경우 빈 예측 결과를 추가
-                    all_predictions.append({"label": label, "predictions": []})
-                    continue
-                
-                predictions_list = result['predictions']
-                all_predictions.append({'label': label, 'predictions':predictions_list})
-
-                #결과 요약 테이블 데이터 생성(1순위 예측 결과만 사용)
-                if predictions_list:
-                    top_pred = predictions_list[0]
-                    name = top_pred.get("name")
-                    score_percent = top_pred.get("score") * 100
-                    summary_rows.append({"위치": label, "예측": name or "-", "점수(%)": f"{score_percent:.2f}"})
-
-                else:
-                    summary_rows.append({"위치": label, "예측": "-", "점수(%)": "0.00"})
+        slots = [
+            ("좌상", file_tl, top_cols[0]), ("우상", file_tr, top_cols[1]),
+            ("좌하", file_bl, bottom_cols[0]), ("우하", file_br, bottom_cols[1])
+        ]
+        # 결과 카드 자리를 미리 만들어두고 응답이 오는 순서대로 채움
+        cards = [col.empty() for _, _, col in slots]
+        results = [None] * len(slots)
+
+        def show_card(i):
+            label = slots[i][0]
+            predictions_list = (results[i] or {}).get('predictions') or []
+            top_pred = predictions_list[0] if predictions_list else {}
+            with cards[i].container():
+                render_result_card(label, top_pred.get("name"), (top_pred.get("score") or 0) * 100)
 
-            st.session_state['all_predictions'] = all_predictions
-            st.session_state['summary_rows'] = summary_rows
-
-            # 예측 결과를 각 컬럼에 렌더링
-            with top_cols[0]: render_result_card("좌상", summary_rows[0]["예측"], float(summary_rows[0]["점수(%)"]))
-            with top_cols[1]: render_result_card("우상", summary_rows[1]["예측"], float(summary_rows[1]["점수(%)"]))
-            with bottom_cols[0]: render_result_card("좌하", summary_rows[2]["예측"], float(summary_rows[2]["점수(%)"]))
-            with bottom_cols[1]: render_result_card("우하", summary_rows[3]["예측"], float(summary_rows[3]["점수(%)"]))
+        with st.spinner("예측 중..."):
+            # 업로드된 이미지만 입력 크기로 줄여서 전송
+            uploads = {i: prepare_upload(f) for i, (_, f, _) in enumerate(slots) if f is not None}
+
+            if CLIENT_BATCH_MODE:
+                # 한 번의 요청으로 예측 (CLIENT_BATCH_MODE=1)
+                batch_results = predict_images(list(uploads.values())) if uploads else []
+                for i, result in zip(uploads, batch_results or []):
+                    results[i] = result
+                    show_card(i)
+            else:
+                # 4장을 동시에 보내고 먼저 끝난 카드부터 표시
+                for i, result, error in predict_concurrently(uploads):
+                    if error is not None:
+                        st.error(f"{slots[i][0]}: 서버에 연결할 수 없습니다: {error}")
+                    results[i] = result
+                    show_card(i)
+
+        #예측 결과를 저장할 리스트
+        all_predictions = []
+        summary_rows = []
+        for i, (label, f, _) in enumerate(slots):
+            predictions_list = (results[i] or {}).get('predictions') or []
+            all_predictions.append({'label': label, 'predictions': predictions_list})
+
+            #결과 요약 테이블 데이터 생성(1순위 예측 결과만 사용)
+            if predictions_list:
+                top_pred = predictions_list[0]
+                name = top_pred.get("name")
+                score_percent = top_pred.get("score") * 100
+                summary_rows.append({"위치": label, "예측": name or "-", "점수(%)": f"{score_percent:.2f}"})
+            else:
+                summary_rows.append({"위치": label, "예측": "-", "점수(%)": "0.00"})
+            if f is None or results[i] is None:
+                # 파일이 없거나 예측 결과가 없는 칸은 빈 카드
+                show_card(i)
+
+        st.session_state['all_predictions'] = all_predictions
+        st.session_state['summary_rows'] = summary_rows
 
 
             #     name = result.get("name") or result.get("label") or result.get("class")
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import argparse
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import cv2
+from PIL import Image
+
+# Crop.ipynb의 rembg 배경 제거 + 자동 크롭을 스크립트로 옮기고, 여러 프로세스로 나눠 돌릴 수 있게 함
+
+# ---------- Config ----------
+CROP_INPUT_ROOT = os.getenv("CROP_INPUT_ROOT", "data/Dataset_project4")         # 원본 루트
+CROP_OUTPUT_ROOT = os.getenv("CROP_OUTPUT_ROOT", "data/Dataset_project4_crop")  # 결과 루트
+CROP_WORKERS = int(os.getenv("CROP_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))  # rembg 자체도 멀티스레드라 코어 절반
+CROP_REMBG_MODEL = os.getenv("CROP_REMBG_MODEL", "u2net")
+CROP_EXCLUDE = [s.strip() for s in os.getenv("CROP_EXCLUDE", "비닐").split(",") if s.strip()]  # 제외할 클래스(폴더)들
+
+IMG_EXTS = {".jpg",".jpeg",".png",".bmp",".webp"}
+MANIFEST_NAME = "_crop_manifest.jsonl"
+
+
+def largest_component_bbox(mask: np.ndarray, min_area_ratio=0.002):
+    # mask: 0/255
+    num, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if num <= 1:
+        return None
+    H, W = mask.shape
+    area_min = H*W*min_area_ratio
+    lid, best = None, 0
+    for i in range(1, num):
+        a = stats[i, cv2.CC_STAT_AREA]
+        if a >= area_min and a > best:
+            lid, best = i, a
+    if lid is None:
+        return None
+    x, y, w, h, _ = stats[lid]
+    return x, y, x+w, y+h
+
+
+def expand_box(x1,y1,x2,y2, pad_ratio, W,H):
+    w, h = x2-x1, y2-y1
+    px, py = int(w*pad_ratio), int(h*pad_ratio)
+    return max(0,x1-px), max(0,y1-py), min(W,x2+px), min(H,y2+py)
+
+
+def letterbox_resize_rgb(rgb: np.ndarray, size=512, fill=(255,255,255)):
+    H, W = rgb.shape[:2]
+    s = min(size/W, size/H)
+    nw, nh = int(W*s), int(H*s)
+    resized = cv2.resize(rgb, (nw, nh), interpolation=cv2.INTER_CUBIC)
+    canvas = np.full((size, size, 3), fill, dtype=np.uint8)
+    x0, y0 = (size-nw)//2, (size-nh)//2
+    canvas[y0:y0+nh, x0:x0+nw] = resized
+    return canvas
+
+
+def auto_crop_rembg(img_path: Path, pad_ratio=0.08, out_size=512, session=None):
+    from rembg import remove
+
+    im = Image.open(img_path).convert("RGBA")
+    # session을 넘기지 않으면 rembg가 호출마다 모델 세션을 새로 만듦
+    rgba = remove(im, session=session)
+
+    # 1. 알파 채널
+    alpha = np.array(rgba.split()[-1])
+
+    # 2. 테두리 다듬기
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,(3,3))
+    alpha = cv2.erode(alpha, kernel, iterations=1)
+    alpha = cv2.GaussianBlur(alpha,(5,5),0)
+
+    # 3. 알파 적용한 RGB
+    rgb = np.array(rgba)[:,:,:3]
+    mask = alpha.astype(np.float32)/255.0
+    rgb = (rgb*mask[...,None] + 255*(1-mask[...,None])).astype(np.uint8)
+
+    # 4. 마스크로 bbox 추출
+    mask_bin = (alpha > 0).astype(np.uint8)*255
+    bbox = largest_component_bbox(mask_bin, min_area_ratio=0.001)
+    if bbox is None:
+        return None
+
+    x1,y1,x2,y2 = expand_box(*bbox, pad_ratio, rgb.shape[1], rgb.shape[0])
+    crop = rgb[y1:y2, x1:x2]
+    return letterbox_resize_rgb(crop, size=out_size)
+
+
+# ---------- 병렬 / 재시작 가능한 일괄 크롭 ----------
+_session = None
+
+
+def _init_worker(model_name: str):
+    # worker 프로세스마다 rembg 세션을 한 번만 로드해서 모든 파일에 재사용
+    global _session
+    from rembg import new_session
+
+    _session = new_session(model_name)
+
+
+def _crop_one(job: tuple) -> dict:
+    src, out_path, pad_ratio, out_size = job
+    start = time.perf_counter()
+    record = {"src": src, "out": out_path, "mtime_ns": None}
+    try:
+        # 실행 중에 지워지거나 읽을 수 없게 된 파일도 전체 실행을 멈추지 않고 manifest에 error로 남김
+        record["mtime_ns"] = os.stat(src).st_mtime_ns
+        out = auto_crop_rembg(Path(src), pad_ratio=pad_ratio, out_size=out_size, session=_session)
+        if out is None:
+            record.update(status="fail", reason="전경(가장 큰 연결 영역)을 찾지 못함")
+        else:
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            Image.fromarray(out).save(out_path + ".tmp", format="JPEG", quality=95)
+            os.replace(out_path + ".tmp", out_path)
+            record.update(status="ok")
+    except Exception as e:
+        record.update(status="error", reason=f"{type(e).__name__}: {e}")
+    record["sec"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def load_manifest(path: str) -> dict:
+    """src → 마지막 기록. 중간에 끊겨서 잘린 마지막 줄은 무시."""
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[record["src"]] = record
+    return done
+
+
+def crop_dataset(input_root: str = CROP_INPUT_ROOT, output_root: str = CROP_OUTPUT_ROOT,
+                 workers: int = CROP_WORKERS, model_name: str = CROP_REMBG_MODEL,
+                 exclude: Optional[list] = None, pad_ratio: float = 0.08, out_size: int = 512,
+                 retry_failed: bool = False) -> dict:
+    """
+    input_root의 클래스 폴더 구조 그대로 output_root에 크롭 결과(.jpg)를 저장한다.
+    처리 결과는 output_root/_crop_manifest.jsonl에 한 줄씩 추가되므로, 다시 실행하면 원본이 바뀌지 않은 파일은 건너뛴다.
+    """
+    exclude = set(CROP_EXCLUDE if exclude is None else exclude)
+    input_root, output_root = Path(input_root), Path(output_root)
+    output_root.mkdir(parents=True, exist_ok=True)
+    manifest_path = str(output_root / MANIFEST_NAME)
+    done = load_manifest(manifest_path)
+
+    jobs, skipped = [], 0
+    for img_path in sorted(input_root.rglob("*")):
+        if img_path.suffix.lower() not in IMG_EXTS:
+            continue
+        rel = img_path.relative_to(input_root)
+        # 최상위 폴더명이 클래스명이라고 가정
+        if rel.parts[0] in exclude:
+            continue
+        src = str(img_path)
+        out_path = str((output_root / rel).with_suffix(".jpg"))
+        prev = done.get(src)
+        if prev and prev["mtime_ns"] == img_path.stat().st_mtime_ns and (
+                (prev["status"] == "ok" and os.path.exists(out_path)) or (prev["status"] != "ok" and not retry_failed)):
+            skipped += 1
+            continue
+        jobs.append((src, out_path, pad_ratio, out_size))
+
+    print(f"처리 대상 {len(jobs)}장, 이미 처리됨 {skipped}장, 제외 클래스 {sorted(exclude)}, workers={workers}")
+    counts = {"ok": 0, "fail": 0, "error": 0}
+    start = time.perf_counter()
+    if not jobs:
+        return {**counts, "skipped": skipped, "elapsed_sec": 0.0, "images_per_sec": 0.0, "output_root": str(output_root)}
+    with open(manifest_path, "a", encoding="utf-8") as manifest, \
+            Pool(max(1, workers), initializer=_init_worker, initargs=(model_name,)) as pool:
+        for n, record in enumerate(pool.imap_unordered(_crop_one, jobs), 1):
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+            counts[record["status"]] += 1
+            if record["status"] != "ok":
+                print(f"{record['status']}: {record['src']} ({record['reason']})")
+            if n % 100 == 0 or n == len(jobs):
+                elapsed = time.perf_counter() - start
+                print(f"[{n}/{len(jobs)}] {n / elapsed:.2f} img/s, 남은 시간 약 {(len(jobs) - n) / (n / elapsed):.0f}s")
+
+    elapsed = time.perf_counter() - start
+    summary = {**counts, "skipped": skipped, "elapsed_sec": round(elapsed, 1),
+               "images_per_sec": round(len(jobs) / elapsed, 2) if elapsed > 0 else 0.0, "output_root": str(output_root)}
+    print(f"완료: success={counts['ok']}, fail={counts['fail']}, error={counts['error']}, skipped={skipped}, "
+          f"{summary['images_per_sec']} img/s, 저장 위치={output_root}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="rembg 배경 제거 + 자동 크롭을 데이터셋 전체에 병렬로 적용")
+    parser.add_argument("--input", default=CROP_INPUT_ROOT)
+    parser.add_argument("--output", default=CROP_OUTPUT_ROOT)
+    parser.add_argument("--workers", type=int, default=CROP_WORKERS)
+    parser.add_argument("--model", default=CROP_REMBG_MODEL, help="rembg 모델 이름 (u2net, u2netp, isnet-general-use ...)")
+    parser.add_argument("--exclude", default=",".join(CROP_EXCLUDE), help="쉼표로 구분한 제외 클래스 폴더")
+    parser.add_argument("--pad-ratio", type=float, default=0.08)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--retry-failed", action="store_true", help="이전에 실패한 파일도 다시 시도")
+    args = parser.parse_args()
+
+    crop_dataset(args.input, args.output, args.workers, args.model,
+                 [s for s in args.exclude.split(",") if s], args.pad_ratio, args.size, args.retry_failed)
@@ -0,0 +1,99 @@
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+from PIL import Image
+from sklearn.model_selection import train_test_split
+from torch.utils.data import Dataset
+
+# 노트북(Mymodel_ResNet50.ipynb, ResNet50_Use_Optuna.ipynb)에서 쓰던 데이터셋 정의를 스크립트에서도 쓸 수 있게 모아둠
+ROOT = Path(os.getenv("DATA_ROOT", "data/Dataset_project4"))
+SEED = 42
+
+CLASS_NAMES = [
+    "metal_can_steel","metal_can_aluminum","paper",
+    "pet_clear","pet_colored",
+    "plastic_pe","plastic_pp","plastic_ps",
+    "styrofoam","vinyl",
+    "glass_brown","glass_green","glass_clear"
+]
+CLASS_TO_ID = {c:i for i,c in enumerate(CLASS_NAMES)}
+
+IMG_EXTS = {".jpg",".jpeg",".png",".bmp",".webp"}
+
+NORM_MEAN = [0.485, 0.456, 0.406]
+NORM_STD = [0.229, 0.224, 0.225]
+
+# 클래스 폴더 이름과 실제 클래스 이름을 매핑
+FOLDER_TO_CLASS = {
+    "금속캔알루미늄캔": "metal_can_aluminum",
+    "금속캔철캔": "metal_can_steel",
+    "비닐": "vinyl",
+    "스티로폼": "styrofoam",
+    "유리병갈색": "glass_brown",
+    "유리병녹색": "glass_green",
+    "유리병투명": "glass_clear",
+    "종이": "paper",
+    "페트병무색단일": "pet_clear",
+    "페트병유색단일": "pet_colored",
+    "플라스틱PE": "plastic_pe",
+    "플라스틱PP": "plastic_pp",
+    "플라스틱PS": "plastic_ps"
+}
+
+
+def build_df(root: Path = ROOT) -> pd.DataFrame:
+    """클래스 폴더를 돌며 (path, label, folder) 표를 만든다. folder는 서빙 앱의 CLASS_NAMES(한글 폴더명)와 같다."""
+    paths, labels, folders = [], [], []
+
+    # 루트 폴더의 각 하위 폴더를 탐색
+    for folder_path in sorted(Path(root).iterdir()):
+        if folder_path.is_dir() and folder_path.name in FOLDER_TO_CLASS:
+            class_name = FOLDER_TO_CLASS[folder_path.name]
+
+            # 해당 클래스 폴더 내의 모든 이미지 파일 탐색
+            for img_path in sorted(folder_path.rglob("*")):
+                if img_path.suffix.lower() in IMG_EXTS:
+                    paths.append(str(img_path))
+                    labels.append(class_name)
+                    folders.append(folder_path.name)
+
+    return pd.DataFrame({"path": paths, "label": labels, "folder": folders})
+
+
+def split_df(df: pd.DataFrame, test_size: float = 0.2, seed: int = SEED) -> tuple:
+    # 노트북과 같은 분할 (stratify, random_state=42)
+    return train_test_split(df, test_size=test_size, random_state=seed, stratify=df['label'])
+
+
+def sample_per_class(df: pd.DataFrame, n: int, seed: int = SEED) -> pd.DataFrame:
+    # 클래스별로 최대 n개씩 샘플링
+    return (
+        df.groupby('label', group_keys=False)
+        .apply(lambda x: x.sample(n=min(len(x), n), random_state=seed))
+        .reset_index(drop=True)
+    )
+
+
+class CustomDataset(Dataset):
+    """
+    (path, label) 표 → (이미지 텐서, 라벨 id).
+    label_col="folder"와 서빙 앱의 클래스 순서를 class_to_id로 주면 서빙 모델 평가에도 쓸 수 있다.
+    """
+
+    def __init__(self, df: pd.DataFrame, class_to_id: Dict[str, int] = CLASS_TO_ID,
+                 transform: Optional[object] = None, label_col: str = "label"):
+        # df.iloc를 매번 호출하지 않도록 리스트로 미리 꺼내둠
+        self.paths = df['path'].tolist()
+        self.labels = [class_to_id[name] for name in df[label_col]]
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        image = Image.open(self.paths[idx]).convert('RGB')
+        if self.transform:
+            image = self.transform(image)
+        return image, self.labels[idx]
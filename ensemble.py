@@ -0,0 +1,117 @@
+import os
+import asyncio
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from metrics import stage
+from model_registry import ModelRegistry, ModelService, decode_image, topk_predictions
+
+# ---------- Config ----------
+# 가벼운 모델부터 순서대로 실행하고, top-1 확률이 임계값보다 낮은 이미지만 다음 모델로 넘김
+CASCADE_MODELS = [s.strip() for s in os.getenv("CASCADE_MODELS", "efficientnet_b0,convnext_base").split(",") if s.strip()]
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.8"))  # streamlit_Mymodel.py의 80% 신뢰 구간과 동일
+# 전체 앙상블: 모델별 softmax 확률의 (가중) 평균
+ENSEMBLE_MODELS = [s.strip() for s in os.getenv("ENSEMBLE_MODELS", "efficientnet_b0,convnext_base,resnet50").split(",") if s.strip()]
+ENSEMBLE_WEIGHTS = [float(w) for w in os.getenv("ENSEMBLE_WEIGHTS", "").split(",") if w.strip()]
+
+
+def decode_uploads(uploads: List[tuple], draft_size: Optional[int] = None, label: str = "ensemble") -> list:
+    # 여러 모델이 같은 이미지를 쓰므로 디코딩은 한 번만 (입력 크기가 가장 큰 모델 기준으로 축소 디코딩)
+    images = []
+    for data, filename in uploads:
+        with stage(label, "decode"):
+            images.append(decode_image(data, filename, draft_size))
+    return images
+
+
+def check_members(registry: ModelRegistry, names: List[str], env_name: str):
+    # 요청마다 500이 나지 않도록 시작할 때 모델 이름과 클래스 목록을 확인 (모델을 로드하지 않고 backend 정의로)
+    unknown = [name for name in names if name not in registry.backends]
+    if unknown:
+        raise ValueError(f"{env_name}에 등록되지 않은 모델이 있습니다: {unknown} (가능: {list(registry.backends)})")
+    class_names = registry.backends[names[0]].class_names
+    for name in names[1:]:
+        if registry.backends[name].class_names != class_names:
+            raise ValueError(f"클래스 목록이 다른 모델은 함께 쓸 수 없습니다: {names[0]}, {name}")
+
+
+def max_img_size(registry: ModelRegistry, names: List[str]) -> int:
+    return max(registry.backends[name].img_size for name in names)
+
+
+async def get_services(registry: ModelRegistry, names: List[str]) -> List[ModelService]:
+    # 이름/클래스 목록은 생성 시 check_members에서 이미 확인함
+    return [await run_in_threadpool(registry.get, name) for name in names]
+
+
+class CascadePredictor:
+    """
+    EfficientNet-B0 같은 가벼운 모델로 먼저 분류하고, 확신이 낮은(top-1 < threshold) 이미지만
+    ConvNeXt/ResNet50 같은 큰 모델로 다시 분류한다. 대부분 쉬운 프레임이면 큰 모델은 거의 돌지 않는다.
+    """
+
+    def __init__(self, registry: ModelRegistry, stages: List[str] = CASCADE_MODELS,
+                 threshold: float = CASCADE_THRESHOLD):
+        if not stages:
+            raise ValueError("CASCADE_MODELS가 비어 있습니다")
+        check_members(registry, stages, "CASCADE_MODELS")
+        self.registry = registry
+        self.stages = stages
+        self.threshold = threshold
+
+    async def predict(self, uploads: List[tuple], deadline: Optional[float] = None) -> List[dict]:
+        images = await run_in_threadpool(decode_uploads, uploads, max_img_size(self.registry, self.stages), "cascade")
+        first = await run_in_threadpool(self.registry.get, self.stages[0])
+        for data, filename in uploads:
+            first.upload_writer.submit(data, filename)
+
+        results = [None] * len(uploads)
+        trails = [[] for _ in uploads]
+        pending = list(range(len(uploads)))
+        for name in self.stages:
+            service = await run_in_threadpool(self.registry.get, name)
+            score_tensors = await service.predict_images([images[i] for i in pending], deadline)
+            for i, score_tensor in zip(pending, score_tensors):
+                trails[i].append(name)
+                results[i] = {"predictions": service.topk_predictions(score_tensor), "model": name, "stages": trails[i]}
+
+            # 마지막 단계가 아니면 확신이 낮은 이미지만 다음 모델로
+            pending = [i for i, score_tensor in zip(pending, score_tensors)
+                       if score_tensor.max().item() < self.threshold]
+            if not pending:
+                break
+        return results
+
+
+class EnsemblePredictor:
+    """지정한 모델들을 모두 돌려 softmax 확률을 (가중) 평균한다."""
+
+    def __init__(self, registry: ModelRegistry, members: List[str] = ENSEMBLE_MODELS,
+                 weights: List[float] = ENSEMBLE_WEIGHTS):
+        if not members:
+            raise ValueError("ENSEMBLE_MODELS가 비어 있습니다")
+        if weights and len(weights) != len(members):
+            raise ValueError(f"ENSEMBLE_WEIGHTS 개수({len(weights)})가 ENSEMBLE_MODELS 개수({len(members)})와 다릅니다")
+        if weights and (any(w < 0 for w in weights) or sum(weights) <= 0):
+            raise ValueError(f"ENSEMBLE_WEIGHTS는 0 이상이고 합이 0보다 커야 합니다: {weights}")
+        check_members(registry, members, "ENSEMBLE_MODELS")
+        self.registry = registry
+        self.members = members
+        weights = weights or [1.0] * len(members)
+        self.weights = [w / sum(weights) for w in weights]
+
+    async def predict(self, uploads: List[tuple], deadline: Optional[float] = None) -> List[dict]:
+        images = await run_in_threadpool(decode_uploads, uploads, max_img_size(self.registry, self.members))
+        services = await get_services(self.registry, self.members)
+        for data, filename in uploads:
+            services[0].upload_writer.submit(data, filename)
+
+        # 모델별 배치 스케줄러/worker thread가 따로 있으므로 동시에 실행
+        per_model = await asyncio.gather(*(service.predict_images(images, deadline) for service in services))
+        results = []
+        for i in range(len(uploads)):
+            score_tensor = sum(w * scores[i] for w, scores in zip(self.weights, per_model))
+            results.append({"predictions": topk_predictions(score_tensor, services[0].class_names, services[0].top_k),
+                            "model": "ensemble", "stages": self.members})
+        return results
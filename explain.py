@@ -0,0 +1,152 @@
+import io
+import os
+import time
+import base64
+import asyncio
+import threading
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+
+from batching import DeadlineExceeded
+from cam_report import target_layers
+from dataset import NORM_MEAN, NORM_STD
+from precision import PrecisionModel
+from prediction_cache import PredictionCache, cache_namespace
+
+# ---------- Config ----------
+EXPLAIN_MAX_CONCURRENT = int(os.getenv("EXPLAIN_MAX_CONCURRENT", "1"))   # 모델별 동시에 실행할 gradient 계산 수
+EXPLAIN_MAX_WAITING = int(os.getenv("EXPLAIN_MAX_WAITING", "4"))         # 이보다 많이 기다리고 있으면 429
+EXPLAIN_CACHE_ENTRIES = int(os.getenv("EXPLAIN_CACHE_ENTRIES", "256"))   # 히트맵 PNG 캐시 항목 수 (0이면 끔)
+
+
+class Explainer:
+    """
+    서빙 중인 모델로 Grad-CAM을 계산한다.
+
+    target layer에 forward hook을 한 번만 걸어두고, explain을 호출한 스레드에서만 activation을 잡는다.
+    그래서 같은 모델로 /predict 배치가 동시에 돌아도 서로 섞이지 않는다.
+    TorchScript/INT8/ONNX처럼 gradient를 낼 수 없는 모델이면 처음 호출될 때 체크포인트로 fp32 모델을 따로 만든다.
+    """
+
+    def __init__(self, service, max_concurrent: int = EXPLAIN_MAX_CONCURRENT,
+                 max_waiting: int = EXPLAIN_MAX_WAITING, cache_entries: int = EXPLAIN_CACHE_ENTRIES):
+        self.service = service
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._waiting = 0
+        self._local = threading.local()
+        self._model = None
+        self._load_lock = threading.Lock()
+        backend = service.backend
+        self.cache = PredictionCache(cache_namespace(f"{backend.name}-gradcam", backend.weights_path, backend.img_size),
+                                     max_entries=cache_entries, disk_path="")
+
+        model = service.model.model if isinstance(service.model, PrecisionModel) else service.model
+        if not isinstance(model, torch.jit.ScriptModule) and any(p.is_floating_point() for p in model.parameters()):
+            # 서비스가 로드한 모델을 그대로 씀 (요청이 들어오기 전인 로드 시점에 hook 등록)
+            self._attach(model)
+
+    def _attach(self, model: nn.Module):
+        target_layers(self.service.name, model)[0].register_forward_hook(self._capture)
+        self._model = model
+
+    def _capture(self, module, inputs, output):
+        if getattr(self._local, "active", False):
+            self._local.activation = output
+
+    def _get_model(self) -> nn.Module:
+        with self._load_lock:
+            if self._model is None:
+                from model_loader import build_from_checkpoint
+
+                backend = self.service.backend
+                model = build_from_checkpoint(backend.builder, len(backend.class_names), backend.weights_path)
+                self._attach(model.to(self.service.device).eval())
+            return self._model
+
+    def grad_cam(self, x: torch.Tensor, target: Optional[int] = None) -> tuple:
+        """(1, 3, H, W) 입력 → (H, W) 0..1 히트맵, softmax 확률, CAM을 계산한 클래스."""
+        model = self._get_model()
+        self._local.active = True
+        try:
+            with torch.enable_grad():
+                # 가중치가 requires_grad=False여도 그래프가 만들어지도록 입력에 gradient를 켬
+                x = x.to(self.service.device).requires_grad_(True)
+                logits = model(x).float()
+                activation = self._local.activation
+                cls = int(logits.argmax(dim=1)) if target is None else target
+                grads = torch.autograd.grad(logits[0, cls], activation)[0]
+        finally:
+            self._local.active = False
+            self._local.activation = None
+
+        weights = grads.mean(dim=(2, 3), keepdim=True)
+        cam = torch.relu((weights * activation.detach()).sum(dim=1, keepdim=True).float())
+        cam = F.interpolate(cam, size=x.shape[-2:], mode="bilinear", align_corners=False)[0, 0]
+        cam = (cam - cam.min()) / (cam.max() - cam.min() + 1e-8)
+        return cam.cpu().numpy(), torch.softmax(logits.detach(), dim=1)[0].cpu(), cls
+
+    def explain_sync(self, data: bytes, filename: str, target: Optional[int] = None) -> dict:
+        from pytorch_grad_cam.utils.image import show_cam_on_image
+        from model_registry import decode_image
+
+        if target is not None and not 0 <= target < len(self.service.class_names):
+            raise HTTPException(status_code=400, detail=f"target은 0 ~ {len(self.service.class_names) - 1} 사이여야 합니다")
+        image = decode_image(data, filename, self.service.backend.img_size)
+        # /predict와 같은 입력 텐서가 되도록 서비스의 전처리(FAST_PREPROCESS면 uint8 리사이즈 + Normalizer)를 그대로 씀
+        x = self.service.preprocess_image(image).unsqueeze(0)
+        if x.dtype == torch.uint8:
+            # Normalizer는 thread별 버퍼의 view를 돌려주므로 gradient용으로 복사
+            x = self.service.normalizer(x, "cpu").clone()
+        cam, probs, cls = self.grad_cam(x, target)
+
+        mean = torch.tensor(NORM_MEAN).view(3, 1, 1)
+        std = torch.tensor(NORM_STD).view(3, 1, 1)
+        rgb = (x[0].detach() * std + mean).clamp(0, 1).permute(1, 2, 0).numpy().astype(np.float32)
+        overlay = show_cam_on_image(rgb, cam, use_rgb=True)
+        buf = io.BytesIO()
+        Image.fromarray(overlay).save(buf, format="PNG", optimize=True)
+        return {
+            "predictions": self.service.topk_predictions(probs),
+            "target": self.service.class_names[cls],
+            "target_type": cls,
+            "heatmap_png": base64.b64encode(buf.getvalue()).decode("ascii"),
+        }
+
+    @staticmethod
+    def _check_deadline(deadline: Optional[float]):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded()
+
+    async def explain(self, data: bytes, filename: str, target: Optional[int] = None,
+                      deadline: Optional[float] = None) -> dict:
+        key = self.cache.key(data + f"|{target}".encode())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        self._check_deadline(deadline)
+
+        # gradient 계산은 /predict보다 훨씬 무거우므로 모델별 동시 실행 수를 제한하고, 너무 밀리면 바로 거절
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            raise HTTPException(status_code=429, detail="explain 요청이 너무 많습니다. 잠시 후 다시 시도하세요",
+                                headers={"Retry-After": "1"})
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            # 자리를 기다리는 동안 deadline이 지났으면 gradient 계산을 하지 않음
+            self._check_deadline(deadline)
+            result = await run_in_threadpool(self.explain_sync, data, filename, target)
+        finally:
+            self._semaphore.release()
+        self.cache.put(key, result)
+        return result
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from contextlib import nullcontext
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset, WeightedRandomSampler
+
+from dataset import SEED, CustomDataset, build_df, split_df
+from image_cache import file_signature
+from model_loader import ARCHITECTURES, load_state_dict
+from train import CLASS_NAMES, DEFAULTS, DEVICE, TRAIN_NUM_WORKERS, amp_settings, test_transforms
+
+# backbone은 고정하고 분류 헤드(model.fc, classifier[2] 등)만 바꾸는 실험을 위해
+# backbone 출력(pooling된 임베딩)을 한 번만 계산해서 float16으로 저장해두고 재사용한다.
+
+# ---------- Config ----------
+FEATURE_DIR = os.getenv("FEATURE_DIR", "data/features")
+
+# 아키텍처별 분류 헤드 위치 (model_loader의 builder가 교체하는 레이어)
+HEADS = {
+    "resnet50": "fc",
+    "efficientnet_b0": "classifier.1",
+    "convnext_base": "classifier.2",
+}
+
+
+def replace_module(model: nn.Module, path: str, module: nn.Module):
+    parent_path, _, child = path.rpartition(".")
+    setattr(model.get_submodule(parent_path) if parent_path else model, child, module)
+
+
+def weights_signature(weights_path: Optional[str]) -> str:
+    # 체크포인트를 쓰면 파일 크기/수정 시각, 아니면 torchvision ImageNet 가중치
+    if not weights_path:
+        return "imagenet"
+    st = os.stat(weights_path)
+    return f"{os.path.abspath(weights_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def build_model(name: str, weights_path: Optional[str] = None) -> nn.Module:
+    """weights_path가 있으면 학습된 체크포인트, 없으면 ImageNet pretrained backbone."""
+    model = ARCHITECTURES[name](len(CLASS_NAMES), pretrained=not weights_path)
+    if weights_path:
+        model.load_state_dict(load_state_dict(weights_path, mmap=False))
+    return model
+
+
+def feature_dir_for(name: str, img_size: int, weights_path: Optional[str] = None) -> str:
+    tag = "imagenet" if not weights_path else os.path.splitext(os.path.basename(weights_path))[0]
+    return os.path.join(FEATURE_DIR, f"{name}_{img_size}_{tag}")
+
+
+def extract_features(name: str, df: pd.DataFrame, img_size: int, weights_path: Optional[str] = None,
+                     batch_size: int = 64, num_workers: int = TRAIN_NUM_WORKERS, amp: str = "off",
+                     force: bool = False) -> str:
+    """
+    backbone을 데이터셋 전체에 한 번 돌려 (N, D) float16 임베딩을 features.npy로 저장한다.
+    이미지 파일 목록/크기/수정 시각이나 backbone 가중치가 바뀌면 자동으로 다시 만든다.
+    """
+    out_dir = feature_dir_for(name, img_size, weights_path)
+    index_path = os.path.join(out_dir, "index.json")
+    signature = hashlib.sha256(
+        f"{file_signature(df['path'].tolist())}|{weights_signature(weights_path)}|{img_size}".encode()).hexdigest()
+    if not force and os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        # split_labels가 없는 예전 캐시는 학습과 같은 분할을 만들 수 없으므로 다시 추출
+        if cached.get("signature") == signature and "split_labels" in cached:
+            print(f"feature 캐시 최신 상태: {out_dir}")
+            return out_dir
+
+    model = build_model(name, weights_path)
+    head = HEADS[name]
+    replace_module(model, head, nn.Identity())
+    model = model.to(DEVICE).eval()
+
+    class_to_id = {c: i for i, c in enumerate(CLASS_NAMES)}
+    dataset = CustomDataset(df, class_to_id, test_transforms(img_size), label_col="folder")
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers,
+                        pin_memory=DEVICE == "cuda")
+    amp_dtype, _ = amp_settings(amp)
+    autocast = torch.autocast(device_type=DEVICE, dtype=amp_dtype) if amp_dtype else nullcontext()
+
+    start = time.perf_counter()
+    chunks = []
+    with torch.inference_mode(), autocast:
+        for images, _ in loader:
+            chunks.append(model(images.to(DEVICE, non_blocking=True)).float().cpu().numpy().astype(np.float16))
+    features = np.concatenate(chunks)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "features.npy"), features)
+    meta = {"arch": name, "img_size": img_size, "weights": weights_signature(weights_path), "signature": signature,
+            "dim": int(features.shape[1]), "paths": df["path"].tolist(), "labels": dataset.labels,
+            # train.py/precision.py의 split_df(build_df())와 같은 분할을 만들기 위한 영문 label 문자열
+            "split_labels": df["label"].tolist()}
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(index_path + ".tmp", index_path)
+    elapsed = time.perf_counter() - start
+    print(f"feature 추출: {out_dir}  {features.shape} float16, {elapsed:.1f}s ({len(features) / elapsed:.1f} img/s)")
+    return out_dir
+
+
+def load_features(out_dir: str) -> tuple:
+    """(features float32 텐서, labels 텐서, paths, split_labels)."""
+    with open(os.path.join(out_dir, "index.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if "split_labels" not in meta:
+        raise SystemExit(f"{out_dir}는 예전 형식의 feature 캐시입니다 (--force로 다시 추출)")
+    features = torch.from_numpy(np.load(os.path.join(out_dir, "features.npy")).astype(np.float32))
+    return features, torch.tensor(meta["labels"]), meta["paths"], meta["split_labels"]
+
+
+def train_head(name: str, out_dir: str, epochs: int = 30, lr: float = 1e-3, batch_size: int = 256,
+               weighting: str = "sampler", weight_decay: float = 1e-4, dropout: float = 0.0) -> tuple:
+    """
+    저장된 임베딩으로 분류 헤드(Linear)만 학습. train.py와 같은 분할(build_df의 label 열로 split_df)로 검증하므로
+    --weights로 학습 체크포인트를 쓰더라도 backbone이 학습한 이미지가 검증셋에 섞이지 않는다.
+    weighting: sampler(노트북의 WeightedRandomSampler) | loss(CrossEntropy class weight) | none
+    """
+    from sklearn.metrics import accuracy_score, f1_score
+
+    features, labels, paths, split_labels = load_features(out_dir)
+    position = {p: i for i, p in enumerate(paths)}
+    # 정수 label(한글 폴더 순서)로 stratify하면 클래스 정렬 순서가 달라져 다른 분할이 나오므로 build_df의 label 문자열로
+    train_df, test_df = split_df(pd.DataFrame({"path": paths, "label": split_labels}))
+    train_idx = torch.tensor([position[p] for p in train_df["path"]])
+    test_idx = torch.tensor([position[p] for p in test_df["path"]])
+
+    torch.manual_seed(SEED)
+    num_classes = len(CLASS_NAMES)
+    counts = torch.bincount(labels[train_idx], minlength=num_classes).float().clamp(min=1)
+    class_weight = len(train_idx) / counts
+    train_ds = TensorDataset(features[train_idx], labels[train_idx])
+    if weighting == "sampler":
+        sampler = WeightedRandomSampler(class_weight[labels[train_idx]], num_samples=len(train_idx), replacement=True)
+        loader = DataLoader(train_ds, batch_size=batch_size, sampler=sampler)
+    else:
+        loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True)
+    criterion = nn.CrossEntropyLoss(weight=class_weight / class_weight.mean() if weighting == "loss" else None)
+
+    linear = nn.Linear(features.shape[1], num_classes)
+    head = nn.Sequential(nn.Dropout(dropout), linear) if dropout > 0 else linear
+    optimizer = torch.optim.AdamW(head.parameters(), lr=lr, weight_decay=weight_decay)
+
+    best = {"val_macroF1": -1.0}
+    best_state = None
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        head.train()
+        for x, y in loader:
+            optimizer.zero_grad()
+            criterion(head(x), y).backward()
+            optimizer.step()
+        head.eval()
+        with torch.no_grad():
+            preds = head(features[test_idx]).argmax(dim=1)
+        y_true = labels[test_idx].tolist()
+        metrics = {"epoch": epoch + 1, "val_acc": accuracy_score(y_true, preds.tolist()),
+                   "val_macroF1": f1_score(y_true, preds.tolist(), average="macro", zero_division=0)}
+        if metrics["val_macroF1"] > best["val_macroF1"]:
+            best, best_state = metrics, {k: v.clone() for k, v in linear.state_dict().items()}
+    print(f"{name} head ({weighting}): best epoch {best['epoch']}  acc={best['val_acc']:.4f}  "
+          f"macroF1={best['val_macroF1']:.4f}  ({time.perf_counter() - start:.1f}s)")
+    linear.load_state_dict(best_state)
+    return linear, best
+
+
+def export_full_model(name: str, linear: nn.Linear, output_path: str, weights_path: Optional[str] = None):
+    """backbone + 학습한 헤드를 서빙 체크포인트({'model_state_dict': ...})로 저장 (model_registry에서 바로 로드 가능)."""
+    model = build_model(name, weights_path)
+    model.get_submodule(HEADS[name]).load_state_dict(linear.state_dict())
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    torch.save({"model_state_dict": model.state_dict(), "class_names": CLASS_NAMES}, output_path)
+    print(f"전체 모델 저장: {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="backbone 임베딩을 캐시하고 분류 헤드만 빠르게 학습")
+    parser.add_argument("model", choices=list(ARCHITECTURES))
+    parser.add_argument("--weights", default=None, help="backbone 체크포인트 (기본: ImageNet pretrained)")
+    parser.add_argument("--img-size", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=64, help="feature 추출 배치 크기")
+    parser.add_argument("--workers", type=int, default=TRAIN_NUM_WORKERS)
+    parser.add_argument("--amp", default="off", help="추출 시 autocast (off | bf16 | fp16 | auto)")
+    parser.add_argument("--force", action="store_true", help="캐시가 최신이어도 다시 추출")
+    parser.add_argument("--extract-only", action="store_true")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--weighting", default="sampler", help="쉼표로 여러 개: sampler,loss,none")
+    parser.add_argument("--dropout", type=float, default=0.0)
+    parser.add_argument("--export", default=None, help="가장 좋은 헤드를 붙인 전체 모델을 저장할 경로")
+    args = parser.parse_args()
+
+    img_size = args.img_size or DEFAULTS[args.model]["img_size"]
+    out_dir = extract_features(args.model, build_df(), img_size, args.weights, args.batch_size, args.workers,
+                               args.amp, args.force)
+    if not args.extract_only:
+        results = [train_head(args.model, out_dir, args.epochs, args.lr, weighting=w, dropout=args.dropout)
+                   for w in args.weighting.split(",")]
+        linear, _ = max(results, key=lambda r: r[1]["val_macroF1"])
+        if args.export:
+            export_full_model(args.model, linear, args.export, args.weights)
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+
+from dataset import CLASS_TO_ID, NORM_MEAN, NORM_STD, build_df
+
+# ---------- Config ----------
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "data/cache")
+CACHE_SHARD_SIZE = int(os.getenv("CACHE_SHARD_SIZE", "1024"))   # shard 하나에 넣을 이미지 수 (512px 기준 약 768MB)
+CACHE_WORKERS = int(os.getenv("CACHE_WORKERS", str(os.cpu_count() or 1)))
+
+
+def cache_dir_for(img_size: int, root: str = IMAGE_CACHE_DIR, name: str = "Dataset_project4") -> str:
+    return os.path.join(root, f"{name}_{img_size}")
+
+
+def file_signature(paths: List[str]) -> str:
+    # 파일 목록 + 크기 + 수정 시각이 같으면 캐시를 다시 만들 필요 없음 (순서는 무관)
+    h = hashlib.sha256()
+    for p in sorted(paths):
+        st = os.stat(p)
+        h.update(f"{p}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _decode_resize(job: tuple) -> tuple:
+    # worker 프로세스: (path, img_size, draft) → (uint8 HWC 배열 또는 None, 에러 메시지)
+    path, img_size, draft = job
+    try:
+        image = Image.open(path)
+        if draft and image.format == "JPEG":
+            image.draft("RGB", (img_size, img_size))
+        # 노트북의 transforms.Resize((IMG_SIZE, IMG_SIZE))와 같은 비율 무시 bilinear 리사이즈
+        image = image.convert("RGB").resize((img_size, img_size), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def build_cache(df: pd.DataFrame, img_size: int, cache_dir: Optional[str] = None,
+                shard_size: int = CACHE_SHARD_SIZE, workers: int = CACHE_WORKERS,
+                draft: bool = False, force: bool = False) -> str:
+    """
+    build_df 표의 이미지를 한 번만 디코딩/리사이즈해서 (N, H, W, 3) uint8 memmap shard로 저장한다.
+    원본 파일 목록/크기/수정 시각이 바뀌면 전체를 다시 만든다. 읽을 수 없는 파일은 index.json의 failed에 기록하고 제외.
+    """
+    cache_dir = cache_dir or cache_dir_for(img_size)
+    paths = df["path"].tolist()
+    signature = file_signature(paths)
+    index_path = os.path.join(cache_dir, "index.json")
+    if not force and os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("signature") == signature and meta.get("img_size") == img_size:
+            print(f"캐시 최신 상태: {cache_dir} ({len(meta['paths'])}장)")
+            return cache_dir
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(index_path):
+        os.remove(index_path)  # 만드는 도중 중단돼도 반쯤 만든 캐시를 쓰지 않도록 index를 마지막에 씀
+
+    start = time.perf_counter()
+    kept, failed, shards = [], [], []
+    shard, row = None, 0
+    with Pool(max(1, workers)) as pool:
+        jobs = ((p, img_size, draft) for p in paths)
+        for i, (array, error) in enumerate(pool.imap(_decode_resize, jobs, chunksize=16)):
+            if array is None:
+                failed.append({"path": paths[i], "error": error})
+                continue
+            if shard is None or row == shard.shape[0]:
+                if shard is not None:
+                    shard.flush()
+                count = min(shard_size, len(paths) - i)
+                name = f"shard_{len(shards):04d}.npy"
+                shard = np.lib.format.open_memmap(os.path.join(cache_dir, name), mode="w+", dtype=np.uint8,
+                                                  shape=(count, img_size, img_size, 3))
+                shards.append({"file": name, "count": 0})
+                row = 0
+            shard[row] = array
+            kept.append({"path": paths[i], "label": df["label"].iat[i], "folder": df["folder"].iat[i],
+                         "shard": len(shards) - 1, "row": row})
+            row += 1
+            shards[-1]["count"] = row
+    if shard is not None:
+        shard.flush()
+
+    meta = {"img_size": img_size, "signature": signature, "shards": shards, "paths": kept, "failed": failed}
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(index_path + ".tmp", index_path)
+
+    elapsed = time.perf_counter() - start
+    print(f"캐시 생성: {cache_dir}  {len(kept)}장, 실패 {len(failed)}장, {elapsed:.1f}s "
+          f"({len(kept) / max(elapsed, 1e-9):.1f} img/s)")
+    return cache_dir
+
+
+class ImageCache:
+    """build_cache로 만든 shard들을 읽기 전용으로 연다. memmap은 프로세스마다 처음 접근할 때 연다 (DataLoader worker 안전)."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.img_size = meta["img_size"]
+        self.shard_files = [s["file"] for s in meta["shards"]]
+        self.entries = meta["paths"]
+        self.failed = meta["failed"]
+        self.position = {e["path"]: (e["shard"], e["row"]) for e in self.entries}
+        self._shards = None
+
+    def __getstate__(self):
+        # worker로 넘길 때 memmap을 pickle하면 배열 전체가 복사되므로 경로만 넘김
+        state = self.__dict__.copy()
+        state["_shards"] = None
+        return state
+
+    def shard(self, i: int) -> np.ndarray:
+        if self._shards is None:
+            # mode="c"(copy-on-write): 쓰기 가능한 배열로 보여서 torch.from_numpy가 경고 없이 복사 없이 감쌈
+            self._shards = [np.load(os.path.join(self.cache_dir, f), mmap_mode="c") for f in self.shard_files]
+        return self._shards[i]
+
+    def get(self, path: str) -> torch.Tensor:
+        shard, row = self.position[path]
+        return torch.from_numpy(self.shard(shard)[row]).permute(2, 0, 1)  # (3, H, W) uint8, 복사 없음
+
+
+def train_transforms():
+    """노트북 train_transforms의 증강을 uint8 텐서에 바로 적용 (Resize는 캐시에서 이미 함)."""
+    import torchvision.transforms as transforms # 이미지 처리시 사용
+
+    return transforms.Compose([
+        transforms.RandomHorizontalFlip(p=0.5),
+        transforms.RandomRotation(20),
+        transforms.ColorJitter(brightness=0.3, contrast=0.3, saturation=0.3, hue=0.2),
+        # 무작위 원근 왜곡 추가
+        transforms.RandomPerspective(distortion_scale=0.5, p=0.5),
+        transforms.ConvertImageDtype(torch.float32),
+        transforms.Normalize(mean=NORM_MEAN, std=NORM_STD),
+    ])
+
+
+def test_transforms():
+    import torchvision.transforms as transforms # 이미지 처리시 사용
+
+    return transforms.Compose([
+        transforms.ConvertImageDtype(torch.float32),
+        transforms.Normalize(mean=NORM_MEAN, std=NORM_STD),
+    ])
+
+
+class CachedDataset(Dataset):
+    """
+    CustomDataset과 같은 (이미지 텐서, 라벨 id)를 돌려주지만, JPEG 대신 memmap 캐시에서 읽는다.
+    transform은 (3, H, W) uint8 텐서를 받는다 (train_transforms / test_transforms 참고).
+    캐시 생성 때 읽지 못한 파일은 자동으로 빠진다.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache: ImageCache, class_to_id: Dict[str, int] = CLASS_TO_ID,
+                 transform: Optional[object] = None, label_col: str = "label"):
+        df = df[df["path"].isin(cache.position)]
+        self.cache = cache
+        self.paths = df["path"].tolist()
+        self.labels = [class_to_id[name] for name in df[label_col]]
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        image = self.cache.get(self.paths[idx])
+        if self.transform:
+            image = self.transform(image)
+        return image, self.labels[idx]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="학습용 이미지를 미리 디코딩/리사이즈해서 uint8 memmap 캐시로 저장")
+    parser.add_argument("--root", default=None, help="데이터셋 루트 (기본: DATA_ROOT)")
+    parser.add_argument("--sizes", default="512", help="쉼표로 구분한 입력 크기 (예: 512,224)")
+    parser.add_argument("--cache-dir", default=IMAGE_CACHE_DIR)
+    parser.add_argument("--shard-size", type=int, default=CACHE_SHARD_SIZE)
+    parser.add_argument("--workers", type=int, default=CACHE_WORKERS)
+    parser.add_argument("--draft", action="store_true", help="JPEG draft 모드로 축소 디코딩 (빠르지만 픽셀값이 조금 다름)")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    df = build_df(Path(args.root)) if args.root else build_df()
+    for size in [int(s) for s in args.sizes.split(",")]:
+        build_cache(df, size, cache_dir_for(size, args.cache_dir), args.shard_size, args.workers, args.draft, args.force)
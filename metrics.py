@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+import threading
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+
+# 요청 단계별 소요 시간을 Prometheus 히스토그램으로 모아 /metrics로 노출
+# (예측마다 print로 stdout에 쓰던 것을 대신함)
+
+# ---------- Config ----------
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))            # 이보다 느린 요청의 스택 샘플을 저장 (0이면 끔)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))   # 스택 샘플링 간격
+PROFILE_DIR = os.getenv("PROFILE_DIR", "reports/profile")
+PROFILE_WINDOW_SEC = float(os.getenv("PROFILE_WINDOW_SEC", "30"))     # 샘플을 보관할 최근 시간
+
+# 단계: read(본문 읽기) decode(PIL) transform(리사이즈/텐서 변환) normalize forward softmax topk save cache
+# forward/normalize/softmax는 배치 단위, 나머지는 이미지 단위로 기록됨
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram("inference_stage_seconds", "요청 처리 단계별 소요 시간",
+                          ["model", "stage"], buckets=STAGE_BUCKETS)
+REQUEST_SECONDS = Histogram("http_request_seconds", "엔드포인트별 전체 요청 시간",
+                            ["method", "path", "status"], buckets=STAGE_BUCKETS)
+BATCH_SIZE = Histogram("inference_batch_size", "forward 한 번에 묶인 이미지 수",
+                       ["model"], buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+BATCH_QUEUE_DEPTH = Gauge("inference_batch_queue_depth", "배치 스케줄러 큐에서 기다리는 이미지 수", ["model"])
+SAVE_QUEUE_DEPTH = Gauge("upload_save_queue_depth", "저장 대기 중인 업로드 수", ["model"])
+IN_FLIGHT = Gauge("inference_in_flight", "처리 중인 요청 수", ["model"])
+BATCHER_DROPPED = Gauge("inference_batcher_dropped", "forward 전에 버린 이미지 누적 수 (expired: deadline, cancelled: 연결 끊김)",
+                        ["model", "reason"])
+
+
+@contextmanager
+def stage(model: str, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(model, name).observe(time.perf_counter() - start)
+
+
+async def read_uploads(files: list, model: str) -> List[tuple]:
+    # UploadFile 목록 → (바이트, 파일명) 목록, 본문 읽기 시간을 read 단계로 기록
+    uploads = []
+    for f in files:
+        with stage(model, "read"):
+            uploads.append((await f.read(), f.filename))
+    return uploads
+
+
+def track_service(service):
+    # 큐 길이/처리 중 요청 수는 /metrics를 읽을 때 서비스에서 바로 가져옴
+    BATCH_QUEUE_DEPTH.labels(service.name).set_function(service.batcher.queue_depth)
+    SAVE_QUEUE_DEPTH.labels(service.name).set_function(service.upload_writer.qsize)
+    IN_FLIGHT.labels(service.name).set_function(lambda: service.active)
+    for reason in service.batcher.dropped:
+        BATCHER_DROPPED.labels(service.name, reason).set_function(lambda r=reason: service.batcher.dropped[r])
+
+
+def untrack_service(name: str):
+    # 모델을 내릴 때 언로드된 서비스를 계속 참조하지 않도록 라벨 제거
+    for gauge in (BATCH_QUEUE_DEPTH, SAVE_QUEUE_DEPTH, IN_FLIGHT):
+        try:
+            gauge.remove(name)
+        except KeyError:
+            pass
+    for reason in ("expired", "cancelled"):
+        try:
+            BATCHER_DROPPED.remove(name, reason)
+        except KeyError:
+            pass
+
+
+class SlowRequestProfiler:
+    """
+    백그라운드 스레드가 PROFILE_INTERVAL_MS마다 모든 스레드의 스택(sys._current_frames)을 찍어 최근 몇십 초만 보관한다.
+    느린 요청이 끝나면 그 요청 시간 구간의 샘플을 collapsed stack 형식(flamegraph.pl, speedscope에서 열 수 있음)으로 저장한다.
+    decode(threadpool), forward(batcher thread), 이벤트 루프가 모두 찍히므로 어느 쪽에서 시간이 갔는지 볼 수 있다.
+    """
+
+    def __init__(self, threshold_ms: float = PROFILE_SLOW_MS, interval_ms: float = PROFILE_INTERVAL_MS,
+                 out_dir: str = PROFILE_DIR, window_sec: float = PROFILE_WINDOW_SEC):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = max(1.0, interval_ms) / 1000.0
+        self.out_dir = out_dir
+        self.window = window_sec
+        self._start()
+        # fork한 자식 프로세스(serve.py)에서 샘플링 스레드를 다시 띄움
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._start())
+
+    def _start(self):
+        self._samples = deque()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                    frame = frame.f_back
+                stacks.append(";".join([names.get(ident, str(ident))] + stack[::-1]))
+            with self._lock:
+                self._samples.append((now, stacks))
+                while self._samples and self._samples[0][0] < now - self.window:
+                    self._samples.popleft()
+            time.sleep(self.interval)
+
+    def dump(self, start: float, end: float, label: str) -> Optional[str]:
+        with self._lock:
+            counts = Counter(stack for t, stacks in self._samples if start <= t <= end for stack in stacks)
+        if not counts:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        safe = label.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        path = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{safe}_{(end - start) * 1000:.0f}ms.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+        return path
+
+
+def install_metrics(app: FastAPI, profile_slow_ms: float = PROFILE_SLOW_MS):
+    """전체 요청 시간 미들웨어, GET /metrics, (PROFILE_SLOW_MS > 0이면) 느린 요청 프로파일러를 붙인다."""
+    profiler = SlowRequestProfiler(profile_slow_ms) if profile_slow_ms > 0 else None
+
+    @app.middleware("http")
+    async def time_request(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            end = time.perf_counter()
+            # /models/{name}/predict처럼 라우트 템플릿으로 묶어 라벨 수가 늘지 않게 함
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(request.method, path, str(status)).observe(end - start)
+            if profiler is not None and end - start >= profiler.threshold and path != "/metrics":
+                await run_in_threadpool(profiler.dump, start, end, path)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
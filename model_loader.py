@@ -0,0 +1,156 @@
+import os
+import time
+import argparse
+from typing import Callable, Dict
+
+import torch
+import torch.nn as nn
+import torchvision.models as models # 모델 사용시 사용
+
+# ---------- Config ----------
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"                  # 체크포인트를 mmap으로 읽어 복사 없이 가중치로 사용
+MODEL_SCRIPTED = os.getenv("MODEL_SCRIPTED", "0") == "1"          # TorchScript로 변환한 결과물을 캐시해서 사용
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "model/compiled")
+
+
+# ---------- 아키텍처별 모델 생성 (분류 헤드만 교체) ----------
+# 서빙에서는 학습된 체크포인트로 모든 가중치를 덮어쓰므로 ImageNet 가중치를 받지 않는다(pretrained=False).
+# 학습 시작점으로 쓸 때만 pretrained=True.
+def build_resnet50(num_classes: int, pretrained: bool = False) -> nn.Module:
+    model = models.resnet50(weights=models.ResNet50_Weights.DEFAULT if pretrained else None)
+    model.fc = nn.Linear(in_features=2048, out_features=num_classes, bias=True)
+    return model
+
+def build_efficientnet_b0(num_classes: int, pretrained: bool = False) -> nn.Module:
+    model = models.efficientnet_b0(weights=models.EfficientNet_B0_Weights.DEFAULT if pretrained else None)
+    model.classifier[1] = nn.Linear(in_features=1280, out_features=num_classes, bias=True)
+    return model
+
+def build_convnext_base(num_classes: int, pretrained: bool = False) -> nn.Module:
+    model = models.convnext_base(weights=models.ConvNeXt_Base_Weights.DEFAULT if pretrained else None)
+    model.classifier[2] = nn.Linear(in_features=1024, out_features=num_classes, bias=True)
+    return model
+
+ARCHITECTURES: Dict[str, Callable[..., nn.Module]] = {
+    "resnet50": build_resnet50,
+    "efficientnet_b0": build_efficientnet_b0,
+    "convnext_base": build_convnext_base,
+}
+
+
+def load_state_dict(weights_path: str, mmap: bool = MODEL_MMAP) -> dict:
+    """체크포인트 파일 → state_dict. 노트북의 학습 체크포인트({'model_state_dict': ...})도 지원."""
+    try:
+        state = torch.load(weights_path, map_location="cpu", mmap=mmap, weights_only=True)
+    except RuntimeError:
+        # 예전(zip 이전) 포맷은 mmap을 지원하지 않음
+        state = torch.load(weights_path, map_location="cpu", weights_only=True)
+    if isinstance(state, dict) and "model_state_dict" in state:
+        state = state["model_state_dict"]
+    return state
+
+
+def build_from_checkpoint(builder: Callable[..., nn.Module], num_classes: int, weights_path: str,
+                          mmap: bool = MODEL_MMAP) -> nn.Module:
+    """
+    ImageNet 가중치 다운로드/랜덤 초기화 없이 학습된 체크포인트만으로 모델을 만든다.
+
+    meta 디바이스에서 껍데기만 만든 뒤 state_dict 텐서를 그대로(assign) 붙이므로
+    mmap으로 읽은 경우 가중치 복사도 일어나지 않는다.
+    """
+    state = load_state_dict(weights_path, mmap=mmap)
+    with torch.device("meta"):
+        model = builder(num_classes)
+    model.load_state_dict(state, assign=True)
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        # state_dict에 없는 버퍼가 있으면 일반 방식으로 다시 생성
+        model = builder(num_classes)
+        model.load_state_dict(state)
+    return model.eval()
+
+
+def artifact_path(name: str, weights_path: str, img_size: int, artifact_dir: str = MODEL_ARTIFACT_DIR) -> str:
+    # 가중치 파일/입력 크기/torch 버전이 바뀌면 다른 파일명이 되어 자동으로 다시 만든다
+    st = os.stat(weights_path)
+    tag = f"{st.st_size:x}-{int(st.st_mtime):x}-{img_size}-torch{torch.__version__.split('+')[0]}"
+    return os.path.join(artifact_dir, f"{name}-{tag}.pt")
+
+
+def load_scripted(name: str, builder: Callable[..., nn.Module], num_classes: int, weights_path: str,
+                  img_size: int, device: str = "cpu", artifact_dir: str = MODEL_ARTIFACT_DIR) -> nn.Module:
+    """캐시된 TorchScript 결과물이 있으면 바로 로드하고, 없으면 trace + freeze 후 저장."""
+    path = artifact_path(name, weights_path, img_size, artifact_dir)
+    if os.path.exists(path):
+        return torch.jit.load(path, map_location=device)
+
+    model = build_from_checkpoint(builder, num_classes, weights_path)
+    with torch.no_grad():
+        example = torch.randn(1, 3, img_size, img_size)
+        scripted = torch.jit.freeze(torch.jit.trace(model, example))
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.jit.save(scripted, tmp_path)
+    os.replace(tmp_path, path)
+    print(f"TorchScript 저장: {path}")
+    return torch.jit.load(path, map_location=device)
+
+
+def load_model(name: str, builder: Callable[..., nn.Module], num_classes: int, weights_path: str,
+               img_size: int, device: str = "cpu", scripted: bool = MODEL_SCRIPTED) -> nn.Module:
+    if scripted:
+        return load_scripted(name, builder, num_classes, weights_path, img_size, device)
+    return build_from_checkpoint(builder, num_classes, weights_path).to(device)
+
+
+# ---------- 시작 시간 벤치마크 ----------
+def _timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def benchmark_startup(name: str, weights_path: str, img_size: int, num_classes: int = 13,
+                      include_legacy: bool = False) -> Dict[str, dict]:
+    """로딩 방식별 (모델 준비 시간, 첫 forward 시간)을 측정."""
+    builder = ARCHITECTURES[name]
+    example = torch.randn(1, 3, img_size, img_size)
+
+    def legacy():
+        # 기존 방식: ImageNet 가중치를 받은 뒤 체크포인트로 덮어쓰기
+        model = builder(num_classes, pretrained=True)
+        model.load_state_dict(torch.load(weights_path, map_location="cpu"))
+        return model.eval()
+
+    modes = {
+        "checkpoint": lambda: build_from_checkpoint(builder, num_classes, weights_path, mmap=False),
+        "checkpoint_mmap": lambda: build_from_checkpoint(builder, num_classes, weights_path, mmap=True),
+        "torchscript": lambda: load_scripted(name, builder, num_classes, weights_path, img_size),
+    }
+    if include_legacy:
+        modes = {"legacy_pretrained": legacy, **modes}
+
+    results = {}
+    for mode, fn in modes.items():
+        model, load_sec = _timed(fn)
+        with torch.inference_mode():
+            _, first_sec = _timed(lambda: model(example))
+        results[mode] = {"load_sec": round(load_sec, 3), "first_forward_sec": round(first_sec, 3)}
+        print(f"{name:16s} {mode:18s} load={load_sec:7.3f}s  first_forward={first_sec:7.3f}s")
+    return results
+
+
+if __name__ == "__main__":
+    from model_registry import BACKENDS
+
+    parser = argparse.ArgumentParser(description="모델 시작 시간 측정 및 TorchScript 결과물 미리 만들기")
+    parser.add_argument("--models", default=",".join(BACKENDS), help="쉼표로 구분한 모델 이름")
+    parser.add_argument("--compile-only", action="store_true", help="TorchScript 결과물만 만들고 종료")
+    parser.add_argument("--legacy", action="store_true", help="기존 pretrained=True 방식도 측정 (네트워크 필요)")
+    args = parser.parse_args()
+
+    for name in args.models.split(","):
+        backend = BACKENDS[name]
+        if args.compile_only:
+            load_scripted(name, backend.builder, len(backend.class_names), backend.weights_path, backend.img_size)
+        else:
+            benchmark_startup(name, backend.weights_path, backend.img_size, len(backend.class_names), args.legacy)
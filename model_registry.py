@@ -0,0 +1,345 @@
+import os
+import gc
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, UnidentifiedImageError
+from prometheus_client import Counter
+import torch
+import torch.nn as nn
+import torchvision.transforms as transforms # 이미지 처리시 사용
+
+from batching import DeadlineExceeded, MicroBatcher
+from explain import Explainer
+from metrics import BATCH_SIZE, stage, track_service, untrack_service
+from model_loader import build_resnet50, build_efficientnet_b0, build_convnext_base, load_model
+from onnx_backend import INFER_RUNTIME, RUNTIMES, OnnxModel
+from onnx_export import export_onnx, is_stale, onnx_path_for
+from precision import INFER_PRECISION, apply_precision, load_int8
+from preprocess import FAST_PREPROCESS, Normalizer, open_image, resize_uint8
+from upload_writer import UploadWriter
+from prediction_cache import PredictionCache, cache_namespace
+
+# ---------- Config ----------
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+DEFAULT_CLASS_NAMES = [
+    "금속캔알루미늄캔","금속캔철캔","비닐","스티로폼",
+    "유리병갈색","유리병녹색","유리병투명","종이",
+    "페트병무색단일","페트병유색단일","플라스틱PE","플라스틱PP","플라스틱PS"
+]
+CLASS_NAMES = [s.strip() for s in os.getenv("CLASS_NAMES_CSV", "").split(",")] if os.getenv("CLASS_NAMES_CSV") else DEFAULT_CLASS_NAMES
+TOP_K = int(os.getenv("TOP_K", "3"))
+MODEL_MAX_LOADED = int(os.getenv("MODEL_MAX_LOADED", "3"))              # 동시에 메모리에 올려둘 최대 모델 수
+MODEL_MAX_MEMORY_MB = float(os.getenv("MODEL_MAX_MEMORY_MB", "0"))      # 올려둔 모델 가중치 합계 상한(MB), 0이면 제한 없음
+MODEL_EVICT_MIN_IDLE_SEC = float(os.getenv("MODEL_EVICT_MIN_IDLE_SEC", "5"))  # 최근 이 시간 안에 쓰인 모델은 내리지 않음
+
+logger = logging.getLogger(__name__)
+MODEL_LOADS = Counter("model_loads_total", "ModelRegistry가 모델을 로드한 횟수", ["model"])
+MODEL_EVICTIONS = Counter("model_evictions_total", "ModelRegistry가 모델을 내린 횟수", ["model"])
+
+
+def decode_image(data: bytes, filename: str, draft_size: Optional[int] = None) -> Image.Image:
+    # draft_size를 주면 JPEG을 입력 크기에 가깝게 축소 디코딩 (preprocess.open_image 참고)
+    try:
+        return open_image(data, draft_size if FAST_PREPROCESS else None)
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail=f"이미지를 읽을 수 없습니다: {filename}")
+
+
+def check_deadline(deadline: Optional[float]):
+    # 디코딩 같은 비싼 작업 전에 이미 늦은 요청은 버림
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded()
+
+
+def topk_predictions(score_tensor: torch.Tensor, class_names: List[str], k: int = TOP_K) -> List[dict]:
+    # softmax 확률 벡터에서 상위 k개 예측 결과 추출
+    topk_scores, topk_indices = torch.topk(score_tensor, k=min(k, score_tensor.numel()))
+    return [{"name": class_names[i], "score": s, "type": i}
+            for s, i in zip(topk_scores.tolist(), topk_indices.tolist())]
+
+
+class ModelBackend:
+    """이름이 붙은 모델 한 종류의 정의: 아키텍처 생성 함수, 가중치 경로, 입력 크기, 클래스 목록, 추론 precision."""
+
+    def __init__(self, name: str, builder: Callable[[int], nn.Module], weights_path: str,
+                 img_size: int, class_names: List[str] = CLASS_NAMES, precision: str = INFER_PRECISION,
+                 runtime: str = INFER_RUNTIME, onnx_path: str = ""):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"지원하지 않는 runtime입니다: {runtime} (가능: {RUNTIMES})")
+        self.name = name
+        self.builder = builder
+        self.weights_path = weights_path
+        self.img_size = img_size
+        self.class_names = class_names
+        self.precision = precision
+        self.runtime = runtime
+        self.onnx_path = onnx_path or onnx_path_for(name)
+
+    def load(self, device: str = DEVICE) -> nn.Module:
+        if self.runtime == "onnx":
+            # ONNX Runtime CPU 실행 (precision 설정은 torch runtime에만 적용)
+            if is_stale(self.onnx_path, self.weights_path):
+                export_onnx(self.builder, len(self.class_names), self.weights_path, self.img_size, self.onnx_path)
+            return OnnxModel(self.onnx_path)
+        if self.precision == "int8":
+            return load_int8(self.name, self.builder, self.class_names, self.weights_path, self.img_size)
+        # ImageNet 가중치 없이 체크포인트만 로드 (MODEL_MMAP, MODEL_SCRIPTED 설정은 model_loader 참고)
+        model = load_model(self.name, self.builder, len(self.class_names), self.weights_path, self.img_size, device)
+        return apply_precision(model, self.precision, device)
+
+    def info(self) -> dict:
+        return {"name": self.name, "weights_path": self.weights_path, "img_size": self.img_size,
+                "num_classes": len(self.class_names), "precision": self.precision, "runtime": self.runtime}
+
+
+def backend_from_env(name: str, builder: Callable[[int], nn.Module], weights_path: str, img_size: int) -> ModelBackend:
+    # RESNET50_WEIGHTS_PATH, CONVNEXT_BASE_IMG_SIZE, EFFICIENTNET_B0_PRECISION 처럼 모델별로 환경변수로 덮어쓸 수 있음
+    prefix = name.upper()
+    return ModelBackend(name, builder,
+                        weights_path=os.getenv(f"{prefix}_WEIGHTS_PATH", weights_path),
+                        img_size=int(os.getenv(f"{prefix}_IMG_SIZE", str(img_size))),
+                        precision=os.getenv(f"{prefix}_PRECISION", INFER_PRECISION),
+                        runtime=os.getenv(f"{prefix}_RUNTIME", INFER_RUNTIME),
+                        onnx_path=os.getenv(f"{prefix}_ONNX_PATH", ""))
+
+
+BACKENDS: Dict[str, ModelBackend] = {
+    b.name: b for b in [
+        backend_from_env("resnet50", build_resnet50, "model/Best_ResNet50_model.pth", 512),
+        backend_from_env("efficientnet_b0", build_efficientnet_b0, "model/lr1e4_512best_efficientB0_model_pretrained_weights827.pth", 512),
+        backend_from_env("convnext_base", build_convnext_base, "model/best_convnext_model.pth", 224),
+    ]
+}
+
+
+class ModelService:
+    """
+    로드된 모델 하나와 그 모델의 전처리, 배치 스케줄러, 업로드 저장, 예측 캐시를 묶은 서빙 단위.
+    """
+
+    def __init__(self, backend: ModelBackend, save_dir: str, device: str = DEVICE, top_k: int = TOP_K):
+        self.backend = backend
+        self.name = backend.name
+        self.class_names = backend.class_names
+        self.device = device
+        self.top_k = top_k
+
+        self.model = backend.load(device)
+        # TorchScript(freeze)는 가중치가 상수로 들어가 parameters()가 비므로 체크포인트 크기로 대신함
+        self.memory_bytes = sum(t.numel() * t.element_size()
+                                for t in list(self.model.parameters()) + list(self.model.buffers())) \
+            or os.path.getsize(backend.weights_path)
+
+        # 이미지 전처리 코드 그대로 붙여넣기
+        self.transforms_infer = transforms.Compose([
+            transforms.Resize((backend.img_size, backend.img_size)),
+            transforms.ToTensor(),
+            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+        ])
+        # FAST_PREPROCESS=1이면 요청 경로에서는 uint8 리사이즈까지만 하고, 정규화는 forward 직전에 배치 단위로
+        self.normalizer = Normalizer()
+
+        # 동시에 들어온 요청을 하나의 forward로 묶어주는 배치 스케줄러
+        self.batcher = MicroBatcher(self.forward_batch)
+        # 업로드 원본을 요청 경로 밖에서 저장하는 백그라운드 writer
+        self.upload_writer = UploadWriter(save_dir, name=backend.name)
+        # 같은 이미지(바이트 해시)가 다시 오면 모델을 돌리지 않고 저장된 top-k 결과를 반환
+        self.prediction_cache = PredictionCache(cache_namespace(backend.name, backend.weights_path, backend.img_size,
+                                                                backend.precision, backend.runtime, top_k))
+        # 같은 모델로 Grad-CAM 히트맵 계산 (/explain, 모델별 동시 실행 수 제한)
+        self.explainer = Explainer(self)
+
+        self.active = 0
+        self.last_used = time.monotonic()
+        # /metrics에 큐 길이, 처리 중 요청 수 노출
+        track_service(self)
+
+    def forward_batch(self, batch: torch.Tensor) -> torch.Tensor:
+        # worker thread에서 실행: (N, C, H, W) -> (N, num_classes) softmax 확률
+        BATCH_SIZE.labels(self.name).observe(len(batch))
+        with torch.inference_mode():
+            if batch.dtype == torch.uint8:
+                with stage(self.name, "normalize"):
+                    batch = self.normalizer(batch, self.device)
+            with stage(self.name, "forward"):
+                pred = self.model(batch.to(self.device))
+            with stage(self.name, "softmax"):
+                return torch.softmax(pred, dim=1).cpu()
+
+    def load_image(self, data: bytes, filename: str) -> torch.Tensor:
+        # 디코딩/전처리는 블로킹 작업이므로 threadpool에서 실행
+        with stage(self.name, "decode"):
+            image = decode_image(data, filename, self.backend.img_size)
+
+        # 원본 바이트를 재인코딩 없이 백그라운드에서 저장 (uuid 파일명, 하위 폴더 분산)
+        self.upload_writer.submit(data, filename)
+
+        # 이미지 전처리 및 텐서 변환
+        return self.preprocess_image(image)
+
+    def save_uploads(self, uploads: List[tuple]):
+        for data, filename in uploads:
+            self.upload_writer.submit(data, filename)
+
+    def load_images(self, uploads: List[tuple]) -> List[torch.Tensor]:
+        return [self.load_image(data, filename) for data, filename in uploads]
+
+    def preprocess_image(self, image: Image.Image) -> torch.Tensor:
+        with stage(self.name, "transform"):
+            if FAST_PREPROCESS:
+                return resize_uint8(image, self.backend.img_size)
+            return self.transforms_infer(image)
+
+    def preprocess(self, images: List[Image.Image]) -> List[torch.Tensor]:
+        return [self.preprocess_image(image) for image in images]
+
+    async def predict_images(self, images: List[Image.Image], deadline: Optional[float] = None) -> List[torch.Tensor]:
+        """이미 디코딩된 이미지 목록 → 입력 순서대로 softmax 확률 벡터 (캐시/저장 없이 모델만 실행)."""
+        self.active += 1
+        self.last_used = time.monotonic()
+        try:
+            check_deadline(deadline)
+            img_tensors = await run_in_threadpool(self.preprocess, images)
+            return await self.batcher.submit_many(img_tensors, deadline)
+        finally:
+            self.active -= 1
+            self.last_used = time.monotonic()
+
+    def topk_predictions(self, score_tensor: torch.Tensor) -> List[dict]:
+        return topk_predictions(score_tensor, self.class_names, self.top_k)
+
+    def lookup_cache(self, uploads: List[tuple]) -> tuple:
+        # 해시 계산/캐시 조회 (디스크 캐시일 수 있으므로 threadpool에서 실행)
+        with stage(self.name, "cache"):
+            keys = [self.prediction_cache.key(data) for data, _ in uploads]
+            return keys, [self.prediction_cache.get(key) for key in keys]
+
+    async def predict_uploads(self, uploads: List[tuple], deadline: Optional[float] = None) -> List[List[dict]]:
+        """
+        (바이트, 파일명) 목록을 받아 입력 순서대로 파일별 top-k 결과를 반환.
+        deadline(time.monotonic 기준)이 지나면 디코딩/forward를 하지 않고 DeadlineExceeded.
+        """
+        self.active += 1
+        self.last_used = time.monotonic()
+        try:
+            # 캐시 적중은 바로 반환하고, 나머지만 디코딩 후 하나의 배치로 추론
+            keys, cached = await run_in_threadpool(self.lookup_cache, uploads)
+            missing = [i for i, value in enumerate(cached) if value is None]
+            hits = [uploads[i] for i, value in enumerate(cached) if value is not None]
+            if hits:
+                # 캐시 적중이어도 업로드 원본은 SAVE_DIR에 저장 (데이터 수집은 캐시 여부와 무관; block 정책일 수 있어 threadpool에서)
+                await run_in_threadpool(self.save_uploads, hits)
+            if missing:
+                check_deadline(deadline)
+                img_tensors = await run_in_threadpool(self.load_images, [uploads[i] for i in missing])
+                score_tensors = await self.batcher.submit_many(img_tensors, deadline)
+                for i, score_tensor in zip(missing, score_tensors):
+                    with stage(self.name, "topk"):
+                        cached[i] = self.topk_predictions(score_tensor)
+                    self.prediction_cache.put(keys[i], cached[i])
+            return cached
+        finally:
+            self.active -= 1
+            self.last_used = time.monotonic()
+
+    def close(self):
+        # 모델을 내릴 때 이 서비스가 띄운 스레드/연결을 모두 정리 (남은 업로드는 저장한 뒤 종료)
+        self.batcher.close()
+        self.upload_writer.close()
+        self.prediction_cache.close()
+        untrack_service(self.name)
+
+
+class ModelRegistry:
+    """
+    이름 → ModelService. 처음 요청될 때 로드(lazy)하고,
+    개수/메모리 상한을 넘으면 가장 오래 안 쓴 유휴 모델부터 내린다.
+    """
+
+    def __init__(self, backends: Dict[str, ModelBackend], save_dir: str,
+                 max_loaded: int = MODEL_MAX_LOADED,
+                 max_memory_mb: float = MODEL_MAX_MEMORY_MB,
+                 min_idle_sec: float = MODEL_EVICT_MIN_IDLE_SEC):
+        self.backends = backends
+        self.save_dir = save_dir
+        self.max_loaded = max(1, max_loaded)
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.min_idle_sec = min_idle_sec
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()           # _loaded 갱신/eviction만 보호 (짧게 잡음)
+        self._load_locks = {}                   # 모델별 로드 lock: 같은 모델을 두 번 로드하지 않도록
+
+    def names(self) -> List[str]:
+        return list(self.backends)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def get(self, name: str) -> ModelService:
+        # 로드가 오래 걸릴 수 있으므로 이벤트 루프 밖(threadpool)에서 호출
+        if name not in self.backends:
+            raise KeyError(name)
+        with self._lock:
+            service = self._loaded.get(name)
+            if service is not None:
+                self._loaded.move_to_end(name)
+                service.last_used = time.monotonic()
+                return service
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # 가중치 로드는 수 초가 걸릴 수 있으므로 전역 lock 밖에서 (이미 로드된 다른 모델 요청은 막지 않음)
+        with load_lock:
+            with self._lock:
+                service = self._loaded.get(name)
+            if service is None:
+                service = ModelService(self.backends[name], save_dir=os.path.join(self.save_dir, name))
+                MODEL_LOADS.labels(name).inc()
+                logger.info("모델 로드: %s (%.1fMB)", name, service.memory_bytes / 1024 ** 2)
+            with self._lock:
+                self._loaded[name] = service
+                self._loaded.move_to_end(name)
+                service.last_used = time.monotonic()
+                evicted = self._evict(keep=name)
+        self._unload(evicted)
+        return service
+
+    def _over_budget(self) -> bool:
+        if len(self._loaded) > self.max_loaded:
+            return True
+        if self.max_memory_bytes > 0:
+            return sum(s.memory_bytes for s in self._loaded.values()) > self.max_memory_bytes
+        return False
+
+    def _evict(self, keep: str) -> List[ModelService]:
+        # 가장 오래 전에 쓰인 모델부터, 처리 중인 요청이 없고 충분히 쉰 모델만 목록에서 뺌 (_lock 안에서 호출)
+        now = time.monotonic()
+        evicted = []
+        for name in list(self._loaded):
+            if not self._over_budget():
+                break
+            service = self._loaded[name]
+            if name == keep or service.active > 0 or now - service.last_used < self.min_idle_sec:
+                continue
+            del self._loaded[name]
+            evicted.append(service)
+        return evicted
+
+    def _unload(self, services: List[ModelService]):
+        # 업로드 flush/스레드 종료는 시간이 걸릴 수 있으므로 _lock 밖에서
+        for service in services:
+            service.close()
+            MODEL_EVICTIONS.labels(service.name).inc()
+            logger.info("모델 언로드: %s", service.name)
+        if services:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def info(self) -> List[dict]:
+        return [{**b.info(), "loaded": self.is_loaded(name)} for name, b in self.backends.items()]
@@ -0,0 +1,38 @@
+import os
+
+import torch
+import torch.nn as nn
+
+# ---------- Config ----------
+INFER_RUNTIME = os.getenv("INFER_RUNTIME", "torch")                   # torch | onnx (모델별로는 RESNET50_RUNTIME)
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))    # 0이면 onnxruntime 기본값(물리 코어 수)
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "0"))
+
+RUNTIMES = ("torch", "onnx")
+
+
+class OnnxModel(nn.Module):
+    """
+    ONNX Runtime(CPU) 세션을 torch 모델처럼 쓰기 위한 래퍼.
+    (N, 3, H, W) float 텐서를 받아 (N, num_classes) 로짓 텐서를 돌려준다.
+    """
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = ORT_INTRA_OP_THREADS,
+                 inter_op_threads: int = ORT_INTER_OP_THREADS):
+        super().__init__()
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = x.detach().cpu().contiguous().numpy()
+        (logits,) = self.session.run(None, {self.input_name: inputs})
+        return torch.from_numpy(logits)
@@ -0,0 +1,111 @@
+import os
+import sys
+import argparse
+from typing import Callable, List
+
+import torch
+import torch.nn as nn
+
+from model_loader import build_from_checkpoint
+from onnx_backend import OnnxModel
+
+# ---------- Config ----------
+ONNX_DIR = os.getenv("ONNX_DIR", "model/onnx")
+ONNX_OPSET = int(os.getenv("ONNX_OPSET", "17"))
+
+
+def onnx_path_for(name: str, onnx_dir: str = ONNX_DIR) -> str:
+    return os.path.join(onnx_dir, f"{name}.onnx")
+
+
+def is_stale(onnx_path: str, weights_path: str) -> bool:
+    # 체크포인트가 ONNX 파일보다 새로우면 다시 내보내야 함
+    return not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(weights_path)
+
+
+def export_onnx(builder: Callable[..., nn.Module], num_classes: int, weights_path: str, img_size: int,
+                onnx_path: str, opset: int = ONNX_OPSET) -> str:
+    """학습된 체크포인트 → ONNX (배치 차원은 동적)."""
+    model = build_from_checkpoint(builder, num_classes, weights_path, mmap=False)
+    example = torch.randn(2, 3, img_size, img_size)
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    tmp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model, example, tmp_path,
+            input_names=["input"], output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=opset, do_constant_folding=True,
+        )
+    os.replace(tmp_path, onnx_path)
+    print(f"ONNX 저장: {onnx_path}")
+    return onnx_path
+
+
+# ---------- torch ↔ ONNX Runtime 출력 비교 ----------
+def parity_images(img_size: int, per_class: int) -> torch.Tensor:
+    from dataset import build_df, sample_per_class
+    from precision import infer_transforms
+    from PIL import Image
+
+    transform = infer_transforms(img_size)
+    paths = ["test.jpg"] if os.path.exists("test.jpg") else []
+    if per_class > 0 and os.path.isdir("data/Dataset_project4"):
+        paths += sample_per_class(build_df(), per_class)["path"].tolist()
+    if not paths:
+        raise FileNotFoundError("비교할 이미지가 없습니다 (test.jpg, data/Dataset_project4)")
+    return torch.stack([transform(Image.open(p).convert("RGB")) for p in paths])
+
+
+def compare_outputs(torch_model: nn.Module, ort_model: nn.Module, images: torch.Tensor, batch_size: int = 8) -> tuple:
+    """(softmax 최대 절대 오차, top-1이 다른 이미지 수)."""
+    max_diff, mismatches = 0.0, 0
+    with torch.inference_mode():
+        for batch in torch.split(images, batch_size):
+            expected = torch.softmax(torch_model(batch), dim=1)
+            actual = torch.softmax(ort_model(batch), dim=1)
+            max_diff = max(max_diff, (expected - actual).abs().max().item())
+            mismatches += int((expected.argmax(dim=1) != actual.argmax(dim=1)).sum())
+    return max_diff, mismatches
+
+
+def check_parity(name: str, per_class: int = 2, atol: float = 1e-3, batch_size: int = 8) -> bool:
+    """같은 입력에서 torch와 ORT의 softmax 최대 오차와 top-1 일치 여부를 확인."""
+    from model_registry import BACKENDS
+
+    backend = BACKENDS[name]
+    onnx_path = onnx_path_for(name)
+    if is_stale(onnx_path, backend.weights_path):
+        export_onnx(backend.builder, len(backend.class_names), backend.weights_path, backend.img_size, onnx_path)
+
+    torch_model = build_from_checkpoint(backend.builder, len(backend.class_names), backend.weights_path, mmap=False)
+    ort_model = OnnxModel(onnx_path)
+    images = parity_images(backend.img_size, per_class)
+    max_diff, mismatches = compare_outputs(torch_model, ort_model, images, batch_size)
+
+    ok = max_diff <= atol and mismatches == 0
+    print(f"{name:16s} images={len(images)}  max|Δsoftmax|={max_diff:.2e}  top1 불일치={mismatches}  "
+          f"{'OK' if ok else 'FAIL'}")
+    return ok
+
+
+if __name__ == "__main__":
+    from model_registry import BACKENDS
+
+    parser = argparse.ArgumentParser(description="학습된 체크포인트를 ONNX로 내보내고 torch 출력과 비교")
+    parser.add_argument("--models", default=",".join(BACKENDS), help="쉼표로 구분한 모델 이름")
+    parser.add_argument("--opset", type=int, default=ONNX_OPSET)
+    parser.add_argument("--parity", action="store_true", help="내보낸 뒤 test.jpg + 데이터셋 샘플로 torch/ORT 출력 비교")
+    parser.add_argument("--per-class", type=int, default=2, help="parity에 쓸 클래스별 데이터셋 이미지 수")
+    parser.add_argument("--atol", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    names: List[str] = args.models.split(",")
+    for name in names:
+        backend = BACKENDS[name]
+        export_onnx(backend.builder, len(backend.class_names), backend.weights_path, backend.img_size,
+                    onnx_path_for(name), args.opset)
+
+    if args.parity:
+        results = [check_parity(name, args.per_class, args.atol) for name in names]
+        sys.exit(0 if all(results) else 1)
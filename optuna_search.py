@@ -0,0 +1,159 @@
+import os
+import json
+import argparse
+import multiprocessing as mp
+
+import pandas as pd
+import torch
+
+from dataset import SEED, build_df, sample_per_class, split_df
+from model_loader import ARCHITECTURES
+from train import DEFAULTS, TRAIN_LOG_DIR, train
+
+# ResNet50_Use_Optuna.ipynb의 objective를 여러 프로세스에서 병렬로 돌리는 탐색 스크립트.
+# trial 결과는 하나의 저널 파일(storage)에 모이므로 worker가 몇 개든 같은 study를 공유한다.
+
+# ---------- Config ----------
+OPTUNA_DIR = os.getenv("OPTUNA_DIR", "optuna")
+OPTUNA_WORKERS = int(os.getenv("OPTUNA_WORKERS", "2"))
+OPTUNA_PER_CLASS = int(os.getenv("OPTUNA_PER_CLASS", "100"))   # 노트북과 같은 클래스별 학습 100장 샘플
+OPTUNA_TEST_PER_CLASS = int(os.getenv("OPTUNA_TEST_PER_CLASS", "20"))   # 클래스별 검증 20장 샘플
+
+
+def storage_for(study_name: str, optuna_dir: str = OPTUNA_DIR):
+    # SQLite는 여러 프로세스가 동시에 쓰면 잠금 오류가 나기 쉬워서 파일 기반 JournalStorage 사용
+    import optuna
+    from optuna.storages.journal import JournalFileBackend
+
+    os.makedirs(optuna_dir, exist_ok=True)
+    return optuna.storages.JournalStorage(JournalFileBackend(os.path.join(optuna_dir, f"{study_name}.log")))
+
+
+def make_pruner(name: str, max_epochs: int):
+    import optuna
+
+    if name == "median":
+        # 처음 5개 trial과 각 trial의 첫 2 epoch은 가지치기하지 않음
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=2)
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=max_epochs, reduction_factor=3)
+    return optuna.pruners.NopPruner()
+
+
+def sample_cache_dir(args) -> str:
+    from image_cache import cache_dir_for
+
+    return cache_dir_for(args.img_size, name=f"optuna_{args.per_class}_{args.test_per_class}")
+
+
+def sample_splits(per_class: int, test_per_class: int) -> tuple:
+    """
+    노트북처럼 전체 데이터를 먼저 split_df(train.py와 같은 분할)로 나눈 뒤, train/test에서 각각 클래스별로 뽑는다.
+    나누기 전에 뽑으면 최종 모델의 학습 이미지가 trial 검증셋에 섞인다.
+    """
+    train_df, test_df = split_df(build_df())
+    return sample_per_class(train_df, per_class), sample_per_class(test_df, test_per_class)
+
+
+def make_objective(model_name: str, sample_train_df, sample_test_df, args):
+    import optuna
+
+    def objective(trial):
+        # 하이퍼파라미터 제안 (노트북과 같은 범위)
+        learning_rate = trial.suggest_float("learning_rate", 1e-5, 1e-2, log=True)
+        batch_size = trial.suggest_categorical("batch_size", [8, 16, 32])
+
+        def report(epoch, metrics):
+            # epoch마다 macro-F1을 보고하고, 중간값보다 나쁘면 여기서 학습을 멈춤
+            trial.report(metrics["val_macroF1"], epoch)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+        result = train(model_name, epochs=args.epochs, batch_size=batch_size, lr=learning_rate,
+                       img_size=args.img_size, amp=args.amp, num_workers=args.loader_workers,
+                       use_cache=True, cache_dir=sample_cache_dir(args), checkpoint_dir=None, resume=False,
+                       log_dir=os.path.join(TRAIN_LOG_DIR, "optuna", args.study), run_name=f"trial_{trial.number}",
+                       log_every=10, df=sample_train_df, val_df=sample_test_df, epoch_callback=report)
+        return result["best_macro_f1"]
+
+    return objective
+
+
+def run_worker(worker_id: int, args):
+    """worker 프로세스 하나: 같은 storage의 study를 불러와서 trial을 이어서 실행."""
+    import optuna
+
+    torch.set_num_threads(args.threads)
+    sample_train_df, sample_test_df = sample_splits(args.per_class, args.test_per_class)
+    study = optuna.load_study(study_name=args.study, storage=storage_for(args.study),
+                              sampler=optuna.samplers.TPESampler(seed=SEED + worker_id),
+                              pruner=make_pruner(args.pruner, args.epochs))
+    if len(study.trials) >= args.trials:
+        return
+    # 전체 trial 수에 도달하면 모든 worker가 멈춤
+    study.optimize(make_objective(args.model, sample_train_df, sample_test_df, args),
+                   callbacks=[optuna.study.MaxTrialsCallback(args.trials, states=None)])
+
+
+def search(args) -> dict:
+    import optuna
+    import image_cache
+
+    # 샘플 이미지를 한 번만 디코딩해서 memmap 캐시로 만들어두고, 모든 worker/trial이 같은 캐시(page cache)를 읽음
+    image_cache.build_cache(pd.concat(sample_splits(args.per_class, args.test_per_class)), args.img_size,
+                            sample_cache_dir(args))
+    optuna.create_study(study_name=args.study, storage=storage_for(args.study), direction="maximize",
+                        load_if_exists=True)
+
+    ctx = mp.get_context("spawn")
+    workers = [ctx.Process(target=run_worker, args=(i, args)) for i in range(args.workers)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    study = optuna.load_study(study_name=args.study, storage=storage_for(args.study))
+    states = [t.state.name for t in study.trials]
+    summary = {
+        "study": args.study, "best_params": study.best_params, "best_macro_f1": study.best_value,
+        "trials": len(states), "complete": states.count("COMPLETE"), "pruned": states.count("PRUNED"),
+    }
+    print("\n===========================================")
+    print("🏆 최적 하이퍼파라미터 및 최고 성능")
+    print("-------------------------------------------")
+    print(f"최적의 하이퍼파라미터: {study.best_params}")
+    print(f"최고 macro-F1: {study.best_value:.4f}  (완료 {summary['complete']}, 가지치기 {summary['pruned']})")
+    print("===========================================")
+    with open(os.path.join(OPTUNA_DIR, f"{args.study}_best.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 프로세스로 Optuna 하이퍼파라미터 탐색 (epoch별 macro-F1 가지치기)")
+    parser.add_argument("model", choices=list(ARCHITECTURES))
+    parser.add_argument("--study", default=None, help="study 이름 (기본: <model>_<img_size>)")
+    parser.add_argument("--trials", type=int, default=50, help="모든 worker를 합친 전체 trial 수")
+    parser.add_argument("--epochs", type=int, default=10, help="trial당 최대 epoch (가지치기 전)")
+    parser.add_argument("--workers", type=int, default=OPTUNA_WORKERS, help="동시에 trial을 돌릴 프로세스 수")
+    parser.add_argument("--threads", type=int, default=None, help="worker당 torch 스레드 수 (기본: 코어 수 / workers)")
+    parser.add_argument("--loader-workers", type=int, default=0, help="trial 안의 DataLoader worker 수")
+    parser.add_argument("--pruner", choices=["median", "hyperband", "none"], default="median")
+    parser.add_argument("--per-class", type=int, default=OPTUNA_PER_CLASS, help="trial 학습용 클래스별 샘플 수 (train 분할에서)")
+    parser.add_argument("--test-per-class", type=int, default=OPTUNA_TEST_PER_CLASS, help="trial 검증용 클래스별 샘플 수 (test 분할에서)")
+    parser.add_argument("--img-size", type=int, default=None)
+    parser.add_argument("--amp", default="auto")
+    parser.add_argument("--final", action="store_true", help="탐색 후 최적 값으로 전체 데이터셋 학습")
+    args = parser.parse_args()
+
+    args.img_size = args.img_size or DEFAULTS[args.model]["img_size"]
+    args.study = args.study or f"{args.model}_{args.img_size}"
+    args.threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    best = search(args)
+
+    if args.final:
+        # --- 최종 모델 학습 (최적의 하이퍼파라미터 사용) ---
+        print(f"\n최적의 값으로 전체 데이터셋에 대한 최종 모델 학습 시작")
+        train(args.model, epochs=args.epochs, batch_size=best["best_params"]["batch_size"],
+              lr=best["best_params"]["learning_rate"], img_size=args.img_size, amp=args.amp, use_cache=True,
+              run_name=f"{args.study}_final")
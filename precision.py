@@ -0,0 +1,191 @@
+import os
+import copy
+import time
+import argparse
+from typing import Callable, List, Optional
+
+import torch
+import torch.nn as nn
+import torchvision.transforms as transforms # 이미지 처리시 사용
+from torch.utils.data import DataLoader
+
+from dataset import NORM_MEAN, NORM_STD, build_df, split_df, sample_per_class, CustomDataset
+
+# ---------- Config ----------
+INFER_PRECISION = os.getenv("INFER_PRECISION", "fp32")     # 모델별로는 RESNET50_PRECISION 처럼 지정
+INT8_CALIB_PER_CLASS = int(os.getenv("INT8_CALIB_PER_CLASS", "10"))  # INT8 보정에 쓸 클래스별 이미지 수 (학습 분할에서 추출)
+INT8_BACKEND = os.getenv("INT8_BACKEND", "x86")           # x86 | fbgemm | qnnpack(ARM)
+EVAL_NUM_WORKERS = int(os.getenv("EVAL_NUM_WORKERS", "4"))
+
+PRECISIONS = ("fp32", "channels_last", "bf16", "int8")
+
+
+def infer_transforms(img_size: int):
+    return transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(NORM_MEAN, NORM_STD),
+    ])
+
+
+class PrecisionModel(nn.Module):
+    """
+    입력 레이아웃/autocast를 forward 안에서 처리해서, 바깥(ModelService.forward_batch)에서는
+    fp32 NCHW 텐서를 넣고 fp32 로짓을 받는 것처럼 쓸 수 있게 감싼 모듈.
+    """
+
+    def __init__(self, model: nn.Module, channels_last: bool = False, autocast_dtype: Optional[torch.dtype] = None):
+        super().__init__()
+        self.model = model
+        self.channels_last = channels_last
+        self.autocast_dtype = autocast_dtype
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        if self.autocast_dtype is None:
+            return self.model(x)
+        with torch.autocast(device_type=x.device.type, dtype=self.autocast_dtype):
+            return self.model(x).float()
+
+
+def calibration_batches(class_names: List[str], img_size: int, per_class: int = INT8_CALIB_PER_CLASS,
+                        batch_size: int = 16) -> DataLoader:
+    # 학습 분할에서만 뽑아서, 검증(held-out) 분할의 정확도 비교가 공정하도록 함
+    train_df, _ = split_df(build_df())
+    calib_df = sample_per_class(train_df, per_class)
+    class_to_id = {name: i for i, name in enumerate(class_names)}
+    dataset = CustomDataset(calib_df, class_to_id, infer_transforms(img_size), label_col="folder")
+    return DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=EVAL_NUM_WORKERS)
+
+
+def quantize_int8(model: nn.Module, calib_loader, backend: str = INT8_BACKEND) -> nn.Module:
+    """FX graph mode 정적(post-training static) INT8 양자화. calib_loader의 이미지로 activation 범위를 보정."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    torch.backends.quantized.engine = backend
+    model = copy.deepcopy(model).cpu().eval()
+    example_inputs = (next(iter(calib_loader))[0],)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(backend), example_inputs)
+    with torch.no_grad():
+        for images, _ in calib_loader:
+            prepared(images)
+    return convert_fx(prepared)
+
+
+def apply_precision(model: nn.Module, mode: str, device: str = "cpu",
+                    calib_loader_fn: Optional[Callable[[], DataLoader]] = None) -> nn.Module:
+    """fp32 모델을 지정한 추론 모드로 변환. int8은 CPU 전용이며 calib_loader_fn이 필요."""
+    if mode not in PRECISIONS:
+        raise ValueError(f"지원하지 않는 precision입니다: {mode} (가능: {PRECISIONS})")
+    if mode == "fp32":
+        return model
+    if mode == "channels_last":
+        return PrecisionModel(model.to(memory_format=torch.channels_last), channels_last=True).eval()
+    if mode == "bf16":
+        return PrecisionModel(model.to(memory_format=torch.channels_last), channels_last=True,
+                              autocast_dtype=torch.bfloat16).eval()
+    if device != "cpu":
+        raise ValueError("int8 양자화 모델은 CPU에서만 실행할 수 있습니다")
+    if calib_loader_fn is None:
+        raise ValueError("int8에는 보정(calibration) 데이터가 필요합니다")
+    return quantize_int8(model, calib_loader_fn())
+
+
+def load_int8(name: str, builder: Callable[..., nn.Module], class_names: List[str], weights_path: str,
+              img_size: int) -> nn.Module:
+    """보정(calibration)은 느리므로 한 번 양자화한 결과를 TorchScript로 저장해두고 재사용."""
+    from model_loader import artifact_path, build_from_checkpoint
+
+    torch.backends.quantized.engine = INT8_BACKEND
+    path = artifact_path(f"{name}-int8-{INT8_BACKEND}", weights_path, img_size)
+    if os.path.exists(path):
+        return torch.jit.load(path, map_location="cpu")
+
+    model = build_from_checkpoint(builder, len(class_names), weights_path, mmap=False)
+    quantized = quantize_int8(model, calibration_batches(class_names, img_size))
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(quantized, torch.randn(1, 3, img_size, img_size)))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.jit.save(scripted, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    print(f"INT8 모델 저장: {path}")
+    return scripted
+
+
+# ---------- fp32 대비 정확도 변화 검증 ----------
+def evaluate(model: nn.Module, loader: DataLoader, device: str = "cpu") -> tuple:
+    preds, labels = [], []
+    elapsed, count = 0.0, 0
+    with torch.inference_mode():
+        for images, targets in loader:
+            start = time.perf_counter()
+            outputs = model(images.to(device))
+            elapsed += time.perf_counter() - start
+            count += images.size(0)
+            preds.extend(outputs.argmax(dim=1).cpu().tolist())
+            labels.extend(targets.tolist())
+    return preds, labels, count / elapsed if elapsed > 0 else 0.0
+
+
+def validate(name: str, modes: List[str], per_class: Optional[int] = None, batch_size: int = 16) -> List[dict]:
+    """held-out 분할에서 모드별 accuracy / macro-F1 / fp32와의 예측 일치율 / 처리량을 비교."""
+    from sklearn.metrics import accuracy_score, f1_score
+    from model_registry import BACKENDS
+    from model_loader import build_from_checkpoint
+
+    backend = BACKENDS[name]
+    _, test_df = split_df(build_df())
+    if per_class:
+        test_df = sample_per_class(test_df, per_class)
+    class_to_id = {folder: i for i, folder in enumerate(backend.class_names)}
+    test_dataset = CustomDataset(test_df, class_to_id, infer_transforms(backend.img_size), label_col="folder")
+    test_loader = DataLoader(test_dataset, batch_size=batch_size, shuffle=False, num_workers=EVAL_NUM_WORKERS)
+
+    rows, reference = [], None
+    for mode in ["fp32"] + [m for m in modes if m != "fp32"]:
+        base = build_from_checkpoint(backend.builder, len(backend.class_names), backend.weights_path, mmap=False)
+        model = apply_precision(base, mode,
+                                calib_loader_fn=lambda: calibration_batches(backend.class_names, backend.img_size))
+        preds, labels, images_per_sec = evaluate(model, test_loader)
+        if reference is None:
+            reference = preds
+        row = {
+            "model": name, "precision": mode,
+            "accuracy": accuracy_score(labels, preds),
+            "macro_f1": f1_score(labels, preds, average="macro", zero_division=0),
+            "agreement_with_fp32": sum(p == r for p, r in zip(preds, reference)) / len(preds),
+            "images_per_sec": images_per_sec,
+        }
+        rows.append(row)
+        print(f"{name:16s} {mode:14s} acc={row['accuracy']:.4f}  macroF1={row['macro_f1']:.4f}  "
+              f"agree={row['agreement_with_fp32']:.4f}  {images_per_sec:7.1f} img/s")
+
+    fp32 = rows[0]
+    for row in rows[1:]:
+        row["accuracy_drift"] = row["accuracy"] - fp32["accuracy"]
+        row["macro_f1_drift"] = row["macro_f1"] - fp32["macro_f1"]
+    return rows
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="추론 precision 모드별 정확도/속도를 fp32와 비교")
+    parser.add_argument("--models", default="resnet50,efficientnet_b0,convnext_base")
+    parser.add_argument("--modes", default=",".join(PRECISIONS))
+    parser.add_argument("--per-class", type=int, default=None, help="검증 분할에서 클래스별 최대 이미지 수 (기본: 전체)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--output", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    results = []
+    for name in args.models.split(","):
+        results.extend(validate(name, args.modes.split(","), args.per_class, args.batch_size))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
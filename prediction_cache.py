@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Optional
+
+# ---------- Config ----------
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "4096"))   # 메모리 LRU 최대 항목 수 (0이면 캐시 끔)
+CACHE_TTL_SEC = float(os.getenv("CACHE_TTL_SEC", "600"))          # 항목 유효 시간(초), 0이면 만료 없음
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH", "")               # 여러 uvicorn worker가 공유할 sqlite 파일 (비우면 사용 안 함)
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", "100000"))
+
+
+def cache_namespace(model_name: str, weights_path: str, img_size: int,
+                    precision: str = "", runtime: str = "", top_k: int = 0) -> str:
+    # 가중치 파일이 바뀌면(재학습) 자동으로 다른 키가 되도록 크기/수정시각까지 포함
+    # precision/runtime이 다르면 확률이 조금씩 달라지고 top_k가 다르면 결과 길이가 달라지므로
+    # CACHE_DISK_PATH를 공유하는 worker끼리 서로의 결과를 쓰지 않도록 키에 넣음
+    try:
+        st = os.stat(weights_path)
+        weights_id = f"{os.path.abspath(weights_path)}:{st.st_size}:{int(st.st_mtime)}"
+    except OSError:
+        weights_id = weights_path
+    return f"{model_name}|{weights_id}|{img_size}|{precision}|{runtime}|{top_k}"
+
+
+class PredictionCache:
+    """
+    업로드 바이트의 해시 → top-k 예측 결과(list of dict) 캐시.
+
+    메모리 LRU(+TTL)를 먼저 보고, CACHE_DISK_PATH가 있으면 sqlite 파일을 2차 저장소로 사용한다.
+    캐시 적중 시 디코딩/전처리/forward를 모두 건너뛴다.
+    """
+
+    def __init__(self, namespace: str,
+                 max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_sec: float = CACHE_TTL_SEC,
+                 disk_path: str = CACHE_DISK_PATH,
+                 disk_max_entries: int = CACHE_DISK_MAX_ENTRIES):
+        self.namespace = namespace.encode("utf-8")
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._disk = None
+        self._puts = 0
+        self._closed = False
+        self.disk_path = disk_path if max_entries > 0 else ""
+        if self.disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._connect()
+            # sqlite 연결은 fork한 자식 프로세스에서 같이 쓰면 안 되므로 자식에서 새로 연결 (serve.py)
+            # (close된 캐시는 다시 연결하지 않음)
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and not ref()._closed and ref()._connect())
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._disk = sqlite3.connect(self.disk_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and not self._closed
+
+    def close(self):
+        # 모델을 내릴 때 sqlite 연결을 닫고 메모리 항목을 비움 (이후 get/put은 캐시 없이 동작)
+        with self._lock:
+            self._closed = True
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def key(self, data: bytes) -> str:
+        h = hashlib.sha256(self.namespace)
+        h.update(b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+    def _expires(self) -> float:
+        return time.time() + self.ttl_sec if self.ttl_sec > 0 else float("inf")
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.execute("SELECT value, expires FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: List[dict]):
+        if not self.enabled:
+            return
+        expires = self._expires()
+        with self._lock:
+            self._remember(key, expires, value)
+            if self._disk is not None:
+                self._disk.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                                   (key, json.dumps(value, ensure_ascii=False), expires))
+                self._puts += 1
+                if self._puts % 1000 == 0:
+                    self._trim_disk()
+
+    def _remember(self, key: str, expires: float, value: List[dict]):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _trim_disk(self):
+        # 만료된 항목 정리 후, 최대 개수를 넘으면 만료가 가까운 것부터 삭제
+        self._disk.execute("DELETE FROM predictions WHERE expires <= ?", (time.time(),))
+        self._disk.execute(
+            "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,))
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._memory), "disk": self._disk is not None}
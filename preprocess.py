@@ -0,0 +1,113 @@
+import os
+import io
+import time
+import argparse
+import threading
+from typing import List, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from dataset import NORM_MEAN, NORM_STD
+
+# ---------- Config ----------
+FAST_PREPROCESS = os.getenv("FAST_PREPROCESS", "1") == "1"   # 0이면 기존 transforms.Compose 경로 사용
+
+
+def open_image(data: bytes, draft_size: Optional[int] = None) -> Image.Image:
+    """
+    업로드 바이트 → RGB PIL 이미지.
+    JPEG이면 draft 모드로 DCT 단계에서 1/2, 1/4, 1/8로 줄여서 디코딩한다 (결과는 항상 draft_size 이상).
+    """
+    image = Image.open(io.BytesIO(data))
+    if draft_size and image.format == "JPEG":
+        image.draft("RGB", (draft_size, draft_size))
+    return image.convert("RGB")
+
+
+def resize_uint8(image: Image.Image, size: int) -> torch.Tensor:
+    """(size, size)로 리사이즈한 uint8 (3, H, W) 텐서. 정규화는 배치 단위로 Normalizer에서 한 번에."""
+    resized = image.resize((size, size), Image.BILINEAR)
+    return torch.from_numpy(np.array(resized, dtype=np.uint8)).permute(2, 0, 1)
+
+
+class Normalizer:
+    """
+    uint8 배치 → 정규화된 float 배치를 한 번의 변환으로 만든다.
+    (x / 255 - mean) / std == x * (1 / (255 * std)) - mean / std
+
+    worker thread마다 float 버퍼를 미리 잡아두고 재사용하므로 요청마다 큰 텐서를 새로 만들지 않는다.
+    반환값은 버퍼의 view이므로 다음 호출 전까지(같은 thread의 forward 동안)만 유효하다.
+    """
+
+    def __init__(self, mean: List[float] = NORM_MEAN, std: List[float] = NORM_STD):
+        self.scale = torch.tensor([1.0 / (255.0 * s) for s in std]).view(1, 3, 1, 1)
+        self.shift = torch.tensor([m / s for m, s in zip(mean, std)]).view(1, 3, 1, 1)
+        self._local = threading.local()
+
+    def _buffer(self, shape: torch.Size, device: torch.device) -> torch.Tensor:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.device != device or buf.shape[1:] != shape[1:] or buf.shape[0] < shape[0]:
+            buf = torch.empty(shape, dtype=torch.float32, device=device)
+            self._local.buf = buf
+        return buf[:shape[0]]
+
+    def __call__(self, batch: torch.Tensor, device: str = "cpu") -> torch.Tensor:
+        batch = batch.to(device)   # GPU면 uint8 그대로 보내 전송량을 1/4로
+        out = self._buffer(batch.shape, batch.device)
+        out.copy_(batch)
+        return out.mul_(self.scale.to(out.device)).sub_(self.shift.to(out.device))
+
+
+# ---------- 기존 Compose와 비교 벤치마크 ----------
+def benchmark(paths: List[str], img_size: int, repeat: int = 3) -> dict:
+    import torchvision.transforms as transforms # 이미지 처리시 사용
+
+    compose = transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(NORM_MEAN, NORM_STD),
+    ])
+    normalizer = Normalizer()
+    datas = [open(p, "rb").read() for p in paths]
+
+    def run_compose():
+        return torch.stack([compose(Image.open(io.BytesIO(d)).convert("RGB")) for d in datas])
+
+    def run_fast():
+        return normalizer(torch.stack([resize_uint8(open_image(d, img_size), img_size) for d in datas])).clone()
+
+    results = {}
+    outputs = {}
+    for name, fn in [("compose", run_compose), ("fast", run_fast)]:
+        fn()  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs[name] = fn()
+        ms = (time.perf_counter() - start) / (repeat * len(datas)) * 1000
+        results[name] = {"ms_per_image": round(ms, 3)}
+        print(f"{name:8s} {ms:8.2f} ms/image  ({len(datas)} images, size={img_size})")
+
+    diff = (outputs["compose"] - outputs["fast"]).abs()
+    results["max_abs_diff"] = diff.max().item()
+    results["mean_abs_diff"] = diff.mean().item()
+    results["speedup"] = results["compose"]["ms_per_image"] / max(results["fast"]["ms_per_image"], 1e-9)
+    print(f"speedup x{results['speedup']:.2f}  mean|Δ|={results['mean_abs_diff']:.4f}  max|Δ|={results['max_abs_diff']:.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="기존 Compose 전처리와 draft 디코딩 + 배치 정규화 경로 비교")
+    parser.add_argument("paths", nargs="*", default=["test.jpg"], help="이미지 파일 (기본: test.jpg)")
+    parser.add_argument("--sizes", default="224,512")
+    parser.add_argument("--per-class", type=int, default=0, help="data/Dataset_project4에서 클래스별로 추가할 이미지 수")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    if args.per_class > 0:
+        from dataset import build_df, sample_per_class
+        paths += sample_per_class(build_df(), args.per_class)["path"].tolist()
+    for size in [int(s) for s in args.sizes.split(",")]:
+        benchmark(paths, size, args.repeat)
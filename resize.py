@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import argparse
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFile
+
+from crop import IMG_EXTS, letterbox_resize_rgb
+
+# resize.ipynb의 한 폴더짜리 리사이즈 루프를 클래스 폴더 전체 + 여러 프로세스로 확장한 도구
+
+# ---------- Config ----------
+RESIZE_INPUT_ROOT = os.getenv("RESIZE_INPUT_ROOT", "data/Dataset_project4")
+RESIZE_WORKERS = int(os.getenv("RESIZE_WORKERS", str(os.cpu_count() or 1)))
+RESIZE_QUALITY = int(os.getenv("RESIZE_QUALITY", "90"))
+
+MODES = ("stretch", "letterbox")
+
+
+def parse_size(text: str) -> tuple:
+    # "512" → (512, 512), "256x144" → (256, 144)
+    if "x" in text:
+        w, h = text.lower().split("x")
+        return int(w), int(h)
+    return int(text), int(text)
+
+
+def output_root_for(input_root: str, size: tuple, mode: str) -> str:
+    suffix = f"{size[0]}" if size[0] == size[1] else f"{size[0]}x{size[1]}"
+    if mode == "letterbox":
+        suffix += "_lb"
+    return f"{str(input_root).rstrip('/')}_{suffix}"
+
+
+def _resize_one(job: tuple) -> dict:
+    src, dst, size, mode, draft, quality, allow_truncated = job
+    ImageFile.LOAD_TRUNCATED_IMAGES = allow_truncated
+    try:
+        with Image.open(src) as img:
+            if draft and img.format == "JPEG":
+                # DCT 단계에서 1/2, 1/4, 1/8로 줄여 디코딩 (결과는 항상 size 이상)
+                img.draft("RGB", size)
+            img = img.convert("RGB")
+            if mode == "letterbox":
+                # Crop.ipynb와 같은 흰 배경 letterbox (정사각형 크기만 지원)
+                out = Image.fromarray(letterbox_resize_rgb(np.asarray(img), size=size[0]))
+            else:
+                out = img.resize(size, Image.Resampling.LANCZOS)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        out.save(dst + ".tmp", "JPEG", quality=quality)
+        os.replace(dst + ".tmp", dst)
+        return {"src": src, "status": "ok"}
+    except Exception as e:
+        return {"src": src, "status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+
+def resize_tree(input_root: str, output_root: str, size: tuple, mode: str = "stretch",
+                workers: int = RESIZE_WORKERS, draft: bool = True, quality: int = RESIZE_QUALITY,
+                allow_truncated: bool = False, force: bool = False) -> dict:
+    """
+    input_root 아래 모든 이미지를 같은 폴더 구조로 output_root에 리사이즈해서 .jpg로 저장한다.
+    출력 파일이 원본보다 새로우면 건너뛰고, 읽지 못한 파일은 output_root/_corrupt_report.json에 남긴다.
+    """
+    if mode not in MODES:
+        raise ValueError(f"지원하지 않는 mode입니다: {mode} (가능: {MODES})")
+    if mode == "letterbox" and size[0] != size[1]:
+        raise ValueError("letterbox는 정사각형 크기만 지원합니다")
+
+    input_root, output_root = Path(input_root), Path(output_root)
+    jobs, skipped = [], 0
+    for src in sorted(input_root.rglob("*")):
+        if src.suffix.lower() not in IMG_EXTS:
+            continue
+        dst = (output_root / src.relative_to(input_root)).with_suffix(".jpg")
+        if not force and dst.exists() and dst.stat().st_mtime >= src.stat().st_mtime:
+            skipped += 1
+            continue
+        jobs.append((str(src), str(dst), size, mode, draft, quality, allow_truncated))
+
+    print(f"{input_root} → {output_root}  size={size} mode={mode}  대상 {len(jobs)}장, 최신이라 건너뜀 {skipped}장")
+    start = time.perf_counter()
+    corrupt = []
+    if jobs:
+        with Pool(max(1, workers)) as pool:
+            for n, result in enumerate(pool.imap_unordered(_resize_one, jobs, chunksize=32), 1):
+                if result["status"] != "ok":
+                    print(f"❌ 오류 발생: {result['src']} → {result['reason']}")
+                    corrupt.append(result)
+                if n % 1000 == 0:
+                    print(f"{n}/{len(jobs)} 진행중 ({n / (time.perf_counter() - start):.1f} img/s)")
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "input_root": str(input_root), "output_root": str(output_root), "size": list(size), "mode": mode,
+        "processed": len(jobs) - len(corrupt), "skipped": skipped, "corrupt": sorted(corrupt, key=lambda r: r["src"]),
+        "elapsed_sec": round(elapsed, 1), "images_per_sec": round(len(jobs) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    output_root.mkdir(parents=True, exist_ok=True)
+    with open(output_root / "_corrupt_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"완료: {report['processed']}장, 문제 파일 {len(corrupt)}개, {elapsed:.1f}s ({report['images_per_sec']} img/s)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="클래스 폴더 전체를 여러 프로세스로 일괄 리사이즈")
+    parser.add_argument("--input", default=RESIZE_INPUT_ROOT)
+    parser.add_argument("--output", default=None, help="출력 루트 (기본: <input>_<size>, 크기가 여러 개면 무시)")
+    parser.add_argument("--sizes", default="512,224", help="쉼표로 구분한 크기 (512 또는 256x144)")
+    parser.add_argument("--mode", choices=MODES, default="stretch")
+    parser.add_argument("--workers", type=int, default=RESIZE_WORKERS)
+    parser.add_argument("--quality", type=int, default=RESIZE_QUALITY)
+    parser.add_argument("--no-draft", action="store_true", help="JPEG draft(축소) 디코딩을 끄고 원본 해상도로 디코딩")
+    parser.add_argument("--allow-truncated", action="store_true", help="잘린(손상된) 파일도 강제로 읽기 (ImageFile.LOAD_TRUNCATED_IMAGES)")
+    parser.add_argument("--force", action="store_true", help="최신 출력도 다시 생성")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    for size in sizes:
+        output = args.output if args.output and len(sizes) == 1 else output_root_for(args.input, size, args.mode)
+        resize_tree(args.input, output, size, args.mode, args.workers, not args.no_draft,
+                    args.quality, args.allow_truncated, args.force)
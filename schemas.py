@@ -0,0 +1,34 @@
+from typing import List # 타입 체크시 사용
+from pydantic import BaseModel # 데이터 예외처리시 사용
+
+
+# 상대방에게 전달할시 데이터 타입 정의
+class Predict(BaseModel): # response_model=response 응답시 타입 정의
+    name: str
+    score: float
+    type: int
+
+class PredictResponse(BaseModel):
+    predictions: List[Predict]
+
+class BatchPredictItem(BaseModel):
+    filename: str
+    predictions: List[Predict]
+
+class BatchPredictResponse(BaseModel):
+    results: List[BatchPredictItem]
+
+class CascadePredictItem(BaseModel):
+    filename: str
+    predictions: List[Predict]
+    model: str          # 최종 결과를 낸 모델 (앙상블이면 "ensemble")
+    stages: List[str]   # 이 이미지에 실제로 실행된 모델 순서
+
+class CascadePredictResponse(BaseModel):
+    results: List[CascadePredictItem]
+
+class ExplainResponse(BaseModel):
+    predictions: List[Predict]
+    target: str         # Grad-CAM을 계산한 클래스 (기본: 1순위 예측)
+    target_type: int
+    heatmap_png: str    # 원본 위에 히트맵을 덧씌운 PNG (base64)
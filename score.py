@@ -0,0 +1,198 @@
+import os
+import glob
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from dataset import FOLDER_TO_CLASS, IMG_EXTS
+from model_registry import BACKENDS, DEVICE, TOP_K, topk_predictions
+from preprocess import FAST_PREPROCESS, Normalizer, open_image, resize_uint8
+
+# saved_data(uuid 업로드)나 클래스 폴더 전체를 /predict로 한 장씩 보내지 않고 한 번에 채점하는 CLI
+# 모델/입력 크기/precision/runtime은 서빙과 같은 model_registry.BACKENDS 정의(환경변수 포함)를 그대로 쓴다.
+
+# ---------- Config ----------
+SCORE_OUTPUT_DIR = os.getenv("SCORE_OUTPUT_DIR", "reports/score")
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "64"))
+SCORE_NUM_WORKERS = int(os.getenv("SCORE_NUM_WORKERS", str(min(8, os.cpu_count() or 1))))
+SCORE_PART_ROWS = int(os.getenv("SCORE_PART_ROWS", "4096"))   # parquet part 파일 하나에 담을 행 수 (재시작 단위)
+
+META_NAME = "_meta.json"
+
+
+def list_inputs(source: str, path_col: str = "path") -> pd.DataFrame:
+    """
+    디렉터리면 하위의 이미지 파일 전체, .csv/.parquet이면 manifest의 path_col 열.
+    클래스 폴더(한글 폴더명) 안의 파일이면 folder 열에 정답 폴더명을 채운다.
+    """
+    if os.path.isdir(source):
+        paths = [str(p) for p in sorted(Path(source).rglob("*")) if p.suffix.lower() in IMG_EXTS]
+        df = pd.DataFrame({"path": paths})
+    else:
+        df = pd.read_parquet(source) if source.endswith(".parquet") else pd.read_csv(source)
+        if path_col not in df.columns:
+            raise ValueError(f"manifest에 '{path_col}' 열이 없습니다: {list(df.columns)}")
+        df = df.rename(columns={path_col: "path"})
+        base = os.path.dirname(os.path.abspath(source))
+        df["path"] = [p if os.path.isabs(p) else os.path.join(base, p) for p in df["path"].astype(str)]
+    if "folder" not in df.columns:
+        df["folder"] = [next((part for part in reversed(Path(p).parts[:-1]) if part in FOLDER_TO_CLASS), None)
+                        for p in df["path"]]
+    return df.drop_duplicates("path").reset_index(drop=True)
+
+
+class ScoreDataset(Dataset):
+    """경로 → uint8 (3, H, W). 깨진 파일은 0 텐서와 에러 메시지로 돌려서 배치를 멈추지 않는다."""
+
+    def __init__(self, paths: List[str], img_size: int):
+        self.paths = paths
+        self.img_size = img_size
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        try:
+            with open(self.paths[idx], "rb") as f:
+                image = open_image(f.read(), self.img_size if FAST_PREPROCESS else None)
+            return resize_uint8(image, self.img_size), ""
+        except Exception as e:
+            return torch.zeros(3, self.img_size, self.img_size, dtype=torch.uint8), f"{type(e).__name__}: {e}"
+
+
+def collate(items: list) -> tuple:
+    return torch.stack([t for t, _ in items]), [err for _, err in items]
+
+
+def run_signature(name: str) -> dict:
+    backend = BACKENDS[name]
+    st = os.stat(backend.weights_path)
+    return {**backend.info(), "weights_size": st.st_size, "weights_mtime_ns": st.st_mtime_ns,
+            "fast_preprocess": FAST_PREPROCESS}
+
+
+def scored_paths(out_dir: str) -> tuple:
+    """이미 쓰인 part 파일들의 경로 집합과 다음 part 번호 (중간에 죽었으면 그 part는 tmp로 남아 무시됨)."""
+    parts = sorted(glob.glob(os.path.join(out_dir, "part-*.parquet")))
+    done = set()
+    for part in parts:
+        done.update(pd.read_parquet(part, columns=["path"])["path"])
+    next_part = int(os.path.basename(parts[-1])[5:10]) + 1 if parts else 0
+    return done, next_part
+
+
+def write_part(out_dir: str, part: int, rows: List[dict]):
+    path = os.path.join(out_dir, f"part-{part:05d}.parquet")
+    pd.DataFrame(rows).to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+def score(name: str, source: str, output_dir: Optional[str] = None, batch_size: int = SCORE_BATCH_SIZE,
+          num_workers: int = SCORE_NUM_WORKERS, part_rows: int = SCORE_PART_ROWS, top_k: int = TOP_K,
+          path_col: str = "path", force: bool = False) -> str:
+    """
+    source(디렉터리 또는 manifest)의 이미지를 큰 배치로 채점해서 output_dir/part-XXXXX.parquet에 나눠 쓴다.
+    part 파일은 다 쓴 뒤 이름을 바꾸므로, 중간에 죽어도 다시 실행하면 남은 이미지만 이어서 채점한다.
+    """
+    backend = BACKENDS[name]
+    output_dir = output_dir or os.path.join(SCORE_OUTPUT_DIR, f"{name}_{Path(source).stem}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    meta_path = os.path.join(output_dir, META_NAME)
+    signature = run_signature(name)
+    if os.path.exists(meta_path) and not force:
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f) != signature:
+                raise SystemExit(f"{output_dir}는 다른 모델/설정으로 채점된 결과입니다 (--force로 새로 시작)")
+    if force:
+        for part in glob.glob(os.path.join(output_dir, "part-*.parquet*")):
+            os.remove(part)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(signature, f, ensure_ascii=False, indent=2)
+
+    df = list_inputs(source, path_col)
+    done, part = scored_paths(output_dir)
+    todo = df[~df["path"].isin(done)].reset_index(drop=True)
+    print(f"{name}: 전체 {len(df)}장, 이미 채점 {len(df) - len(todo)}장, 남은 {len(todo)}장 → {output_dir}")
+    if todo.empty:
+        return output_dir
+
+    model = backend.load(DEVICE)
+    normalizer = Normalizer()
+    loader = DataLoader(ScoreDataset(todo["path"].tolist(), backend.img_size), batch_size=batch_size,
+                        shuffle=False, num_workers=num_workers, collate_fn=collate,
+                        pin_memory=DEVICE == "cuda",
+                        prefetch_factor=4 if num_workers > 0 else None)
+
+    rows, offset, failed = [], 0, 0
+    start = last = time.perf_counter()
+    with torch.inference_mode():
+        for batch, errors in loader:
+            t_data = time.perf_counter()
+            probs = torch.softmax(model(normalizer(batch, DEVICE)).float(), dim=1).cpu()
+            t_model = time.perf_counter()
+            wait_ms = (t_data - last) * 1000 / len(errors)
+            forward_ms = (t_model - t_data) * 1000 / len(errors)
+
+            for j, error in enumerate(errors):
+                row = {"path": todo["path"].iat[offset + j], "folder": todo["folder"].iat[offset + j],
+                       "ok": not error, "error": error or None,
+                       "decode_wait_ms": round(wait_ms, 3), "forward_ms": round(forward_ms, 3)}
+                preds = [] if error else topk_predictions(probs[j], backend.class_names, top_k)
+                row["pred"] = preds[0]["name"] if preds else None
+                row["pred_score"] = preds[0]["score"] if preds else None
+                row["topk_names"] = [p["name"] for p in preds]
+                row["topk_scores"] = [p["score"] for p in preds]
+                row["topk_types"] = [p["type"] for p in preds]
+                rows.append(row)
+                failed += bool(error)
+            offset += len(errors)
+
+            if len(rows) >= part_rows:
+                write_part(output_dir, part, rows)
+                part, rows = part + 1, []
+            last = time.perf_counter()
+            elapsed = last - start
+            print(f"\r{offset}/{len(todo)}  {offset / elapsed:.1f} img/s  실패 {failed}", end="", flush=True)
+
+    if rows:
+        write_part(output_dir, part, rows)
+    elapsed = time.perf_counter() - start
+    print(f"\n완료: {offset}장, {elapsed:.1f}s ({offset / max(elapsed, 1e-9):.1f} img/s), 실패 {failed}장")
+    return output_dir
+
+
+def load_scores(output_dir: str) -> pd.DataFrame:
+    """part 파일 전체를 하나의 DataFrame으로 (정답 폴더가 있으면 correct 열 추가)."""
+    parts = sorted(glob.glob(os.path.join(output_dir, "part-*.parquet")))
+    df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True) if parts else pd.DataFrame()
+    if not df.empty and df["folder"].notna().any():
+        df["correct"] = df["pred"] == df["folder"]
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="디렉터리/manifest의 이미지를 배치로 채점해 parquet으로 저장 (재시작 가능)")
+    parser.add_argument("model", choices=list(BACKENDS))
+    parser.add_argument("source", help="이미지 디렉터리 또는 .csv/.parquet manifest")
+    parser.add_argument("--output", default=None, help=f"기본: {SCORE_OUTPUT_DIR}/<model>_<source 이름>")
+    parser.add_argument("--path-col", default="path", help="manifest에서 이미지 경로가 든 열")
+    parser.add_argument("--batch-size", type=int, default=SCORE_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=SCORE_NUM_WORKERS)
+    parser.add_argument("--part-rows", type=int, default=SCORE_PART_ROWS)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--force", action="store_true", help="기존 결과를 지우고 처음부터")
+    args = parser.parse_args()
+
+    out = score(args.model, args.source, args.output, args.batch_size, args.workers, args.part_rows,
+                args.top_k, args.path_col, args.force)
+    scores = load_scores(out)
+    if "correct" in scores:
+        labeled = scores[scores["folder"].notna() & scores["ok"]]
+        print(f"정답 폴더가 있는 {len(labeled)}장 정확도: {labeled['correct'].mean():.4f}")
@@ -0,0 +1,184 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import importlib
+from typing import Dict, List, Optional
+
+# uvicorn --workers N은 worker마다 앱 모듈을 새로 import해서 모델 가중치가 N벌 올라간다.
+# 여기서는 부모 프로세스가 앱(모델 포함)을 한 번만 로드하고 fork해서, 읽기만 하는 가중치 메모리를
+# copy-on-write로 모든 worker가 공유한다 (MODEL_MMAP=1이면 체크포인트 파일의 page cache까지 공유).
+#
+# 사용법: python serve.py app_convN --workers 4 --port 8080
+#        python serve.py app_multi --workers 2 --preload efficientnet_b0,convnext_base
+
+# ---------- Config ----------
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8080"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+SERVE_THREADS = int(os.getenv("SERVE_THREADS", "0"))    # worker별 torch.set_num_threads (0이면 코어 수 / worker 수)
+SERVE_AFFINITY = os.getenv("SERVE_AFFINITY", "0") == "1"  # worker마다 서로 다른 코어 묶음에 고정 (Linux)
+SERVE_FAST_FAIL_SEC = float(os.getenv("SERVE_FAST_FAIL_SEC", "10"))    # 이보다 빨리 죽으면 시작 실패로 봄
+SERVE_MAX_FAST_FAILS = int(os.getenv("SERVE_MAX_FAST_FAILS", "5"))     # worker 하나가 연속으로 이만큼 시작 실패하면 전체 종료
+SERVE_MAX_BACKOFF_SEC = float(os.getenv("SERVE_MAX_BACKOFF_SEC", "30"))  # 재시작 대기 시간 상한 (0.5초부터 두 배씩)
+
+
+def worker_cores(index: int, workers: int) -> List[int]:
+    # 사용 가능한 코어를 worker 수로 나눠 index번째 묶음
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cores) // workers)
+    start = (index * per_worker) % len(cores)
+    return cores[start:start + per_worker]
+
+
+def load_app(module: str, preload: List[str]):
+    """부모 프로세스에서 앱과 모델을 로드 (단일 모델 앱은 import 시점에, app_multi는 preload 목록을)."""
+    import torch
+
+    # fork 전에 부모에서 OpenMP 스레드 풀이 만들어지면 자식에서 멈출 수 있으므로 로드는 1 스레드로
+    torch.set_num_threads(1)
+    app_module = importlib.import_module(module.removesuffix(".py"))
+    services = [app_module.service] if hasattr(app_module, "service") else \
+        [app_module.registry.get(name) for name in preload]
+    for service in services:
+        if service.backend.runtime == "onnx":
+            # ONNX Runtime 세션은 내부 스레드 풀 때문에 fork 후 공유할 수 없음
+            raise SystemExit(f"{service.name}: runtime=onnx는 fork 공유를 지원하지 않습니다 "
+                             f"(uvicorn --workers를 쓰거나 {service.name.upper()}_RUNTIME=torch)")
+    return app_module, services
+
+
+def serve_worker(app_module, sock: socket.socket, index: int, workers: int, threads: int, affinity: bool):
+    import torch
+    import uvicorn
+
+    if affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, worker_cores(index, workers))
+    torch.set_num_threads(threads)
+    print(f"worker {index} (pid {os.getpid()}): torch threads={threads}"
+          + (f", cores={sorted(os.sched_getaffinity(0))}" if affinity else ""), flush=True)
+    config = uvicorn.Config(app_module.app, log_level=os.getenv("LOG_LEVEL", "info"))
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(app_module, sock: socket.socket, index: int, workers: int, threads: int, affinity: bool) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            # 부모의 시그널 핸들러를 물려받지 않도록 (종료 처리는 uvicorn이 다시 설치)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            serve_worker(app_module, sock, index, workers, threads, affinity)
+        except BaseException as e:
+            print(f"worker {index} 종료: {e!r}", file=sys.stderr, flush=True)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def memory_report(pids: Dict[int, int]):
+    # 공유가 잘 되면 worker별 USS(그 프로세스만 쓰는 메모리)는 작고 PSS 합이 모델 한 벌 근처
+    try:
+        import psutil
+    except ImportError:
+        return
+    for pid, index in sorted(pids.items(), key=lambda item: item[1]):
+        try:
+            info = psutil.Process(pid).memory_full_info()
+        except (psutil.Error, AttributeError):
+            continue
+        print(f"worker {index} (pid {pid}): rss={info.rss / 1024 ** 2:.0f}MB "
+              f"uss={info.uss / 1024 ** 2:.0f}MB pss={getattr(info, 'pss', 0) / 1024 ** 2:.0f}MB", flush=True)
+
+
+def serve(module: str, host: str = SERVE_HOST, port: int = SERVE_PORT, workers: int = SERVE_WORKERS,
+          threads: int = SERVE_THREADS, affinity: bool = SERVE_AFFINITY, preload: Optional[List[str]] = None) -> int:
+    start = time.perf_counter()
+    app_module, services = load_app(module, preload or [])
+    weights_mb = sum(s.memory_bytes for s in services) / 1024 ** 2
+    print(f"{module}: 모델 {[s.name for s in services]} 로드 {time.perf_counter() - start:.1f}s "
+          f"({weights_mb:.0f}MB, worker {workers}개가 공유)", flush=True)
+
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # 부모가 만든 파이썬 객체를 GC 대상에서 빼서, 자식의 GC가 부모 페이지를 건드려 복사되는 것을 줄임
+    gc.collect()
+    gc.freeze()
+
+    pids = {spawn(app_module, sock, i, workers, threads, affinity): i for i in range(workers)}
+    started = {i: time.monotonic() for i in range(workers)}
+    fast_fails = {i: 0 for i in range(workers)}
+    print(f"http://{host}:{port} 에서 worker {workers}개 실행 (pid {sorted(pids)})", flush=True)
+
+    stopping = False
+    exit_code = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: memory_report(pids))   # kill -USR1 <부모 pid>
+
+    while pids:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = pids.pop(pid, None)
+        if index is None:
+            continue
+        if stopping:
+            continue
+        # 죽은 worker만 다시 fork (모델은 부모에 그대로 있으므로 바로 뜸)
+        # 시작하자마자 죽는 경우(포트, import 오류, OOM 등)에는 fork를 반복하지 않도록 점점 늦추고, 계속 실패하면 종료
+        fast_fails[index] = fast_fails[index] + 1 if time.monotonic() - started[index] < SERVE_FAST_FAIL_SEC else 0
+        if fast_fails[index] >= SERVE_MAX_FAST_FAILS:
+            print(f"worker {index}가 연속 {fast_fails[index]}번 시작 직후 종료되어 서버를 멈춥니다 (status {status})",
+                  file=sys.stderr, flush=True)
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        delay = min(SERVE_MAX_BACKOFF_SEC, 0.5 * 2 ** (fast_fails[index] - 1)) if fast_fails[index] else 0.0
+        print(f"worker {index} (pid {pid}) 비정상 종료 (status {status}), {delay:.1f}s 뒤 다시 시작", flush=True)
+        time.sleep(delay)
+        if stopping:
+            continue
+        started[index] = time.monotonic()
+        pids[spawn(app_module, sock, index, workers, threads, affinity)] = index
+    sock.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="모델을 한 번 로드하고 fork한 uvicorn worker들이 가중치를 공유하는 런처")
+    parser.add_argument("app", help="app_ResN | app_eff | app_convN | app_multi")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=SERVE_THREADS, help="worker별 torch 스레드 수 (0이면 코어 수 / worker 수)")
+    parser.add_argument("--affinity", action="store_true", default=SERVE_AFFINITY, help="worker마다 코어 묶음 고정")
+    parser.add_argument("--preload", default="", help="app_multi에서 미리 로드할 모델 (쉼표로 구분)")
+    args = parser.parse_args()
+
+    sys.exit(serve(args.app, args.host, args.port, args.workers, args.threads, args.affinity,
+                   [s.strip() for s in args.preload.split(",") if s.strip()]))
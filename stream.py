@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from typing import Optional
+
+import torch
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter
+
+from metrics import stage
+
+# 컨베이어 카메라처럼 JPEG 프레임이 계속 들어오는 경우를 위한 WebSocket 스트리밍 추론
+# (uvicorn에서 WebSocket을 쓰려면 websockets 패키지 필요: pip install "uvicorn[standard]")
+
+# ---------- Config ----------
+STREAM_SMOOTH_FRAMES = int(os.getenv("STREAM_SMOOTH_FRAMES", "0"))   # 최근 N프레임 softmax 평균 (0/1이면 끔)
+STREAM_MAX_SMOOTH_FRAMES = int(os.getenv("STREAM_MAX_SMOOTH_FRAMES", "30"))
+STREAM_MAX_FRAME_BYTES = int(os.getenv("STREAM_MAX_FRAME_BYTES", str(8 * 1024 * 1024)))
+
+STREAM_FRAMES = Counter("stream_frames_total", "WebSocket 스트림 프레임 수 (processed/skipped/error)", ["model", "result"])
+
+
+class FrameStream:
+    """
+    WebSocket 연결 하나의 프레임 처리.
+
+    수신 태스크는 프레임을 받는 대로 "최신 프레임" 자리에 덮어쓰고, 처리 루프는 모델이 비면 그 최신 프레임만 가져간다.
+    모델이 카메라 속도를 못 따라가면 중간 프레임은 자연스럽게 건너뛰고(skipped로 알려줌) 지연이 쌓이지 않는다.
+    프레임은 업로드 저장/예측 캐시를 거치지 않고 바로 배치 스케줄러로 들어간다.
+    """
+
+    def __init__(self, websocket: WebSocket, service, smooth: int = STREAM_SMOOTH_FRAMES):
+        self.websocket = websocket
+        self.service = service
+        self.history = deque(maxlen=max(1, min(smooth, STREAM_MAX_SMOOTH_FRAMES)))
+        self._latest = None               # (frame 번호, 수신 시각, 바이트)
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.processed = 0
+        self.skipped = 0
+
+    async def _receive(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                self.received += 1
+                if data is None:
+                    # 텍스트 메시지는 프레임이 아니므로 알려주고 계속 받음
+                    await self._send({"frame": self.received, "error": "프레임은 binary 메시지(JPEG 바이트)로 보내야 합니다"})
+                    continue
+                if len(data) > STREAM_MAX_FRAME_BYTES:
+                    await self._send({"frame": self.received, "error": "프레임이 너무 큽니다"})
+                    continue
+                if self._latest is not None:
+                    self.skipped += 1   # 아직 처리 못 한 이전 프레임은 버림
+                self._latest = (self.received, time.time(), data)
+                self._ready.set()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self._closed = True
+            self._ready.set()
+
+    def _preprocess(self, data: bytes) -> torch.Tensor:
+        from model_registry import decode_image
+
+        with stage(self.service.name, "decode"):
+            image = decode_image(data, "frame.jpg", self.service.backend.img_size)
+        return self.service.preprocess_image(image)
+
+    async def _send(self, message: dict):
+        await self.websocket.send_text(json.dumps(message, ensure_ascii=False))
+
+    async def run(self):
+        receiver = asyncio.create_task(self._receive())
+        service = self.service
+        service.active += 1
+        try:
+            while True:
+                if self._latest is None:
+                    if self._closed:
+                        break
+                    await self._ready.wait()
+                    self._ready.clear()
+                    continue
+                frame, received_at, data = self._latest
+                self._latest = None
+
+                start = time.perf_counter()
+                try:
+                    tensor = await run_in_threadpool(self._preprocess, data)
+                    probs = await service.batcher.submit(tensor)
+                except Exception as e:  # 깨진 프레임이나 forward 실패 하나 때문에 스트림을 끊지 않음
+                    STREAM_FRAMES.labels(service.name, "error").inc()
+                    await self._send({"frame": frame, "error": getattr(e, "detail", None) or f"{type(e).__name__}: {e}"})
+                    continue
+                self.processed += 1
+                STREAM_FRAMES.labels(service.name, "processed").inc()
+                service.last_used = time.monotonic()
+
+                message = {
+                    "frame": frame,
+                    "received_at": received_at,
+                    "sent_at": time.time(),
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "skipped": self.skipped,
+                    "predictions": service.topk_predictions(probs),
+                }
+                if self.history.maxlen > 1:
+                    self.history.append(probs)
+                    message["smoothed"] = service.topk_predictions(torch.stack(list(self.history)).mean(dim=0))
+                    message["smoothed_frames"] = len(self.history)
+                await self._send(message)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            service.active -= 1
+            receiver.cancel()
+            STREAM_FRAMES.labels(service.name, "skipped").inc(self.skipped)
+
+
+async def stream_frames(websocket: WebSocket, service, smooth: Optional[int] = None):
+    """
+    WebSocket으로 JPEG 프레임(binary 메시지)을 받아 프레임별 top-k 결과를 JSON 텍스트로 돌려준다.
+    smooth=N이면 최근 N프레임 softmax 평균의 top-k(smoothed)도 함께 보낸다.
+    """
+    await websocket.accept()
+    await FrameStream(websocket, service, STREAM_SMOOTH_FRAMES if smooth is None else smooth).run()
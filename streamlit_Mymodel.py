@@ -26,7 +26,8 @@ MODEL_PATH = "model/Best_ResNet50_model.pth"
 def load_model():
     """최종 학습된 모델을 불러옵니다."""
     try:
-        model = resnet50(weights=ResNet50_Weights.DEFAULT)
+        # 학습된 가중치로 전부 덮어쓰므로 ImageNet 가중치는 받지 않음
+        model = resnet50(weights=None)
         num_ftrs = model.fc.in_features
         model.fc = nn.Linear(num_ftrs, len(CLASS_NAMES))
         
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+import torch.nn as nn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ATOL = 1e-3
+PARITY_PER_CLASS = 2   # 데이터셋이 있으면 클래스별로 섞어 넣을 이미지 수
+
+
+@pytest.fixture
+def onnx_tools():
+    # onnx/onnxruntime은 선택 의존성 (pip install -e ".[onnx]"), 없으면 테스트별로 이유를 남기고 skip
+    pytest.importorskip("onnx", reason='onnx extra가 설치되지 않음 (pip install -e ".[onnx]")')
+    pytest.importorskip("onnxruntime", reason='onnx extra가 설치되지 않음 (pip install -e ".[onnx]")')
+    from onnx_backend import OnnxModel
+    from onnx_export import compare_outputs, export_onnx, parity_images
+
+    return OnnxModel, compare_outputs, export_onnx, parity_images
+
+
+def build_tiny(num_classes: int, pretrained: bool = False) -> nn.Module:
+    # model_loader의 builder와 같은 시그니처의 작은 CNN (BatchNorm 포함: eval 모드 변환까지 확인)
+    return nn.Sequential(
+        nn.Conv2d(3, 8, 3, stride=2, padding=1), nn.BatchNorm2d(8), nn.ReLU(),
+        nn.Conv2d(8, 16, 3, stride=2, padding=1), nn.BatchNorm2d(16), nn.ReLU(),
+        nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(16, num_classes),
+    )
+
+
+def test_tiny_model_parity(tmp_path, onnx_tools):
+    OnnxModel, compare_outputs, export_onnx, _ = onnx_tools
+    torch.manual_seed(0)
+    model = build_tiny(5)
+    # BatchNorm running 통계가 기본값(0, 1)이 아니도록 train 모드로 몇 번 돌린 뒤 저장
+    with torch.no_grad():
+        for _ in range(3):
+            model(torch.randn(4, 3, 32, 32))
+    weights_path = str(tmp_path / "tiny.pth")
+    torch.save({"model_state_dict": model.state_dict()}, weights_path)
+
+    onnx_path = export_onnx(build_tiny, 5, weights_path, 32, str(tmp_path / "tiny.onnx"))
+    images = torch.randn(7, 3, 32, 32)   # 배치 크기가 export 때(2)와 달라도 동작해야 함 (동적 배치)
+    max_diff, mismatches = compare_outputs(model.eval(), OnnxModel(onnx_path), images, batch_size=4)
+    assert max_diff <= ATOL
+    assert mismatches == 0
+
+
+@pytest.mark.parametrize("name", ["resnet50", "efficientnet_b0", "convnext_base"])
+def test_checkpoint_parity(name, tmp_path, monkeypatch, onnx_tools):
+    OnnxModel, compare_outputs, export_onnx, parity_images = onnx_tools
+    from model_loader import build_from_checkpoint
+    from model_registry import BACKENDS
+
+    monkeypatch.chdir(ROOT)   # 체크포인트 경로와 test.jpg는 저장소 루트 기준
+    backend = BACKENDS[name]
+    if not os.path.exists(backend.weights_path):
+        pytest.skip(f"가중치 파일이 없습니다: {backend.weights_path}")
+
+    onnx_path = export_onnx(backend.builder, len(backend.class_names), backend.weights_path, backend.img_size,
+                            str(tmp_path / f"{name}.onnx"))
+    torch_model = build_from_checkpoint(backend.builder, len(backend.class_names), backend.weights_path, mmap=False)
+    # test.jpg + (data/Dataset_project4가 있으면) 클래스별 샘플. 데이터셋이 없으면 그 부분만 빠짐 (parity_images 참고)
+    images = parity_images(backend.img_size, per_class=PARITY_PER_CLASS)
+    max_diff, mismatches = compare_outputs(torch_model, OnnxModel(onnx_path), images)
+    assert max_diff <= ATOL
+    assert mismatches == 0
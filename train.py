@@ -0,0 +1,397 @@
+import os
+import csv
+import time
+import argparse
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.optim as optim
+import torchvision.transforms as transforms # 이미지 처리시 사용
+from torch.utils.data import DataLoader, WeightedRandomSampler
+
+from dataset import FOLDER_TO_CLASS, NORM_MEAN, NORM_STD, SEED, build_df, split_df, CustomDataset
+from model_loader import ARCHITECTURES
+
+# 노트북(Mymodel_ResNet50, convNext, ResNet50_Use_Optuna)의 학습 루프를 세 모델 공통으로 정리한 모듈
+
+# ---------- Config ----------
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+TRAIN_NUM_WORKERS = int(os.getenv("TRAIN_NUM_WORKERS", str(min(8, os.cpu_count() or 1))))
+TRAIN_PREFETCH = int(os.getenv("TRAIN_PREFETCH", "4"))        # worker당 미리 만들어 둘 배치 수
+TRAIN_AMP = os.getenv("TRAIN_AMP", "auto")                     # auto(CPU bf16 / GPU fp16) | bf16 | fp16 | off
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoint")
+TRAIN_LOG_DIR = os.getenv("TRAIN_LOG_DIR", "runs")
+
+# 서빙(model_registry.DEFAULT_CLASS_NAMES)과 같은 순서(정렬된 한글 폴더명)로 학습해야 체크포인트를 바로 서빙에 쓸 수 있음
+CLASS_NAMES = sorted(FOLDER_TO_CLASS)
+# 모델별 기본값 (노트북 설정 기준)
+DEFAULTS = {
+    "resnet50": {"img_size": 512, "optimizer": "adam", "lr": 1e-3},
+    "efficientnet_b0": {"img_size": 512, "optimizer": "adam", "lr": 1e-4},
+    "convnext_base": {"img_size": 224, "optimizer": "adamw", "lr": 1e-4},
+}
+
+
+def train_transforms(img_size: int):
+    return transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.RandomHorizontalFlip(p=0.5),
+        transforms.RandomRotation(20),
+        transforms.ColorJitter(brightness=0.3, contrast=0.3, saturation=0.3, hue=0.2),
+        # 무작위 원근 왜곡 추가
+        transforms.RandomPerspective(distortion_scale=0.5, p=0.5),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=NORM_MEAN, std=NORM_STD),
+    ])
+
+
+def test_transforms(img_size: int):
+    return transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=NORM_MEAN, std=NORM_STD),
+    ])
+
+
+def weighted_sampler(train_df: pd.DataFrame) -> WeightedRandomSampler:
+    # 노트북과 같은 클래스 빈도 역수 가중치 샘플링
+    class_counts = train_df['label'].value_counts()
+    class_weights = {name: len(train_df) / count for name, count in class_counts.items()}
+    weights = train_df['label'].map(class_weights).values
+    return WeightedRandomSampler(weights=weights, num_samples=len(weights), replacement=True)
+
+
+def make_loaders(train_df: pd.DataFrame, test_df: pd.DataFrame, img_size: int, batch_size: int,
+                 num_workers: int = TRAIN_NUM_WORKERS, prefetch: int = TRAIN_PREFETCH,
+                 use_cache: bool = False, cache_dir: Optional[str] = None) -> tuple:
+    """
+    학습/검증 DataLoader. use_cache=True면 image_cache.py로 미리 만든 uint8 memmap 캐시에서 읽는다.
+    cache_dir을 주면 전체 데이터셋 대신 train_df + test_df만 그 위치에 캐시한다 (Optuna 샘플 등).
+    worker를 쓰면 epoch마다 프로세스를 다시 띄우지 않도록 persistent_workers를 켠다.
+    """
+    class_to_id = {name: i for i, name in enumerate(CLASS_NAMES)}
+    if use_cache:
+        import image_cache
+
+        if cache_dir:
+            cache_dir = image_cache.build_cache(pd.concat([train_df, test_df]), img_size, cache_dir)
+        else:
+            cache_dir = image_cache.build_cache(build_df(), img_size)
+        cache = image_cache.ImageCache(cache_dir)
+        train_ds = image_cache.CachedDataset(train_df, cache, class_to_id, image_cache.train_transforms(), label_col="folder")
+        test_ds = image_cache.CachedDataset(test_df, cache, class_to_id, image_cache.test_transforms(), label_col="folder")
+        train_df = train_df[train_df["path"].isin(cache.position)]
+    else:
+        train_ds = CustomDataset(train_df, class_to_id, train_transforms(img_size), label_col="folder")
+        test_ds = CustomDataset(test_df, class_to_id, test_transforms(img_size), label_col="folder")
+
+    loader_args = {"batch_size": batch_size, "num_workers": num_workers, "pin_memory": DEVICE == "cuda"}
+    if num_workers > 0:
+        loader_args.update(prefetch_factor=prefetch, persistent_workers=True)
+    train_loader = DataLoader(train_ds, sampler=weighted_sampler(train_df), **loader_args)
+    test_loader = DataLoader(test_ds, shuffle=False, **loader_args)
+    return train_loader, test_loader
+
+
+def amp_settings(mode: str, device: str = DEVICE) -> tuple:
+    """(autocast dtype 또는 None, GradScaler 필요 여부). CPU bf16은 지수 범위가 fp32와 같아 scaler가 필요 없음."""
+    if mode == "auto":
+        mode = "fp16" if device == "cuda" else "bf16"
+    if mode == "off":
+        return None, False
+    if mode == "bf16":
+        return torch.bfloat16, False
+    if mode == "fp16":
+        if device != "cuda":
+            raise ValueError("fp16 AMP는 GPU에서만 지원합니다 (CPU는 bf16)")
+        return torch.float16, True
+    raise ValueError(f"지원하지 않는 AMP 모드입니다: {mode}")
+
+
+def make_optimizer(name: str, params, lr: float, weight_decay: float = 0.0) -> optim.Optimizer:
+    if name == "adam":
+        return optim.Adam(params, lr=lr, weight_decay=weight_decay)
+    if name == "adamw":
+        return optim.AdamW(params, lr=lr, weight_decay=weight_decay or 0.05)
+    if name == "sgd":
+        return optim.SGD(params, lr=lr, momentum=0.9, weight_decay=weight_decay)
+    raise ValueError(f"지원하지 않는 optimizer입니다: {name}")
+
+
+class StepTimer:
+    """
+    step마다 데이터 대기 시간(DataLoader에서 다음 배치를 받을 때까지)과 계산 시간(forward/backward/step)을 잰다.
+    GPU에서는 비동기 실행이라 synchronize를 해야 계산 시간이 정확하다.
+    """
+
+    def __init__(self, device: str = DEVICE):
+        self.sync = torch.cuda.synchronize if device == "cuda" else (lambda: None)
+        self.mark = time.perf_counter()
+
+    def data_ready(self) -> float:
+        now = time.perf_counter()
+        wait, self.mark = now - self.mark, now
+        return wait
+
+    def compute_done(self) -> float:
+        self.sync()
+        now = time.perf_counter()
+        compute, self.mark = now - self.mark, now
+        return compute
+
+
+class TrainLogger:
+    """step/epoch 기록을 CSV(train_log_rect.csv와 같은 형식 + 시간 항목)와 TensorBoard에 남긴다."""
+
+    STEP_FIELDS = ["epoch", "step", "global_step", "batch_size", "loss", "data_wait_sec", "compute_sec", "images_per_sec"]
+    EPOCH_FIELDS = ["epoch", "train_loss", "train_acc", "train_macroF1", "lr", "epoch_sec",
+                    "val_loss", "val_acc", "val_macroF1", "data_wait_sec", "compute_sec", "data_wait_ratio", "images_per_sec"]
+
+    def __init__(self, log_dir: str, run_name: str):
+        os.makedirs(log_dir, exist_ok=True)
+        self.step_path = os.path.join(log_dir, f"{run_name}_steps.csv")
+        self.epoch_path = os.path.join(log_dir, f"{run_name}_epochs.csv")
+        self.writer = None
+        try:
+            from torch.utils.tensorboard import SummaryWriter
+            self.writer = SummaryWriter(os.path.join(log_dir, run_name))
+        except ImportError:
+            print("tensorboard가 없어 CSV에만 기록합니다")
+        self._step_file = open(self.step_path, "a", newline="", encoding="utf-8")
+        self._step_csv = csv.DictWriter(self._step_file, fieldnames=self.STEP_FIELDS)
+        if self._step_file.tell() == 0:
+            self._step_csv.writeheader()
+
+    def step(self, row: dict):
+        self._step_csv.writerow(row)
+        if self.writer:
+            g = row["global_step"]
+            self.writer.add_scalar("Loss/train_step", row["loss"], g)
+            self.writer.add_scalar("Time/data_wait_sec", row["data_wait_sec"], g)
+            self.writer.add_scalar("Time/compute_sec", row["compute_sec"], g)
+            self.writer.add_scalar("Throughput/images_per_sec", row["images_per_sec"], g)
+
+    def epoch(self, row: dict):
+        self._step_file.flush()
+        is_new = not os.path.exists(self.epoch_path)
+        with open(self.epoch_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.EPOCH_FIELDS)
+            if is_new:
+                writer.writeheader()
+            writer.writerow(row)
+        if self.writer:
+            for key, value in row.items():
+                if key != "epoch":
+                    self.writer.add_scalar(f"Epoch/{key}", value, row["epoch"])
+            self.writer.flush()
+
+    def close(self):
+        self._step_file.close()
+        if self.writer:
+            self.writer.close()
+
+
+def evaluate(model: nn.Module, loader: DataLoader, criterion: nn.Module, amp_dtype: Optional[torch.dtype],
+             device: str = DEVICE) -> dict:
+    from sklearn.metrics import accuracy_score, f1_score
+
+    model.eval()
+    total_loss, preds, labels = 0.0, [], []
+    autocast = torch.autocast(device_type=device, dtype=amp_dtype) if amp_dtype else nullcontext()
+    with torch.inference_mode(), autocast:
+        for images, targets in loader:
+            images, targets = images.to(device, non_blocking=True), targets.to(device, non_blocking=True)
+            outputs = model(images)
+            total_loss += criterion(outputs.float(), targets).item() * images.size(0)
+            preds.extend(outputs.argmax(dim=1).cpu().tolist())
+            labels.extend(targets.cpu().tolist())
+    return {
+        "val_loss": total_loss / max(len(labels), 1),
+        "val_acc": accuracy_score(labels, preds),
+        "val_macroF1": f1_score(labels, preds, average="macro", zero_division=0),
+    }
+
+
+def save_checkpoint(path: str, **state):
+    # 저장 도중 끊겨도 이전 체크포인트가 남도록 임시 파일에 쓰고 교체
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def train(name: str, epochs: int = 10, batch_size: int = 32, lr: Optional[float] = None,
+          img_size: Optional[int] = None, optimizer_name: Optional[str] = None, weight_decay: float = 0.0,
+          accum_steps: int = 1, amp: str = TRAIN_AMP, num_workers: int = TRAIN_NUM_WORKERS,
+          prefetch: int = TRAIN_PREFETCH, use_cache: bool = False, channels_last: bool = False,
+          log_every: int = 1, checkpoint_dir: Optional[str] = CHECKPOINT_DIR, log_dir: str = TRAIN_LOG_DIR,
+          run_name: Optional[str] = None, resume: bool = True, df: Optional[pd.DataFrame] = None,
+          cache_dir: Optional[str] = None, epoch_callback=None, val_df: Optional[pd.DataFrame] = None) -> Dict[str, float]:
+    """
+    ImageNet pretrained 모델(model_loader의 builder)에서 시작해 분류 헤드를 학습한다.
+
+    체크포인트
+      - {checkpoint_dir}/{run_name}_last.pth: 매 epoch 끝에 저장, 다시 실행하면 여기서 이어서 학습
+      - {checkpoint_dir}/{run_name}_best.pth: 검증 macro-F1 최고 모델 (서빙 WEIGHTS_PATH로 바로 사용 가능)
+      - checkpoint_dir=None이면 저장하지 않음 (Optuna trial 등)
+    epoch_callback(epoch, metrics)가 있으면 epoch마다 호출한다 (Optuna pruning 등).
+    val_df를 주면 df를 다시 나누지 않고 df로 학습, val_df로 검증한다 (이미 나눈 분할에서 뽑은 Optuna 샘플 등).
+    """
+    defaults = DEFAULTS[name]
+    img_size = img_size or defaults["img_size"]
+    lr = lr or defaults["lr"]
+    optimizer_name = optimizer_name or defaults["optimizer"]
+    run_name = run_name or f"{name}_{img_size}"
+    accum_steps = max(1, accum_steps)
+    torch.manual_seed(SEED)
+
+    if val_df is not None:
+        train_df, test_df = df, val_df
+    else:
+        train_df, test_df = split_df(build_df() if df is None else df)
+    train_loader, test_loader = make_loaders(train_df, test_df, img_size, batch_size, num_workers, prefetch,
+                                             use_cache, cache_dir)
+
+    model = ARCHITECTURES[name](len(CLASS_NAMES), pretrained=True).to(DEVICE)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = make_optimizer(optimizer_name, model.parameters(), lr, weight_decay)
+    amp_dtype, use_scaler = amp_settings(amp)
+    scaler = torch.amp.GradScaler("cuda") if use_scaler else None
+
+    last_path = os.path.join(checkpoint_dir, f"{run_name}_last.pth") if checkpoint_dir else None
+    best_path = os.path.join(checkpoint_dir, f"{run_name}_best.pth") if checkpoint_dir else None
+    start_epoch, global_step, best_f1 = 0, 0, 0.0
+    if resume and last_path and os.path.exists(last_path):
+        checkpoint = torch.load(last_path, map_location=DEVICE, weights_only=False)
+        model.load_state_dict(checkpoint["model_state_dict"])
+        optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
+        if scaler and checkpoint.get("scaler_state_dict"):
+            scaler.load_state_dict(checkpoint["scaler_state_dict"])
+        torch.set_rng_state(checkpoint["rng_state"])
+        start_epoch, global_step, best_f1 = checkpoint["epoch"], checkpoint["global_step"], checkpoint["best_macro_f1"]
+        print(f"체크포인트를 로드하여 학습을 재개합니다: {last_path} (이어서 시작할 에포크: {start_epoch + 1}, "
+              f"최고 macro-F1: {best_f1:.4f})")
+
+    logger = TrainLogger(log_dir, run_name)
+    print(f"{name} img={img_size} batch={batch_size}x{accum_steps} lr={lr} opt={optimizer_name} "
+          f"amp={amp_dtype} workers={num_workers} device={DEVICE}")
+    from sklearn.metrics import f1_score
+
+    metrics = {}
+    try:
+        for epoch in range(start_epoch, epochs):
+            model.train()
+            optimizer.zero_grad(set_to_none=True)
+            epoch_start = time.perf_counter()
+            total_loss, wait_total, compute_total, seen = 0.0, 0.0, 0.0, 0
+            preds, labels = [], []
+            autocast = torch.autocast(device_type=DEVICE, dtype=amp_dtype) if amp_dtype else nullcontext()
+
+            timer = StepTimer()
+            for i, (images, targets) in enumerate(train_loader):
+                data_wait = timer.data_ready()
+                images = images.to(DEVICE, non_blocking=True)
+                targets = targets.to(DEVICE, non_blocking=True)
+                if channels_last:
+                    images = images.contiguous(memory_format=torch.channels_last)
+
+                with autocast:
+                    outputs = model(images)
+                    loss = criterion(outputs.float(), targets)
+                # 누적 step 수로 나눠서, 작은 배치를 여러 번 모아도 큰 배치 한 번과 같은 gradient가 되게 함
+                (scaler.scale(loss / accum_steps) if scaler else loss / accum_steps).backward()
+                if (i + 1) % accum_steps == 0 or i + 1 == len(train_loader):
+                    if scaler:
+                        scaler.step(optimizer)
+                        scaler.update()
+                    else:
+                        optimizer.step()
+                    optimizer.zero_grad(set_to_none=True)
+
+                batch = images.size(0)
+                loss_value = loss.item()
+                total_loss += loss_value * batch
+                preds.extend(outputs.argmax(dim=1).tolist())
+                labels.extend(targets.tolist())
+                compute = timer.compute_done()
+                wait_total += data_wait
+                compute_total += compute
+                seen += batch
+                global_step += 1
+                if global_step % log_every == 0:
+                    logger.step({"epoch": epoch + 1, "step": i + 1, "global_step": global_step, "batch_size": batch,
+                                 "loss": round(loss_value, 6), "data_wait_sec": round(data_wait, 4),
+                                 "compute_sec": round(compute, 4),
+                                 "images_per_sec": round(batch / max(data_wait + compute, 1e-9), 2)})
+                if (i + 1) % 50 == 0:
+                    print(f"[Epoch {epoch+1}/{epochs}, Batch {i+1}/{len(train_loader)}] Loss: {loss_value:.4f}  "
+                          f"data {wait_total / (wait_total + compute_total):.0%}  {seen / (wait_total + compute_total):.1f} img/s")
+
+            epoch_sec = time.perf_counter() - epoch_start
+            metrics = {
+                "epoch": epoch + 1,
+                "train_loss": total_loss / max(seen, 1),
+                "train_acc": sum(p == t for p, t in zip(preds, labels)) / max(len(labels), 1),
+                "train_macroF1": f1_score(labels, preds, average="macro", zero_division=0),
+                "lr": optimizer.param_groups[0]["lr"],
+                "epoch_sec": round(epoch_sec, 2),
+                **evaluate(model, test_loader, criterion, amp_dtype),
+                "data_wait_sec": round(wait_total, 2),
+                "compute_sec": round(compute_total, 2),
+                "data_wait_ratio": round(wait_total / max(wait_total + compute_total, 1e-9), 4),
+                "images_per_sec": round(seen / max(wait_total + compute_total, 1e-9), 2),
+            }
+            logger.epoch(metrics)
+            print(f"--- Epoch {epoch+1}/{epochs}: loss={metrics['train_loss']:.4f} val_acc={metrics['val_acc']:.4f} "
+                  f"val_macroF1={metrics['val_macroF1']:.4f}  {epoch_sec:.0f}s "
+                  f"(데이터 대기 {metrics['data_wait_ratio']:.0%}, {metrics['images_per_sec']} img/s)")
+
+            if metrics["val_macroF1"] > best_f1:
+                best_f1 = metrics["val_macroF1"]
+                if best_path:
+                    save_checkpoint(best_path, model_state_dict=model.state_dict(), epoch=epoch + 1,
+                                    best_macro_f1=best_f1, class_names=CLASS_NAMES, img_size=img_size, arch=name)
+                    print(f"최고 macro-F1 갱신: {best_f1:.4f} → {best_path}")
+            if last_path:
+                save_checkpoint(last_path, model_state_dict=model.state_dict(),
+                                optimizer_state_dict=optimizer.state_dict(),
+                                scaler_state_dict=scaler.state_dict() if scaler else None,
+                                rng_state=torch.get_rng_state(), epoch=epoch + 1, global_step=global_step,
+                                best_macro_f1=best_f1, class_names=CLASS_NAMES, img_size=img_size, arch=name)
+            if epoch_callback:
+                epoch_callback(epoch, metrics)
+    finally:
+        logger.close()
+    return {**metrics, "best_macro_f1": best_f1}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ResNet50 / EfficientNet-B0 / ConvNeXt-Base 학습 (bf16 AMP, 시간 측정)")
+    parser.add_argument("model", choices=list(ARCHITECTURES))
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--accum-steps", type=int, default=1, help="gradient 누적 step 수 (실제 배치 = batch-size x accum-steps)")
+    parser.add_argument("--lr", type=float, default=None)
+    parser.add_argument("--img-size", type=int, default=None)
+    parser.add_argument("--optimizer", choices=["adam", "adamw", "sgd"], default=None)
+    parser.add_argument("--weight-decay", type=float, default=0.0)
+    parser.add_argument("--amp", choices=["auto", "bf16", "fp16", "off"], default=TRAIN_AMP)
+    parser.add_argument("--workers", type=int, default=TRAIN_NUM_WORKERS)
+    parser.add_argument("--prefetch", type=int, default=TRAIN_PREFETCH)
+    parser.add_argument("--cache", action="store_true", help="image_cache.py의 uint8 memmap 캐시로 학습")
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--log-every", type=int, default=1)
+    parser.add_argument("--run-name", default=None)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    train(args.model, args.epochs, args.batch_size, args.lr, args.img_size, args.optimizer, args.weight_decay,
+          args.accum_steps, args.amp, args.workers, args.prefetch, args.cache, args.channels_last,
+          args.log_every, run_name=args.run_name, resume=not args.no_resume)
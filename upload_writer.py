@@ -0,0 +1,138 @@
+import os
+import queue
+import random
+import threading
+import uuid
+import weakref
+from typing import Optional
+
+from metrics import stage
+
+# ---------- Config ----------
+SAVE_QUEUE_SIZE = int(os.getenv("SAVE_QUEUE_SIZE", "256"))         # 대기열 최대 길이 (초과 시 정책에 따라 처리)
+SAVE_POLICY = os.getenv("SAVE_POLICY", "drop")                    # drop | drop_oldest | block
+SAVE_BLOCK_TIMEOUT = float(os.getenv("SAVE_BLOCK_TIMEOUT", "1.0"))  # block 정책에서 최대 대기 시간(초)
+SAVE_SAMPLE_RATE = float(os.getenv("SAVE_SAMPLE_RATE", "1.0"))     # 0~1, 저장할 업로드 비율
+SAVE_SHARD_DEPTH = int(os.getenv("SAVE_SHARD_DEPTH", "1"))         # uuid 앞 2글자씩 하위 폴더 단계 수
+
+POLICIES = ("drop", "drop_oldest", "block")
+
+
+class UploadWriter:
+    """
+    업로드된 원본 바이트를 그대로 디스크에 저장하는 백그라운드 writer.
+
+    요청 경로에서는 큐에 넣기만 하고, 실제 파일 쓰기는 별도 스레드에서 처리한다.
+    PIL로 다시 인코딩하지 않으므로 JPEG 인코딩 비용이 없다.
+    """
+
+    def __init__(self, root: str,
+                 max_queue: int = SAVE_QUEUE_SIZE,
+                 policy: str = SAVE_POLICY,
+                 sample_rate: float = SAVE_SAMPLE_RATE,
+                 shard_depth: int = SAVE_SHARD_DEPTH,
+                 block_timeout: float = SAVE_BLOCK_TIMEOUT,
+                 name: str = "upload"):
+        if policy not in POLICIES:
+            raise ValueError(f"SAVE_POLICY는 {POLICIES} 중 하나여야 합니다: {policy}")
+        self.root = root
+        self.name = name   # save 단계 시간을 기록할 모델 이름 (metrics)
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.shard_depth = max(0, shard_depth)
+        self.block_timeout = block_timeout
+        self.max_queue = max(1, max_queue)
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "skipped": 0, "errors": 0}
+        self._closed = False
+        self._start()
+        # fork한 자식 프로세스(serve.py)에는 writer 스레드가 따라가지 않으므로 자식에서 다시 띄움
+        # (hook은 해제할 수 없으므로 weakref로만 잡고, close된 writer는 다시 띄우지 않음)
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() is not None and not ref()._closed and ref()._start())
+
+    def _start(self):
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="upload-writer", daemon=True)
+        self._thread.start()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _path_for(self, file_id: str, filename: str) -> str:
+        # 고유한 파일명으로 저장 (덮어쓰기 방지), uuid 앞부분으로 하위 폴더를 나눠 한 폴더에 파일이 몰리지 않게 함
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else 'jpg'
+        shards = [file_id[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, f'{file_id}.{extension}')
+
+    def submit(self, data: bytes, filename: str) -> Optional[str]:
+        """저장 대기열에 넣고 저장될 경로를 반환한다. 샘플링/드롭으로 저장하지 않거나 close된 뒤면 None."""
+        if self._closed:
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count("skipped")
+            return None
+
+        file_path = self._path_for(str(uuid.uuid4()), filename or "")
+        item = (file_path, data)
+        try:
+            if self.policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.policy != "drop_oldest":
+                self._count("dropped")
+                return None
+            # 가장 오래된 항목을 버리고 새 항목을 넣는다
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count("dropped")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count("dropped")
+                return None
+        self._count("queued")
+        return file_path
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self):
+        # 종료 시 대기열이 모두 저장될 때까지 기다림
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        # 모델을 내릴 때: 남은 업로드를 저장하고 writer 스레드를 끝냄
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self._queue.put(None)   # 종료 신호
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            file_path, data = item
+            try:
+                with stage(self.name, "save"):
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    tmp_path = file_path + ".tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, file_path)
+                self._count("written")
+            except OSError as e:
+                self._count("errors")
+                print(f"업로드 저장 실패: {file_path} → {e}")
+            finally:
+                self._queue.task_done()